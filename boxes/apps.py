@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class BoxesConfig(AppConfig):
     name = 'boxes'
+
+    def ready(self):
+        import boxes.signals  # noqa: F401
@@ -0,0 +1,90 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from boxes.models import Box, BoxStatusCounter
+from orders.models import Order
+from orders.statuses import apply_order_counters_changes, rebuild_orders_counters
+
+
+def apply_box_counters_changes(changes):
+    """Применяет изменения счетчиков: (company_id, status) -> изменение количества.
+
+    Коробки без компании (заказа) не учитываются."""
+    for (company_id, status), delta in changes.items():
+        if company_id is None or not delta:
+            continue
+        if BoxStatusCounter.objects.filter(company_id=company_id, status=status).update(value=F('value') + delta):
+            continue
+        try:
+            with transaction.atomic():
+                BoxStatusCounter.objects.create(company_id=company_id, status=status, value=delta)
+        except IntegrityError:
+            # счетчик создан параллельным запросом
+            BoxStatusCounter.objects.filter(company_id=company_id, status=status).update(value=F('value') + delta)
+
+
+def apply_boxes_changes(changes):
+    """Применяет изменения количества коробок: (order_id, company_id, status) -> изменение количества.
+
+    Обновляются счетчики компаний и количество коробок по статусам в заказах (orders.statuses)"""
+    companies_changes, orders_changes = Counter(), Counter()
+    for (order_id, company_id, status), delta in changes.items():
+        companies_changes[company_id, status] += delta
+        orders_changes[order_id, status] += delta
+    apply_box_counters_changes(companies_changes)
+    apply_order_counters_changes(orders_changes)
+
+
+def count_created_boxes(boxes, orders_companies):
+    """Новые коробки, orders_companies: id заказа -> id компании"""
+    apply_boxes_changes(Counter((box.order_id, orders_companies.get(box.order_id), box.status) for box in boxes))
+
+
+def count_boxes_status_change(queryset, status):
+    """Вызывается перед queryset.update(status=status): одна агрегация по заказам и статусам"""
+    changes = Counter()
+    for row in queryset.exclude(status=status).values('order_id', 'order__company_id', 'status') \
+            .annotate(count=Count('id')).order_by():
+        changes[row['order_id'], row['order__company_id'], row['status']] -= row['count']
+        changes[row['order_id'], row['order__company_id'], status] += row['count']
+    apply_boxes_changes(changes)
+
+
+def count_box_save(box, created):
+    """Сохранение одной коробки через Box.save (сигнал post_save)"""
+    new_company_id = box.order.company_id if box.order_id else None
+    changes = Counter()
+    if created:
+        changes[box.order_id, new_company_id, box.status] += 1
+    elif hasattr(box, '_loaded_counted_values'):
+        old_order_id, old_status = box._loaded_counted_values
+        if (old_order_id, old_status) == (box.order_id, box.status):
+            return
+        if old_order_id == box.order_id:
+            old_company_id = new_company_id
+        else:
+            old_company_id = Order.objects.filter(id=old_order_id).values_list('company_id', flat=True).first()
+        changes[old_order_id, old_company_id, old_status] -= 1
+        changes[box.order_id, new_company_id, box.status] += 1
+    apply_boxes_changes(changes)
+    box._loaded_counted_values = (box.order_id, box.status)
+
+
+def count_box_delete(box):
+    old_order_id, old_status = getattr(box, '_loaded_counted_values', (box.order_id, box.status))
+    company_id = Order.objects.filter(id=old_order_id).values_list('company_id', flat=True).first()
+    apply_boxes_changes({(old_order_id, company_id, old_status): -1})
+
+
+def rebuild_box_counters():
+    """Пересчитывает счетчики компаний и количество коробок по статусам в заказах"""
+    with transaction.atomic():
+        rebuild_orders_counters()
+        BoxStatusCounter.objects.all().delete()
+        BoxStatusCounter.objects.bulk_create([
+            BoxStatusCounter(company_id=row['order__company_id'], status=row['status'], value=row['count'])
+            for row in Box.objects.filter(order__company__isnull=False)
+            .values('order__company_id', 'status').annotate(count=Count('id')).order_by()
+        ])
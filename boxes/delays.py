@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from boxes.models import Box
+from boxes.transitions import BOX_STATUS_TRANSITIONS, apply_boxes_status_change, select_boxes_for_update
+from orders.models import DELAY_CANDIDATES, Order
+
+Status = Box.StatusChoices
+
+# статусы коробок, которые переводятся в DELAYED, совпадают с orders.models.HAS_PENDING_BOXES
+DELAYABLE_STATUSES = [status for status, targets in BOX_STATUS_TRANSITIONS.items() if Status.DELAYED in targets]
+DELAYED_COMMENTS = 'Истек срок подачи транспорта'
+
+
+def get_overdue_orders_filter(now, grace=timedelta(0)):
+    """Заказы, у которых ожидаемые дата и время подачи транспорта (в часовом поясе проекта) прошли больше grace назад.
+
+    Заказ без времени подачи просрочен со следующего дня, заказ без даты не просрочен"""
+    deadline = timezone.localtime(now - grace)
+    # отдельное условие shipping_date__lte - граница просмотра диапазона индекса
+    return Q(shipping_date__lte=deadline.date()) & (
+        Q(shipping_date__lt=deadline.date()) | Q(shipping_date=deadline.date(), shipping_time__lte=deadline.time()))
+
+
+def delay_overdue_boxes(user, now=None, grace=timedelta(0), batch_size=500):
+    """Переводит в DELAYED незавершенные коробки просроченных заказов, пакетами по batch_size заказов.
+
+    Заказы выбираются по частичному индексу order_pending_shipping_idx в порядке (shipping_date, id),
+    каждый пакет - отдельная транзакция: коробки блокируются и переводятся через
+    boxes.transitions.apply_boxes_status_change (один UPDATE коробок, счетчики, события одним запросом),
+    заказам одним UPDATE проставляется delayed_at. Повторный запуск безопасен: обработанные заказы больше
+    не попадают в индекс, в том числе когда их коробки продолжили путь из DELAYED. Возвращает итератор
+    результатов пакетов: {'orders': заказов с задержанными коробками, 'boxes': задержанных коробок}"""
+    now = now or timezone.now()
+    queryset = Order.objects.filter(DELAY_CANDIDATES).filter(get_overdue_orders_filter(now, grace))
+    last = None
+    while True:
+        batch = queryset
+        if last is not None:
+            batch = batch.filter(Q(shipping_date__gte=last[0]),
+                                 Q(shipping_date__gt=last[0]) | Q(shipping_date=last[0], id__gt=last[1]))
+        orders = list(batch.order_by('shipping_date', 'id').values_list('shipping_date', 'id')[:batch_size])
+        if not orders:
+            return
+        last = orders[-1]
+        with transaction.atomic():
+            # повторная проверка под блокировкой: срок подачи мог быть изменен после выборки пакета
+            orders_ids = list(queryset.select_for_update().filter(id__in=[order_id for _, order_id in orders])
+                              .values_list('id', flat=True))
+            boxes = list(select_boxes_for_update(
+                Box.objects.filter(order_id__in=orders_ids, status__in=DELAYABLE_STATUSES)))
+            events = apply_boxes_status_change(boxes, Status.DELAYED, user, DELAYED_COMMENTS)
+            Order.objects.filter(id__in=orders_ids).update(delayed_at=now)
+        yield {'orders': len(events), 'boxes': len(boxes)}
+        if len(orders) < batch_size:
+            return
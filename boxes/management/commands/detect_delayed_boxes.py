@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from boxes.delays import delay_overdue_boxes
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Перевод в DELAYED незавершенных коробок заказов, у которых прошли ожидаемые дата и время подачи '
+            'транспорта. Рассчитан на запуск по расписанию (например, cron каждую минуту)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help='Пользователь, от имени которого создаются события')
+        parser.add_argument('--batch-size', type=int, default=500, help='Заказов в одной транзакции')
+        parser.add_argument('--grace-minutes', type=int, default=0,
+                            help='Через сколько минут после времени подачи транспорта коробки считаются задержанными')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["username"]}" does not exist')
+        result = {'orders': 0, 'boxes': 0}
+        for batch in delay_overdue_boxes(user, grace=timedelta(minutes=options['grace_minutes']),
+                                         batch_size=options['batch_size']):
+            result = {key: result[key] + batch[key] for key in result}
+        self.stdout.write(f'Delayed {result["boxes"]} boxes in {result["orders"]} orders')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from boxes.counters import rebuild_box_counters
+from boxes.models import BoxStatusCounter
+
+
+class Command(BaseCommand):
+    help = 'Пересчет количества коробок компаний по статусам (BoxStatusCounter)'
+
+    def handle(self, *args, **options):
+        rebuild_box_counters()
+        self.stdout.write(f'Rebuilt {BoxStatusCounter.objects.count()} counters')
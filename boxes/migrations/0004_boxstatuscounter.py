@@ -0,0 +1,27 @@
+# Generated by Django 3.1.6 on 2026-10-18 10:17
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+        ('boxes', '0003_box_shipment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoxStatusCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('NEW', 'Новый заказ'), ('READY_FOR_SHIPPING', 'Собран на складе отправителя'), ('SORTING', 'На складе транспортной компании'), ('DELIVERING', 'Доставляется (передан курьеру для доставки покупателю)'), ('DELAYED', 'Доставка не была выполнена в срок'), ('DONE', 'Доставлен'), ('CANCELED', 'Отменен')], max_length=32, verbose_name='Состояние коробки')),
+                ('value', models.IntegerField(default=0, verbose_name='Количество коробок')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='box_status_counters', to='companies.company', verbose_name='Компания')),
+            ],
+            options={
+                'unique_together': {('company', 'status')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.6 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boxes', '0004_boxstatuscounter'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='box',
+            index=models.Index(fields=['order', 'status'], name='box_order_status_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.1.6 on 2026-10-18 10:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+        ('boxes', '0005_auto_20261018_1318'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedBox',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.IntegerField(verbose_name='Идентификатор коробки')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='box',
+            name='update',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата последнего изменения коробки'),
+        ),
+        migrations.AddIndex(
+            model_name='box',
+            index=models.Index(fields=['update', 'id'], name='box_update_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='deletedbox',
+            name='company',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='deleted_boxes', to='companies.company', verbose_name='Компания'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedbox',
+            index=models.Index(fields=['company', 'deleted_at'], name='deleted_box_company_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.6 on 2026-10-18 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('boxes', '0006_box_update_deletedbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='box',
+            index=models.Index(fields=['code'], name='box_code_idx'),
+        ),
+    ]
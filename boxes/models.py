@@ -1,19 +1,13 @@
 from django.db import models
 from django.utils.translation import ugettext as _
 
+from companies.models import Company
 from orders.models import Order
 from shipments.models import Shipment
 
 
 class Box(models.Model):
-    class StatusChoices(models.TextChoices):
-        NEW = 'NEW', 'Новый заказ'
-        READY_FOR_SHIPPING = 'READY_FOR_SHIPPING', 'Собран на складе отправителя'
-        SORTING = 'SORTING', 'На складе транспортной компании'
-        DELIVERING = 'DELIVERING', 'Доставляется (передан курьеру для доставки покупателю)'
-        DELAYED = 'DELAYED', 'Доставка не была выполнена в срок'
-        DONE = 'DONE', 'Доставлен'
-        CANCELED = 'CANCELED', 'Отменен'
+    StatusChoices = Order.StatusChoices
 
     order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name='boxes',
                               verbose_name='Идентификатор заказа')
@@ -28,10 +22,65 @@ class Box(models.Model):
                               verbose_name='Состояние коробки', help_text='По умолчанию: NEW')
     shipment = models.ForeignKey(Shipment, on_delete=models.CASCADE, related_name='boxes', null=True, blank=True,
                                  verbose_name='Отправление', help_text='Указывается при создании отправления')
+    update = models.DateTimeField(auto_now=True, verbose_name='Дата последнего изменения коробки')
 
     class Meta:
         verbose_name = _('box')
         verbose_name_plural = _('boxes')
+        indexes = [
+            # статусы коробок заказов (Order.status) читаются только из индекса
+            models.Index(fields=['order', 'status'], name='box_order_status_idx'),
+            # дельта-синхронизация: ?modified_since=
+            models.Index(fields=['update', 'id'], name='box_update_id_idx'),
+            # поиск по штрихкоду: ?code=, ?barcode=
+            models.Index(fields=['code'], name='box_code_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super(Box, cls).from_db(db, field_names, values)
+        # значения на момент загрузки, для обновления счетчиков коробок (boxes.counters)
+        instance._loaded_counted_values = (instance.__dict__.get('order_id'), instance.__dict__.get('status'))
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None):
+        super(Box, self).refresh_from_db(using=using, fields=fields)
+        self._loaded_counted_values = (self.__dict__.get('order_id'), self.__dict__.get('status'))
 
     def __str__(self):
         return self.client_code
+
+
+class DeletedBox(models.Model):
+    """Удаленная коробка (tombstone) для инкрементальной синхронизации.
+
+    Создается и для коробок удаленного заказа: они больше не относятся к компании"""
+    object_id = models.IntegerField(verbose_name='Идентификатор коробки')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, related_name='deleted_boxes',
+                                verbose_name='Компания')
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'deleted_at'], name='deleted_box_company_idx'),
+        ]
+
+    def __str__(self):
+        return f'Удаленная коробка: {self.object_id}'
+
+
+class BoxStatusCounter(models.Model):
+    """Количество коробок компании в каждом статусе.
+
+    Обновляется при создании коробки, изменении ее статуса или заказа (boxes.counters),
+    пересчитывается командой rebuild_box_counters"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='box_status_counters',
+                                verbose_name='Компания')
+    status = models.CharField(max_length=32, choices=Box.StatusChoices.choices, verbose_name='Состояние коробки')
+    value = models.IntegerField(default=0, verbose_name='Количество коробок')
+
+    class Meta:
+        unique_together = ('company', 'status')
+
+    def __str__(self):
+        return f'{self.company_id}: {self.status} - {self.value}'
@@ -1,9 +1,15 @@
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from boxes.models import Box
+from boxes.counters import count_created_boxes
+from boxes.transitions import CLIENT_TARGET_STATUSES
+from carrier_accounting_system.utils import BulkCreateListSerializer
+from companies.serializers import CompanySerializer
 from orders.models import Order
+from orders.utils import touch_orders
 
 
 class BoxListRetrieveSerializer(serializers.ModelSerializer):
@@ -14,6 +20,12 @@ class BoxListRetrieveSerializer(serializers.ModelSerializer):
                   'content_description', 'status', 'shipment']
 
 
+class BoxChangesSerializer(BoxListRetrieveSerializer):
+    """Коробка в дельта-ленте ?modified_since=, с датой изменения для следующего запроса"""
+    class Meta(BoxListRetrieveSerializer.Meta):
+        fields = BoxListRetrieveSerializer.Meta.fields + ['update']
+
+
 class BoxCreateSerializer(serializers.ModelSerializer):
     order_id = serializers.PrimaryKeyRelatedField(source='order', queryset=Order.objects.all(), write_only=True,
                                                   required=True)
@@ -31,6 +43,62 @@ class BoxCreateSerializer(serializers.ModelSerializer):
         return value
 
 
+class BoxBulkCreateListSerializer(BulkCreateListSerializer):
+    """Пакетная регистрация коробок.
+
+    Заказы всех коробок пакета получаются одним запросом, уникальность client_code
+    проверяется одним запросом, коробки вставляются через bulk_create."""
+
+    def validate(self, attrs):
+        self.orders_companies = orders_companies = dict(
+            Order.objects.filter(id__in=set(item['order_id'] for item in attrs)).values_list('id', 'company_id'))
+        existing = set(Box.objects.filter(client_code__in=[item['client_code'] for item in attrs])
+                       .values_list('client_code', flat=True))
+        company_id = self.context['request'].user.company_id
+        seen = set()
+        client_code_field = Box._meta.get_field('client_code')
+        client_code_unique_message = client_code_field.error_messages['unique'] % {
+            'model_name': Box._meta.verbose_name, 'field_label': client_code_field.verbose_name}
+
+        def get_item_errors(item):
+            errors = {}
+            if item['order_id'] not in orders_companies:
+                errors['order_id'] = [f'Invalid pk "{item["order_id"]}" - object does not exist.']
+            elif orders_companies[item['order_id']] != company_id:
+                errors['order_id'] = ["An order with this id does not belong to the user's company."]
+            if item['client_code'] in existing:
+                errors['client_code'] = [client_code_unique_message]
+            elif item['client_code'] in seen:
+                errors['client_code'] = ['The batch already has a box with this code.']
+            if not errors:
+                seen.add(item['client_code'])
+            return errors
+
+        return self.exclude_items(attrs, get_item_errors)
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            boxes = Box.objects.bulk_create([Box(**item) for item in validated_data])
+            count_created_boxes(boxes, self.orders_companies)
+            touch_orders(box.order_id for box in boxes)
+        self.set_missing_pks(boxes, 'client_code')
+        return boxes
+
+
+class BoxBulkCreateSerializer(BoxCreateSerializer):
+    """Элемент пакета коробок, заказ и уникальность client_code проверяются для всего пакета"""
+    order_id = serializers.IntegerField(write_only=True, required=True)
+
+    class Meta(BoxCreateSerializer.Meta):
+        list_serializer_class = BoxBulkCreateListSerializer
+        extra_kwargs = {
+            'client_code': {'validators': []},
+        }
+
+    def validate_order_id(self, value):
+        return value
+
+
 class BoxUpdateSerializer(serializers.ModelSerializer):
     order_id = serializers.PrimaryKeyRelatedField(source='order', queryset=Order.objects.all(), write_only=True,
                                                   required=False)
@@ -50,3 +118,40 @@ class BoxUpdateSerializer(serializers.ModelSerializer):
         if value.company != self.context['request'].user.company:
             raise ValidationError("An order with this id does not belong to the user's company.")
         return value
+
+
+class BoxStatusTransitionSerializer(serializers.Serializer):
+    """Пакетный перевод коробок в статус, коробки задаются списками id и/или client_code"""
+    max_length = 10000
+
+    status = serializers.ChoiceField(choices=Box.StatusChoices.choices)
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    client_codes = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    comments = serializers.CharField(required=False, allow_blank=True, default='')
+
+    def validate_status(self, value):
+        user = self.context['request'].user
+        if not (user.company and user.company.is_transport_company) and value not in CLIENT_TARGET_STATUSES:
+            raise ValidationError(f'Only a transport company can set the {value} status.')
+        return value
+
+    def validate(self, attrs):
+        if not attrs['ids'] and not attrs['client_codes']:
+            raise ValidationError('Either "ids" or "client_codes" must be given.')
+        if len(attrs['ids']) + len(attrs['client_codes']) > self.max_length:
+            raise ValidationError(f'Ensure the request has no more than {self.max_length} boxes.')
+        return attrs
+
+
+class BoxStatusTransitionResultSerializer(serializers.Serializer):
+    updated = serializers.ListField(child=serializers.IntegerField(), help_text='id коробок, переведенных в статус')
+    unchanged = serializers.ListField(child=serializers.IntegerField(),
+                                      help_text='id коробок, уже находящихся в статусе')
+    errors = serializers.ListField(child=serializers.DictField(),
+                                   help_text='Ошибки по элементам: {"id" или "client_code": значение, "errors": [...]}')
+
+
+class CompanyBoxStatusCountersSerializer(serializers.Serializer):
+    company = CompanySerializer()
+    boxes = serializers.DictField(child=serializers.IntegerField(), help_text='Количество коробок в каждом статусе')
+    total = serializers.IntegerField(help_text='Количество коробок компании')
@@ -0,0 +1,37 @@
+from collections import Counter
+
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from boxes.counters import apply_box_counters_changes, count_box_save, count_box_delete
+from boxes.models import Box, DeletedBox
+from orders.models import Order
+from orders.utils import touch_orders
+
+
+@receiver(post_save, sender=Box)
+def update_box_counters_on_save(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        old_order_id = getattr(instance, '_loaded_counted_values', (instance.order_id,))[0]
+        count_box_save(instance, created)
+        touch_orders((instance.order_id, old_order_id))
+
+
+@receiver(post_delete, sender=Box)
+def update_box_counters_on_delete(sender, instance, **kwargs):
+    count_box_delete(instance)
+    touch_orders((instance.order_id,))
+    DeletedBox.objects.create(
+        object_id=instance.id,
+        company_id=Order.objects.filter(id=instance.order_id).values_list('company_id', flat=True).first(),
+    )
+
+
+@receiver(pre_delete, sender=Order)
+def create_deleted_boxes_of_order(sender, instance, **kwargs):
+    # коробки удаленного заказа остаются без заказа и больше не относятся к компании
+    boxes = list(instance.boxes.values_list('id', 'status'))
+    DeletedBox.objects.bulk_create([DeletedBox(object_id=box_id, company_id=instance.company_id)
+                                    for box_id, _ in boxes])
+    apply_box_counters_changes({(instance.company_id, status): -count
+                                for status, count in Counter(status for _, status in boxes).items()})
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+
+
+class BoxBulkCreateTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company1 = Company.objects.create(name='Компания 1')
+        self.company2 = Company.objects.create(name='Компания 2')
+        self.user1 = get_user_model().objects.create(username='user1', company=self.company1)
+        self.user2 = get_user_model().objects.create(username='user2', company=self.company2)
+        self.order1 = Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1',
+                                           user=self.user1, company=self.company1)
+        self.order2 = Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                                           user=self.user1, company=self.company1)
+        self.order_of_user2 = Order.objects.create(client_tracking='3', recipient_order_num='3',
+                                                   logistic_tracking='3', user=self.user2, company=self.company2)
+        Box.objects.create(order=self.order1, client_code='existing', code='existing')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('box:box-bulk')
+
+    def test_unauthorised(self):
+        response = self.client.post(self.url, data=[], format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test(self):
+        data = [{'order_id': (self.order1.id, self.order2.id)[i % 2], 'client_code': f'{i}', 'code': f'{i}',
+                 'weight': i} for i in range(300)]
+        self.client.force_authenticate(self.user1)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, data=data, format='json')
+        self.assertLess(len(context), 15)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['errors'], [])
+        created = response.json()['created']
+        self.assertEqual([item['index'] for item in created], list(range(300)))
+        boxes = Box.objects.in_bulk([item['id'] for item in created])
+        for item in created:
+            box = boxes[item['id']]
+            self.assertEqual(box.client_code, item['client_code'])
+            self.assertEqual(box.order_id, data[item['index']]['order_id'])
+            self.assertEqual(box.status, Box.StatusChoices.NEW)
+
+    def test_item_errors(self):
+        data = [
+            {'order_id': self.order1.id, 'client_code': 'a', 'code': 'a'},
+            {'order_id': self.order_of_user2.id, 'client_code': 'b', 'code': 'b'},
+            {'order_id': 0, 'client_code': 'c', 'code': 'c'},
+            {'order_id': self.order1.id, 'client_code': 'existing', 'code': 'd'},
+            {'order_id': self.order1.id, 'client_code': 'a', 'code': 'e'},
+            {'order_id': self.order1.id, 'client_code': 'f'},
+        ]
+        self.client.force_authenticate(self.user1)
+        response = self.client.post(self.url, data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['index'] for item in response.json()['created']], [0])
+        self.assertEqual(
+            [item['index'] for item in response.json()['errors']],
+            [1, 2, 3, 4, 5]
+        )
+        errors = {item['index']: item['errors'] for item in response.json()['errors']}
+        self.assertEqual(errors[1], {'order_id': ["An order with this id does not belong to the user's company."]})
+        self.assertEqual(list(errors[3]), ['client_code'])
+        self.assertEqual(errors[4], {'client_code': ['The batch already has a box with this code.']})
+        self.assertEqual(errors[5], {'code': ['This field is required.']})
+        self.assertEqual(Box.objects.count(), 2)
@@ -0,0 +1,95 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box, BoxStatusCounter
+from companies.models import Company
+from orders.models import Order
+
+
+class BoxStatusCountersTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company1 = Company.objects.create(name='Компания 1')
+        self.company2 = Company.objects.create(name='Компания 2')
+        self.transport_company = Company.objects.create(name='Транспортная компания', is_transport_company=True)
+        self.user1 = get_user_model().objects.create(username='user1', company=self.company1)
+        self.user2 = get_user_model().objects.create(username='user2', company=self.company2)
+        self.user_of_transport_company = get_user_model().objects.create(username='user3',
+                                                                         company=self.transport_company)
+        self.order1 = Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1',
+                                           user=self.user1, company=self.company1)
+        self.order2 = Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                                           user=self.user2, company=self.company2)
+
+    def get_counters(self):
+        return {(counter.company_id, counter.status): counter.value
+                for counter in BoxStatusCounter.objects.exclude(value=0)}
+
+    def assertCountersRebuildable(self):
+        counters = self.get_counters()
+        call_command('rebuild_box_counters', stdout=StringIO())
+        self.assertEqual(counters, self.get_counters())
+
+    def test_counters_maintained(self):
+        self.client.force_authenticate(self.user1)
+        self.client.post(reverse('box:box-list'), data={'order_id': self.order1.id, 'client_code': '1', 'code': '1'})
+        self.client.post(reverse('box:box-bulk'), format='json', data=[
+            {'order_id': self.order1.id, 'client_code': f'bulk{i}', 'code': '1'} for i in range(5)])
+        self.assertEqual(self.get_counters(), {(self.company1.id, Box.StatusChoices.NEW): 6})
+        self.assertCountersRebuildable()
+
+        boxes_ids = list(Box.objects.values_list('id', flat=True)[:3])
+        response = self.client.post(reverse('shipment:shipment-list'), format='json', data={
+            'waybill_num': '1', 'waybill_date': '2021-03-01T00:00:00', 'boxes_ids': boxes_ids})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.get_counters(), {(self.company1.id, Box.StatusChoices.NEW): 3,
+                                               (self.company1.id, Box.StatusChoices.SORTING): 3})
+        self.assertCountersRebuildable()
+
+        box = Box.objects.get(id=boxes_ids[0])
+        box.status = Box.StatusChoices.DELIVERING
+        box.order = self.order2
+        box.save()
+        Box.objects.get(id=boxes_ids[1]).delete()
+        self.assertEqual(self.get_counters(), {(self.company1.id, Box.StatusChoices.NEW): 3,
+                                               (self.company1.id, Box.StatusChoices.SORTING): 1,
+                                               (self.company2.id, Box.StatusChoices.DELIVERING): 1})
+        self.assertCountersRebuildable()
+
+    def test_order_deleted(self):
+        """Коробки удаленного заказа больше не относятся к компании"""
+        Box.objects.create(order=self.order1, client_code='1', code='1')
+        Box.objects.create(order=self.order1, client_code='2', code='2')
+        Box.objects.create(order=self.order1, client_code='3', code='3', status=Box.StatusChoices.DONE)
+        Box.objects.create(order=self.order2, client_code='4', code='4')
+        self.client.force_authenticate(self.user1)
+        response = self.client.delete(reverse('order:order-detail', args=(self.order1.id,)))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.get_counters(), {(self.company2.id, Box.StatusChoices.NEW): 1})
+        self.assertCountersRebuildable()
+        response = self.client.get(reverse('box:box-counters'))
+        self.assertEqual([item['total'] for item in response.json() if item['total']], [])
+
+    def test_endpoint(self):
+        Box.objects.create(order=self.order1, client_code='1', code='1')
+        Box.objects.create(order=self.order1, client_code='2', code='2', status=Box.StatusChoices.DONE)
+        Box.objects.create(order=self.order2, client_code='3', code='3')
+        url = reverse('box:box-counters')
+
+        self.client.force_authenticate(self.user1)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{
+            'company': {'id': self.company1.id, 'name': self.company1.name},
+            'boxes': {**dict.fromkeys(Box.StatusChoices.values, 0), 'NEW': 1, 'DONE': 1},
+            'total': 2,
+        }])
+
+        self.client.force_authenticate(self.user_of_transport_company)
+        response = self.client.get(url)
+        self.assertEqual([(item['company']['id'], item['total']) for item in response.json()],
+                         [(self.company1.id, 2), (self.company2.id, 1)])
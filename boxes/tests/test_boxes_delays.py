@@ -0,0 +1,132 @@
+import datetime
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from boxes.delays import DELAYABLE_STATUSES, delay_overdue_boxes
+from boxes.transitions import transition_boxes
+from boxes.models import Box, BoxStatusCounter
+from companies.models import Company
+from events.models import Event
+from orders.management.commands.explain_api_queries import explain_sql
+from orders.models import DELAY_CANDIDATES, HAS_PENDING_BOXES, Order
+
+Status = Box.StatusChoices
+
+
+class DelayOverdueBoxesTestCase(TestCase):
+    """Автоматический перевод коробок просроченных заказов в DELAYED"""
+
+    def setUp(self) -> None:
+        self.now = timezone.make_aware(datetime.datetime(2021, 3, 10, 12, 0))
+        self.company = Company.objects.create(name='Компания 1')
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        self.system_user = get_user_model().objects.create(username='system')
+
+    def create_order(self, num, shipping_date, shipping_time=None, statuses=(Status.NEW,)):
+        order = Order.objects.create(client_tracking=num, recipient_order_num=num, logistic_tracking=num,
+                                     user=self.user, company=self.company,
+                                     shipping_date=shipping_date, shipping_time=shipping_time)
+        for i, status in enumerate(statuses):
+            Box.objects.create(order=order, client_code=f'{num}-{i}', code=f'{num}-{i}', status=status)
+        return order
+
+    def get_statuses(self, order):
+        return sorted(order.boxes.values_list('status', flat=True))
+
+    def test_delay_overdue_boxes(self):
+        today = self.now.date()
+        overdue = self.create_order('1', today - datetime.timedelta(days=1),
+                                    statuses=(Status.NEW, Status.SORTING, Status.DONE, Status.CANCELED))
+        overdue_today = self.create_order('2', today, datetime.time(11, 30), statuses=(Status.DELIVERING,))
+        not_due = self.create_order('3', today, datetime.time(12, 30))
+        without_date = self.create_order('4', None)
+        done = self.create_order('5', today - datetime.timedelta(days=2), statuses=(Status.DONE,))
+
+        results = list(delay_overdue_boxes(self.system_user, now=self.now))
+        self.assertEqual(results, [{'orders': 2, 'boxes': 3}])
+        self.assertEqual(self.get_statuses(overdue), sorted([Status.DELAYED, Status.DELAYED, Status.DONE,
+                                                             Status.CANCELED]))
+        self.assertEqual(self.get_statuses(overdue_today), [Status.DELAYED])
+        self.assertEqual(self.get_statuses(not_due), [Status.NEW])
+        self.assertEqual(self.get_statuses(without_date), [Status.NEW])
+        self.assertEqual(self.get_statuses(done), [Status.DONE])
+        self.assertEqual(set(Event.objects.filter(status=Status.DELAYED).values_list('order_id', 'user_id')),
+                         {(overdue.id, self.system_user.id), (overdue_today.id, self.system_user.id)})
+
+        # счетчики и статус заказа обновлены
+        overdue.refresh_from_db()
+        self.assertEqual((overdue.aggregate_status, overdue.boxes_delayed, overdue.boxes_new), (Status.DELAYED, 2, 0))
+        self.assertEqual(BoxStatusCounter.objects.get(company=self.company, status=Status.DELAYED).value, 3)
+        self.assertFalse(Order.objects.filter(HAS_PENDING_BOXES, id=overdue.id).exists())
+
+        # повторный запуск ничего не меняет
+        self.assertEqual(list(delay_overdue_boxes(self.system_user, now=self.now)), [])
+        self.assertEqual(Event.objects.filter(status=Status.DELAYED).count(), 2)
+
+        # допуск: заказ 3 просрочен на 30 минут
+        later = self.now + datetime.timedelta(hours=1)
+        self.assertEqual(list(delay_overdue_boxes(self.system_user, now=later, grace=datetime.timedelta(minutes=31))),
+                         [])
+        self.assertEqual(list(delay_overdue_boxes(self.system_user, now=later)), [{'orders': 1, 'boxes': 1}])
+
+    def test_resumed_boxes_not_delayed_again(self):
+        """Коробка продолжила путь из DELAYED: заказ больше не проверяется, пока не изменен срок подачи"""
+        order = self.create_order('1', self.now.date() - datetime.timedelta(days=1), statuses=(Status.NEW,))
+        self.assertEqual(list(delay_overdue_boxes(self.system_user, now=self.now)), [{'orders': 1, 'boxes': 1}])
+        result = transition_boxes(self.user, Status.SORTING, ids=order.boxes.values_list('id', flat=True))
+        self.assertEqual(len(result['updated']), 1)
+
+        later = self.now + datetime.timedelta(minutes=1)
+        self.assertEqual(list(delay_overdue_boxes(self.system_user, now=later)), [])
+        self.assertEqual(self.get_statuses(order), [Status.SORTING])
+        self.assertEqual(Event.objects.filter(status=Status.DELAYED).count(), 1)
+        self.assertFalse(Order.objects.filter(DELAY_CANDIDATES, id=order.id).exists())
+
+        # новый срок подачи: после его истечения коробки снова задерживаются
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.patch(reverse('order:order-detail', kwargs={'pk': order.id}),
+                                data={'shipping_date': str(self.now.date())}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        order.refresh_from_db()
+        self.assertIsNone(order.delayed_at)
+        self.assertEqual(list(delay_overdue_boxes(self.system_user, now=later)), [])
+        self.assertEqual(list(delay_overdue_boxes(self.system_user, now=later + datetime.timedelta(days=1))),
+                         [{'orders': 1, 'boxes': 1}])
+
+    def test_batches(self):
+        orders = [self.create_order(str(i), self.now.date() - datetime.timedelta(days=1 + i % 3),
+                                    statuses=(Status.NEW, Status.READY_FOR_SHIPPING))
+                  for i in range(1, 8)]
+        with CaptureQueriesContext(connection) as context:
+            results = list(delay_overdue_boxes(self.system_user, now=self.now, batch_size=3))
+        self.assertEqual(results, [{'orders': 3, 'boxes': 6}, {'orders': 3, 'boxes': 6}, {'orders': 1, 'boxes': 2}])
+        self.assertEqual(Box.objects.filter(status=Status.DELAYED).count(), 14)
+        self.assertEqual(Event.objects.count(), len(orders))
+        # количество запросов на пакет не зависит от количества коробок и заказов
+        self.assertLess(len(context), 3 * 20)
+
+    def test_index_scan(self):
+        self.assertEqual(set(DELAYABLE_STATUSES),
+                         {status for status, field in Order.BOX_COUNT_FIELDS.items() if f'{field}__gt' in
+                          dict(HAS_PENDING_BOXES.children)})
+        self.create_order('1', self.now.date() - datetime.timedelta(days=1))
+        with CaptureQueriesContext(connection) as context:
+            list(delay_overdue_boxes(self.system_user, now=self.now))
+        plan = explain_sql(context.captured_queries[0]['sql'])
+        self.assertIn('order_pending_shipping_idx', plan)
+
+    def test_command(self):
+        self.create_order('1', self.now.date() - datetime.timedelta(days=1), statuses=(Status.SORTING, Status.NEW))
+        stdout = StringIO()
+        call_command('detect_delayed_boxes', '--username', 'system', stdout=stdout)
+        self.assertEqual(stdout.getvalue().strip(), 'Delayed 2 boxes in 1 orders')
+        self.assertEqual(Box.objects.filter(status=Status.DELAYED).count(), 2)
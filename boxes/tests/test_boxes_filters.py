@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+from orders.tests.query_budget import QueryPlanMixin
+from shipments.models import Shipment
+
+
+class BoxFiltersTestCase(QueryPlanMixin, APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.other_company = Company.objects.create(name='Компания 2')
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        other_user = get_user_model().objects.create(username='user2', company=self.other_company)
+        orders = [Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking=str(user.id),
+                                       user=user, company=user.company) for user in (self.user, other_user)]
+        self.shipment = Shipment.objects.create(waybill_num='1', waybill_date='2021-03-01T00:00:00Z')
+        self.boxes = [Box.objects.create(
+            order=orders[i // 10],
+            client_code=f'client{i}',
+            code=f'code{i}',
+            status=Box.StatusChoices.SORTING if i % 3 == 0 else Box.StatusChoices.NEW,
+            shipment=self.shipment if i % 2 == 0 else None,
+        ) for i in range(20)]
+        self.client.force_authenticate(self.user)
+
+    def get_ids(self, params):
+        response = self.assertIndexScans(reverse('box:box-list'), {'page_size': 100, **params})
+        return [box['id'] for box in response.json()['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.get_ids({'status': 'SORTING'}), [box.id for box in self.boxes[0:10:3]])
+        self.assertEqual(self.get_ids({'shipment': self.shipment.id}), [box.id for box in self.boxes[0:10:2]])
+        self.assertEqual(self.get_ids({'shipment': self.shipment.id, 'status': 'SORTING'}),
+                         [self.boxes[0].id, self.boxes[6].id])
+
+    def test_barcode(self):
+        self.assertEqual(self.get_ids({'client_code': 'client3'}), [self.boxes[3].id])
+        self.assertEqual(self.get_ids({'code': 'code4'}), [self.boxes[4].id])
+        self.assertEqual(self.get_ids({'barcode': 'code5'}), [self.boxes[5].id])
+        self.assertEqual(self.get_ids({'barcode': 'client5'}), [self.boxes[5].id])
+        # коробка другой компании
+        self.assertEqual(self.get_ids({'barcode': 'code15'}), [])
+
+    def test_invalid_values(self):
+        response = self.client.get(reverse('box:box-list'), {'status': 'LOST', 'shipment': 'x'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.json()), {'status', 'shipment'})
@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+
+
+@override_settings(MODIFIED_SINCE_LAG=0)
+class BoxSyncTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        self.order1 = Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1',
+                                           user=self.user, company=self.company)
+        self.order2 = Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                                           user=self.user, company=self.company)
+        self.boxes = [Box.objects.create(order=self.order1 if i < 3 else self.order2, client_code=str(i), code=str(i))
+                      for i in range(5)]
+        self.since = timezone.now()
+        Box.objects.update(update=self.since - timedelta(hours=1))
+        self.params = {'modified_since': self.since.isoformat()}
+
+    def get_results(self, name):
+        response = self.client.get(reverse(f'box:{name}'), self.params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()['results']
+
+    def test_modified_since(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.get_results('box-list'), [])
+
+        self.client.patch(reverse('box:box-detail', kwargs={'pk': self.boxes[2].id}), data={'code': 'new'})
+        self.client.post(reverse('shipment:shipment-list'), format='json', data={
+            'waybill_num': '1', 'waybill_date': timezone.now().isoformat(), 'boxes_ids': [self.boxes[0].id]})
+        results = self.get_results('box-list')
+        self.assertEqual([box['id'] for box in results], [self.boxes[2].id, self.boxes[0].id])
+        self.assertIn('update', results[0])
+
+    def test_deleted(self):
+        self.client.force_authenticate(self.user)
+        self.client.delete(reverse('box:box-detail', kwargs={'pk': self.boxes[4].id}))
+        self.client.delete(reverse('order:order-detail', kwargs={'pk': self.order1.id}))
+        self.assertEqual(sorted(box['id'] for box in self.get_results('box-deleted')),
+                         sorted(box.id for box in self.boxes[:3] + self.boxes[4:]))
+        self.assertEqual(self.get_results('box-list'), [])
@@ -0,0 +1,108 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box, BoxStatusCounter
+from boxes.transitions import SHIPMENT_ASSIGNABLE_STATUSES, is_transition_allowed, select_boxes_for_update
+from companies.models import Company
+from events.models import Event
+from orders.models import Order
+
+Status = Box.StatusChoices
+
+
+class BoxStatusTransitionTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company1 = Company.objects.create(name='Компания 1')
+        self.company2 = Company.objects.create(name='Компания 2')
+        self.transport_company = Company.objects.create(name='Транспортная компания', is_transport_company=True)
+        self.user1 = get_user_model().objects.create(username='user1', company=self.company1)
+        self.transport_user = get_user_model().objects.create(username='transport', company=self.transport_company)
+        self.order1 = Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1',
+                                           user=self.user1, company=self.company1)
+        self.order2 = Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                                           user=self.user1, company=self.company2)
+        self.boxes = [
+            Box.objects.create(order=self.order1 if i < 20 else self.order2, client_code=f'code{i}', code=str(i),
+                               status=Status.SORTING)
+            for i in range(30)
+        ]
+        self.url = reverse('box:box-transition')
+
+    def test_transition(self):
+        self.client.force_authenticate(self.transport_user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, format='json', data={
+                'status': Status.DELIVERING,
+                'client_codes': [box.client_code for box in self.boxes],
+            })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'updated': [box.id for box in self.boxes], 'unchanged': [], 'errors': []})
+        # не зависит от количества коробок: загрузка, счетчики по компаниям, UPDATE, события
+        self.assertLess(len(context), 20)
+        self.assertEqual(Box.objects.filter(status=Status.DELIVERING).count(), 30)
+        self.assertEqual(set(Event.objects.values_list('order_id', 'status')),
+                         {(self.order1.id, Status.DELIVERING), (self.order2.id, Status.DELIVERING)})
+        self.assertEqual(BoxStatusCounter.objects.get(company=self.company1, status=Status.DELIVERING).value, 20)
+
+        # повторное сканирование не меняет коробки
+        response = self.client.post(self.url, format='json', data={
+            'status': Status.DELIVERING, 'ids': [self.boxes[0].id]})
+        self.assertEqual(response.json(), {'updated': [], 'unchanged': [self.boxes[0].id], 'errors': []})
+        self.assertEqual(Event.objects.count(), 2)
+
+    def test_errors(self):
+        Box.objects.filter(id=self.boxes[1].id).update(status=Status.DONE)
+        self.client.force_authenticate(self.user1)
+        response = self.client.post(self.url, format='json', data={
+            'status': Status.CANCELED,
+            'ids': [self.boxes[0].id, self.boxes[1].id, self.boxes[25].id],
+            'client_codes': ['unknown', self.boxes[2].client_code],
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {
+            'updated': [self.boxes[0].id, self.boxes[2].id],
+            'unchanged': [],
+            'errors': [
+                {'id': self.boxes[1].id, 'errors': ['Transition from DONE to CANCELED is not allowed.']},
+                {'id': self.boxes[25].id, 'errors': ['Box does not exist.']},
+                {'client_code': 'unknown', 'errors': ['Box does not exist.']},
+            ],
+        })
+        self.assertEqual(Box.objects.get(id=self.boxes[25].id).status, Status.SORTING)
+
+    def test_invalid_request(self):
+        self.client.force_authenticate(self.user1)
+        response = self.client.post(self.url, format='json', data={'status': Status.CANCELED})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, format='json', data={'status': 'LOST', 'ids': [self.boxes[0].id]})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_client_statuses(self):
+        """Компания-заказчик не может провести свои коробки через сортировку и доставку"""
+        self.client.force_authenticate(self.user1)
+        for status_ in (Status.DELIVERING, Status.DONE, Status.SORTING, Status.DELAYED):
+            response = self.client.post(self.url, format='json', data={'status': status_, 'ids': [self.boxes[0].id]})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), {'status': [f'Only a transport company can set the {status_} status.']})
+        self.assertEqual(Box.objects.get(id=self.boxes[0].id).status, Status.SORTING)
+        self.assertFalse(Event.objects.exists())
+
+    def test_lock_only_boxes(self):
+        """PostgreSQL: FOR UPDATE для LEFT OUTER JOIN заказа - ошибка, блокируются только коробки"""
+        queryset = select_boxes_for_update(Box.objects.filter(id__in=[box.id for box in self.boxes]))
+        with mock.patch.multiple(connection.features, has_select_for_update=True, has_select_for_update_of=True):
+            sql, _ = queryset.query.get_compiler(connection=connection).as_sql()
+        self.assertIn('LEFT OUTER JOIN "orders_order"', sql)
+        self.assertTrue(sql.endswith('FOR UPDATE OF "boxes_box"'), sql)
+
+    def test_shipment_assignable_statuses(self):
+        for status_ in SHIPMENT_ASSIGNABLE_STATUSES:
+            self.assertTrue(is_transition_allowed(status_, Status.SORTING))
+        self.assertTrue(is_transition_allowed(Status.DELAYED, Status.SORTING))
+        self.assertNotIn(Status.DELAYED, SHIPMENT_ASSIGNABLE_STATUSES)
@@ -0,0 +1,103 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from boxes.counters import apply_boxes_changes
+from boxes.models import Box
+from events.channels import publish_events
+from events.models import Event
+from orders.utils import touch_orders
+
+Status = Box.StatusChoices
+
+# допустимые переходы статусов коробки: текущий статус -> статусы, в которые можно перевести
+# DELAYED - из любого незавершенного статуса (boxes.delays), из DELAYED коробка продолжает путь
+BOX_STATUS_TRANSITIONS = {
+    Status.NEW: {Status.READY_FOR_SHIPPING, Status.SORTING, Status.DELAYED, Status.CANCELED},
+    Status.READY_FOR_SHIPPING: {Status.SORTING, Status.DELAYED, Status.CANCELED},
+    Status.SORTING: {Status.DELIVERING, Status.DELAYED, Status.CANCELED},
+    Status.DELIVERING: {Status.DONE, Status.DELAYED, Status.CANCELED},
+    Status.DELAYED: {Status.READY_FOR_SHIPPING, Status.SORTING, Status.DELIVERING, Status.DONE, Status.CANCELED},
+    Status.DONE: set(),
+    Status.CANCELED: set(),
+}
+
+# статусы коробок, которые можно добавить в отправление (перевод в SORTING, shipments.serializers):
+# задержанная коробка переходит в SORTING только сканированием на складе, не добавлением в отправление
+SHIPMENT_ASSIGNABLE_STATUSES = (Status.NEW, Status.READY_FOR_SHIPPING)
+
+
+# статусы, в которые может переводить коробки компания-заказчик (boxes.views.BoxViewSet.transition),
+# остальные переходы - сканирование на сортировочном центре транспортной компанией
+CLIENT_TARGET_STATUSES = (Status.READY_FOR_SHIPPING, Status.CANCELED)
+
+def is_transition_allowed(current_status, status):
+    return status in BOX_STATUS_TRANSITIONS.get(current_status, ())
+
+
+def select_boxes_for_update(queryset, *fields):
+    """Коробки с компанией заказа для apply_boxes_status_change, с блокировкой только строк коробок:
+    заказ присоединяется LEFT OUTER JOIN (Box.order может быть пустым), а PostgreSQL не допускает
+    FOR UPDATE для nullable-стороны внешнего соединения"""
+    return queryset.select_for_update(of=('self',)).values('id', 'status', 'order_id', 'order__company_id', *fields)
+
+
+def transition_boxes(user, status, ids=(), client_codes=(), comments=''):
+    """Пакетный перевод коробок в статус status по id и client_code.
+
+    Коробки загружаются одним запросом с блокировкой строк, переходы проверяются в памяти,
+    статус меняется одним UPDATE, события заказов вставляются одним запросом.
+    Возвращает id измененных коробок, id коробок, уже находящихся в статусе, и ошибки по элементам."""
+    ids, client_codes = list(dict.fromkeys(ids)), list(dict.fromkeys(client_codes))
+    is_transport_company = bool(user.company and user.company.is_transport_company)
+    errors = []
+    with transaction.atomic():
+        boxes = list(select_boxes_for_update(Box.objects.filter(Q(id__in=ids) | Q(client_code__in=client_codes)),
+                                             'client_code'))
+        boxes_by_id = {box['id']: box for box in boxes}
+        boxes_by_client_code = {box['client_code']: box for box in boxes}
+
+        updated, unchanged = {}, {}
+        for key, values, found in (('id', ids, boxes_by_id), ('client_code', client_codes, boxes_by_client_code)):
+            for value in values:
+                box = found.get(value)
+                if box is None or not (is_transport_company or box['order__company_id'] == user.company_id):
+                    errors.append({key: value, 'errors': ['Box does not exist.']})
+                elif box['id'] in updated or box['id'] in unchanged:
+                    continue
+                elif box['status'] == status:
+                    unchanged[box['id']] = box
+                elif not is_transition_allowed(box['status'], status):
+                    errors.append({key: value, 'errors': [f'Transition from {box["status"]} to {status} '
+                                                          f'is not allowed.']})
+                else:
+                    updated[box['id']] = box
+
+        apply_boxes_status_change(updated.values(), status, user, comments)
+    return {'updated': list(updated), 'unchanged': list(unchanged), 'errors': errors}
+
+
+def apply_boxes_status_change(boxes, status, user, comments=''):
+    """Перевод уже проверенных коробок в статус status, вызывается внутри транзакции.
+
+    boxes - словари с ключами id, status, order_id, order__company_id. Счетчики компаний и заказов
+    меняются по изменениям, посчитанным в памяти, статус коробок меняется одним UPDATE, статус и дата
+    изменения заказов - одним UPDATE, события заказов вставляются одним запросом"""
+    boxes = list(boxes)
+    if not boxes:
+        return []
+    changes = Counter()
+    for box in boxes:
+        changes[box['order_id'], box['order__company_id'], box['status']] -= 1
+        changes[box['order_id'], box['order__company_id'], status] += 1
+    apply_boxes_changes(changes)
+    Box.objects.filter(id__in=[box['id'] for box in boxes]).update(status=status, update=timezone.now())
+    orders_ids = list(dict.fromkeys(box['order_id'] for box in boxes if box['order_id']))
+    touch_orders(orders_ids)
+    events = Event.objects.bulk_create([
+        Event(status=status, order_id=order_id, comments=comments, user=user) for order_id in orders_ids
+    ])
+    publish_events(events)
+    return events
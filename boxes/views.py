@@ -1,11 +1,20 @@
 from django.utils.decorators import method_decorator
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import viewsets
+from rest_framework import viewsets, status, serializers
+from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-from boxes.models import Box
-from boxes.serializers import BoxListRetrieveSerializer, BoxCreateSerializer, BoxUpdateSerializer
+from boxes.models import Box, BoxStatusCounter, DeletedBox
+from boxes.serializers import BoxListRetrieveSerializer, BoxCreateSerializer, BoxUpdateSerializer, \
+    BoxBulkCreateSerializer, CompanyBoxStatusCountersSerializer, BoxChangesSerializer, BoxStatusTransitionSerializer, \
+    BoxStatusTransitionResultSerializer
+from boxes.transitions import transition_boxes
+from carrier_accounting_system.filters import QueryParamsFilterBackend
+from carrier_accounting_system.utils import ModifiedSinceMixin, TombstoneSerializer
+from carrier_accounting_system.values_serializers import ValuesSerializerMixin
+from orders.paginations import PageNumberOrCursorPagination, ChangesPagination
 from users.permissions import IsUserNotBlocked
 
 
@@ -14,12 +23,27 @@ from users.permissions import IsUserNotBlocked
     #operation_description="description from swagger_auto_schema via method_decorator",
     responses={401: 'Authorization information is missing or invalid.'}
 ))
-class BoxViewSet(viewsets.ModelViewSet):
+class BoxViewSet(ModifiedSinceMixin, ValuesSerializerMixin, viewsets.ModelViewSet):
     serializer_class = BoxListRetrieveSerializer
+    pagination_class = PageNumberOrCursorPagination
+    changes_pagination_class = ChangesPagination
+    tombstone_model = DeletedBox
+    filter_backends = [QueryParamsFilterBackend]
+    query_filters = {
+        'status': ('status', serializers.ChoiceField(Box.StatusChoices.choices, help_text='Состояние коробки')),
+        'shipment': ('shipment_id', serializers.IntegerField(help_text='Идентификатор отправления')),
+        'client_code': ('client_code', serializers.CharField(help_text='Код коробки в системе заказчика')),
+        'code': ('code', serializers.CharField(help_text='Маркировка')),
+        # сканирование штрихкода: неизвестно, чья это маркировка - заказчика или транспортной компании
+        'barcode': (('client_code', 'code'), serializers.CharField(help_text='Код коробки или маркировка')),
+    }
     permission_classes = [IsAuthenticated, IsUserNotBlocked]
 
     def get_queryset(self):
-        return Box.objects.filter(order__company=self.request.user.company)
+        return Box.objects.filter(order__company=self.request.user.company).order_by('id')
+
+    def get_company_filter(self):
+        return {'company': self.request.user.company}
 
     def get_object(self):
         return get_object_or_404(Box, order__company=self.request.user.company, id=self.kwargs['pk'])
@@ -28,6 +52,55 @@ class BoxViewSet(viewsets.ModelViewSet):
         if self.action in ('create',):
             return BoxCreateSerializer
         elif self.action in ('list', 'retrieve'):
+            if self.is_changes_request():
+                return BoxChangesSerializer
             return BoxListRetrieveSerializer
         elif self.action in ('update', 'partial_update'):
             return BoxUpdateSerializer
+        elif self.action in ('bulk',):
+            return BoxBulkCreateSerializer
+        elif self.action in ('counters',):
+            return CompanyBoxStatusCountersSerializer
+        elif self.action in ('deleted',):
+            return TombstoneSerializer
+        elif self.action in ('transition',):
+            return BoxStatusTransitionSerializer
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Пакетная регистрация коробок. Принимает массив коробок, ошибки возвращаются для каждого элемента"""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        boxes = serializer.save() if serializer.validated_data else []
+        return Response(serializer.get_bulk_result(boxes, ('id', 'client_code')),
+                        status=status.HTTP_201_CREATED if boxes else status.HTTP_400_BAD_REQUEST)
+
+    @swagger_auto_schema(responses={200: BoxStatusTransitionResultSerializer()})
+    @action(detail=False, methods=['post'])
+    def transition(self, request):
+        """Пакетный перевод коробок в статус (сканирование на сортировочном центре).
+
+        Недопустимые переходы и ненайденные коробки возвращаются в errors, остальные коробки переводятся.
+        Транспортная компания может переводить коробки всех компаний в любой статус,
+        компания-заказчик - только свои коробки и только в READY_FOR_SHIPPING и CANCELED"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = transition_boxes(request.user, **serializer.validated_data)
+        return Response(BoxStatusTransitionResultSerializer(result).data)
+
+    @action(detail=False, methods=['get'])
+    def counters(self, request):
+        """Количество коробок по статусам для компании пользователя, для транспортной компании - для всех компаний"""
+        counters = BoxStatusCounter.objects.select_related('company').order_by('company_id')
+        if not (request.user.company and request.user.company.is_transport_company):
+            counters = counters.filter(company=request.user.company)
+        companies = {}
+        for counter in counters:
+            company = companies.setdefault(counter.company_id, {
+                'company': counter.company,
+                'boxes': dict.fromkeys(Box.StatusChoices.values, 0),
+                'total': 0,
+            })
+            company['boxes'][counter.status] = counter.value
+            company['total'] += counter.value
+        return Response(self.get_serializer(companies.values(), many=True).data)
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'carrier_accounting_system.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# импорт после инициализации Django: приложение потока событий использует модели
+from events.asgi import EventStreamApplication  # noqa: E402
+
+application = EventStreamApplication(django_application)
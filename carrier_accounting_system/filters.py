@@ -0,0 +1,44 @@
+import coreapi
+import coreschema
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class QueryParamsFilterBackend(BaseFilterBackend):
+    """Фильтры списка по параметрам запроса из атрибута query_filters представления:
+    {параметр: (поиск ORM или кортеж поисков, объединяемых через ИЛИ; поле DRF для разбора значения)}.
+
+    Каждому фильтру должен соответствовать индекс, см. тесты с проверкой планов запросов (EXPLAIN)"""
+    actions = ('list',)
+
+    def filter_queryset(self, request, queryset, view):
+        if getattr(view, 'action', None) not in self.actions:
+            return queryset
+        errors = {}
+        for param, (lookups, field) in getattr(view, 'query_filters', {}).items():
+            value = request.query_params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                value = field.run_validation(value)
+            except serializers.ValidationError as exc:
+                errors[param] = exc.detail
+                continue
+            if isinstance(lookups, str):
+                lookups = (lookups,)
+            condition = Q()
+            for lookup in lookups:
+                condition |= Q(**{lookup: value})
+            queryset = queryset.filter(condition)
+        if errors:
+            raise ValidationError(errors)
+        return queryset
+
+    def get_schema_fields(self, view):
+        return [
+            coreapi.Field(name=param, required=False, location='query',
+                          schema=coreschema.String(description=str(field.help_text or '')))
+            for param, (lookups, field) in getattr(view, 'query_filters', {}).items()
+        ]
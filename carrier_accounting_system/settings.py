@@ -86,7 +86,7 @@ USE_TZ = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
@@ -97,6 +97,23 @@ REST_FRAMEWORK = {
 
 AUTH_USER_MODEL = 'users.User'
 
+# кэш токенов аутентификации вместе с пользователем и компанией, см. users.authentication;
+# в продакшене кэш должен быть общим для всех процессов (Redis, Memcached), см. manage.py check --deploy
+AUTH_TOKEN_CACHE_ALIAS = 'default'
+AUTH_TOKEN_CACHE_TIMEOUT = 60
+
+# ?modified_since=: отдаются записи, измененные не позже чем столько секунд назад (дольше самой длинной транзакции),
+# см. carrier_accounting_system.utils.ModifiedSinceMixin
+MODIFIED_SINCE_LAG = 60
+
+# поток событий заказов /api/v1/events/stream/ (ASGI), см. events.asgi и events.channels
+EVENTS_CHANNEL_LAYER = 'events.channels.InMemoryChannelLayer'
+EVENTS_STREAM_KEEPALIVE = 15
+# опрос БД в ожидании событий: события, созданные другими процессами (WSGI-воркерами)
+EVENTS_STREAM_POLL_INTERVAL = 2
+# время действия билета ?ticket= для подключения к потоку событий
+EVENTS_STREAM_TICKET_MAX_AGE = 60
+
 SWAGGER_SETTINGS = {
     'DEFAULT_AUTO_SCHEMA_CLASS': 'carrier_accounting_system.utils.ReadWriteAutoSchema',
 }
@@ -34,6 +34,7 @@ urlpatterns_api_v1 = [
     path('users/', include(('users.urls', 'user'))),
     path('boxes/', include(('boxes.urls', 'box'))),
     path('shipments/', include(('shipments.urls', 'shipment'))),
+    path('events/', include(('events.urls', 'event'))),
     path('docs/', schema_view.with_ui('swagger', cache_timeout=0)),
 ]
 
@@ -1,7 +1,15 @@
 from collections import OrderedDict
+from datetime import timedelta
 
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from drf_yasg.inspectors import SwaggerAutoSchema
 from drf_yasg.utils import no_body
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 
 
 class ReadOnly():
@@ -49,3 +57,157 @@ class ReadWriteAutoSchema(SwaggerAutoSchema):
 
         new_serializer = CustomSerializer(data=serializer.data)
         return new_serializer
+
+
+class BulkCreateListSerializer(serializers.ListSerializer):
+    """Пакетное создание объектов с ошибками валидации для каждого элемента отдельно.
+
+    item_errors: индекс элемента -> ошибки, item_indexes: индексы элементов, прошедших валидацию,
+    в порядке validated_data. Объекты без ошибок создаются, пакет целиком не отклоняется."""
+    max_length = 1000
+
+    default_error_messages = {
+        'max_length': 'Ensure this list has no more than {max_length} items.',
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            message = self.error_messages['not_a_list'].format(input_type=type(data).__name__)
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='not_a_list')
+        if not data:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [self.error_messages['empty']]}, code='empty')
+        if len(data) > self.max_length:
+            message = self.error_messages['max_length'].format(max_length=self.max_length)
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [message]}, code='max_length')
+
+        self.item_errors = {}
+        self.item_indexes = []
+        ret = []
+        for index, item in enumerate(data):
+            try:
+                ret.append(self.child.run_validation(item))
+            except ValidationError as exc:
+                self.item_errors[index] = exc.detail
+            else:
+                self.item_indexes.append(index)
+        return ret
+
+    def exclude_items(self, attrs, get_item_errors):
+        """Исключает элементы, для которых get_item_errors вернул ошибки"""
+        ret = []
+        item_indexes = []
+        for index, item in zip(self.item_indexes, attrs):
+            errors = get_item_errors(item)
+            if errors:
+                self.item_errors[index] = errors
+            else:
+                ret.append(item)
+                item_indexes.append(index)
+        self.item_indexes = item_indexes
+        return ret
+
+    @staticmethod
+    def set_missing_pks(instances, unique_field):
+        """bulk_create не возвращает id на бэкендах без RETURNING (SQLite), получаем их по уникальному полю"""
+        if not instances or instances[0].pk is not None:
+            return
+        model = instances[0].__class__
+        ids = dict(model.objects.filter(**{f'{unique_field}__in': [getattr(instance, unique_field)
+                                                                    for instance in instances]})
+                   .values_list(unique_field, 'id'))
+        for instance in instances:
+            instance.pk = ids[getattr(instance, unique_field)]
+
+    def get_bulk_result(self, instances, fields):
+        return {
+            'created': [
+                {'index': index, **{field: getattr(instance, field) for field in fields}}
+                for index, instance in zip(self.item_indexes, instances)
+            ],
+            'errors': [
+                {'index': index, 'errors': errors} for index, errors in sorted(self.item_errors.items())
+            ],
+        }
+
+
+def parse_datetime_query_param(request, query_param):
+    """Дата и время из параметра запроса в формате ISO 8601, None если параметр не передан"""
+    value = request.query_params.get(query_param)
+    if not value:
+        return None
+    try:
+        result = parse_datetime(value)
+    except ValueError:
+        result = None
+    if result is None:
+        raise ValidationError({query_param: ['Неверный формат даты и времени.']})
+    return result
+
+
+class TombstoneSerializer(serializers.Serializer):
+    id = serializers.IntegerField(source='object_id')
+    deleted_at = serializers.DateTimeField()
+
+
+class ModifiedSinceMixin:
+    """Инкрементальная синхронизация для ModelViewSet.
+
+    ?modified_since= в списке возвращает только записи, измененные после указанного момента,
+    с пагинацией по курсору (modified_field, id). Действие deleted возвращает удаленные записи
+    (tombstones из tombstone_model) после того же момента. Представление определяет get_company_filter.
+
+    Время изменения проставляется приложением до коммита, поэтому запись длинной транзакции может появиться
+    с временем раньше уже выданного клиенту. Отдаются только записи, измененные не позже, чем MODIFIED_SINCE_LAG
+    секунд назад; эта граница возвращается в поле modified_until, клиент передает ее как следующий
+    ?modified_since= после чтения последней страницы."""
+    modified_since_query_param = 'modified_since'
+    modified_field = 'update'
+    tombstone_model = None
+    changes_pagination_class = None
+
+    def is_changes_request(self):
+        return self.action == 'deleted' or (
+            self.action == 'list' and self.modified_since_query_param in self.request.query_params)
+
+    @property
+    def paginator(self):
+        if self.is_changes_request():
+            if not hasattr(self, '_changes_paginator'):
+                self._changes_paginator = self.changes_pagination_class()
+            return self._changes_paginator
+        return super(ModifiedSinceMixin, self).paginator
+
+    def get_changes_ordering(self):
+        if self.action == 'deleted':
+            return 'deleted_at', 'id'
+        return self.modified_field, 'id'
+
+    def get_modified_until(self):
+        if not hasattr(self, '_modified_until'):
+            self._modified_until = timezone.now() - timedelta(seconds=getattr(settings, 'MODIFIED_SINCE_LAG', 60))
+        return self._modified_until
+
+    def filter_queryset(self, queryset):
+        queryset = super(ModifiedSinceMixin, self).filter_queryset(queryset)
+        if not self.is_changes_request():
+            return queryset
+        modified_since = parse_datetime_query_param(self.request, self.modified_since_query_param)
+        field = 'deleted_at' if self.action == 'deleted' else self.modified_field
+        queryset = queryset.filter(**{f'{field}__lte': self.get_modified_until()})
+        if modified_since is None:
+            return queryset
+        return queryset.filter(**{f'{field}__gt': modified_since})
+
+    def get_paginated_response(self, data):
+        response = super(ModifiedSinceMixin, self).get_paginated_response(data)
+        if self.is_changes_request():
+            response.data['modified_until'] = self.get_modified_until().isoformat()
+        return response
+
+    @action(detail=False, methods=['get'])
+    def deleted(self, request):
+        """Удаленные записи (tombstones), ?modified_since= - удаленные после указанного момента"""
+        queryset = self.filter_queryset(self.tombstone_model.objects.filter(**self.get_company_filter()))
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
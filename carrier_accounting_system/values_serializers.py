@@ -0,0 +1,198 @@
+from collections import defaultdict, namedtuple
+from functools import lru_cache
+
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
+from rest_framework.relations import PKOnlyObject
+from rest_framework.response import Response
+
+VALUE, NESTED, MANY, COMPUTED, ROW = range(5)
+
+
+class RowField(namedtuple('RowField', ('keys', 'function'))):
+    """Вычисляемое поле по колонкам той же строки values(): keys - колонки, function(row) -> значение"""
+
+
+def parse_fields(value):
+    """Список полей из параметра запроса: 'id,user.username,user.company' ->
+    {'id': None, 'user': {'username': None, 'company': None}}, None - поле целиком"""
+    tree = {}
+    for path in filter(None, (path.strip() for path in value.split(','))):
+        node = tree
+        names = path.split('.')
+        for name in names[:-1]:
+            if node.get(name, {}) is None:
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return tree
+
+
+class FieldsSelectionError(ValueError):
+    """Неверный выбор полей; param - параметр запроса (fields или exclude)"""
+
+    def __init__(self, param, message):
+        super(FieldsSelectionError, self).__init__(message)
+        self.param = param
+
+
+class ValuesSerializer:
+    """Быстрая сериализация только на чтение: строки queryset.values() вместо моделей и serializer.data.
+
+    Структура ответа один раз берется из сериализатора DRF: для каждого поля запоминаются ключ values()
+    и привязанный метод to_representation поля, поэтому JSON совпадает с ответом сериализатора побайтно.
+    Вложенные сериализаторы связей ForeignKey читаются через JOIN в том же запросе, вложенные списки
+    (many=True по обратной связи) - одним запросом на страницу. Поля без колонки в БД (свойства модели)
+    вычисляются функциями computed_fields: (список id) -> {id: значение}, или по колонкам строки (RowField).
+
+    fields и exclude (деревья parse_fields) оставляют только часть полей, в том числе вложенных:
+    из запроса убираются ненужные колонки и JOIN, из ответа - поля."""
+
+    def __init__(self, serializer_class, computed_fields=None, fields=None, exclude=None):
+        self.computed_fields = computed_fields or {}
+        self.model = serializer_class.Meta.model
+        self.keys = ['pk']
+        self.entries = self.compile(serializer_class(), self.model, '', fields, exclude)
+
+    def compile(self, serializer, model, prefix, fields=None, exclude=None):
+        readable_fields = {name: field for name, field in serializer.fields.items() if not field.write_only}
+        path = prefix.replace('__', '.')
+        for param, selection in (('fields', fields), ('exclude', exclude)):
+            unknown = set(selection or ()) - set(readable_fields)
+            if unknown:
+                names = ', '.join(sorted(path + name for name in unknown))
+                raise FieldsSelectionError(param, f'Unknown fields: {names}')
+        entries = []
+        for name, field in readable_fields.items():
+            if fields is not None and name not in fields or exclude and name in exclude and exclude[name] is None:
+                continue
+            sub_fields = fields.get(name) if fields else None
+            sub_exclude = exclude.get(name) if exclude else None
+            if (sub_fields or sub_exclude) and not isinstance(field, serializers.BaseSerializer):
+                raise FieldsSelectionError('fields' if sub_fields else 'exclude',
+                                           f'Field "{path}{name}" has no nested fields')
+            source = field.source.replace('.', '__')
+            if isinstance(field, serializers.ListSerializer):
+                if prefix:
+                    raise ValueError(f'Nested list field "{name}" is supported only at the top level')
+                relation = model._meta.get_field(source)
+                entries.append((MANY, name, (relation.related_model, relation.field.name,
+                                             ValuesSerializer(type(field.child), fields=sub_fields,
+                                                              exclude=sub_exclude))))
+            elif isinstance(field, serializers.BaseSerializer):
+                related_model = model._meta.get_field(source).related_model
+                self.keys.append(prefix + source)
+                entries.append((NESTED, name, (prefix + source, self.compile(
+                    field, related_model, f'{prefix}{source}__', sub_fields, sub_exclude))))
+            elif not prefix and isinstance(self.computed_fields.get(source), RowField):
+                self.keys += self.computed_fields[source].keys
+                entries.append((ROW, name, self.computed_fields[source].function))
+            elif not prefix and source in self.computed_fields:
+                entries.append((COMPUTED, name, source))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                self.keys.append(prefix + source)
+                entries.append((VALUE, name, (prefix + source,
+                                              lambda value, field=field: field.to_representation(PKOnlyObject(value)))))
+            elif isinstance(field, serializers.RelatedField) or source == '*':
+                raise ValueError(f'Field "{name}" is not supported')
+            else:
+                self.keys.append(prefix + source)
+                entries.append((VALUE, name, (prefix + source, field.to_representation)))
+        return entries
+
+    def get_queryset(self, queryset, extra_keys=()):
+        """Строки queryset с колонками, нужными для сериализации, и extra_keys (например, поля сортировки
+        для пагинации по курсору), сортировка queryset сохраняется"""
+        return queryset.prefetch_related(None).values(*dict.fromkeys(self.keys + list(extra_keys)))
+
+    def to_representation(self, entries, row, extra):
+        ret = {}
+        for kind, name, data in entries:
+            if kind == VALUE:
+                value = row[data[0]]
+                ret[name] = None if value is None else data[1](value)
+            elif kind == NESTED:
+                ret[name] = None if row[data[0]] is None else self.to_representation(data[1], row, extra)
+            elif kind == ROW:
+                ret[name] = data(row)
+            else:
+                ret[name] = extra[name].get(row['pk'], [] if kind == MANY else None)
+        return ret
+
+    def serialize(self, rows):
+        rows = list(rows)
+        ids = [row['pk'] for row in rows]
+        extra = {}
+        for kind, name, data in self.entries:
+            if kind == COMPUTED:
+                extra[name] = self.computed_fields[data](ids) if ids else {}
+            elif kind == MANY:
+                related_model, field_name, child = data
+                children = list(related_model.objects.filter(**{f'{field_name}__in': ids})
+                                .values(*dict.fromkeys(child.keys + [field_name]))) if ids else []
+                extra[name] = grouped = defaultdict(list)
+                for child_row, representation in zip(children, child.serialize(children)):
+                    grouped[child_row[field_name]].append(representation)
+        return [self.to_representation(self.entries, row, extra) for row in rows]
+
+
+@lru_cache(maxsize=256)
+def _get_values_serializer(serializer_class, computed_fields, fields, exclude):
+    return ValuesSerializer(serializer_class, dict(computed_fields),
+                            fields=parse_fields(fields) if fields else None,
+                            exclude=parse_fields(exclude) if exclude else None)
+
+
+def get_values_serializer(serializer_class, computed_fields=None, fields=None, exclude=None):
+    """ValuesSerializer для класса сериализатора и выбора полей (строки параметров fields и exclude),
+    создается один раз"""
+    computed_fields = tuple(sorted((computed_fields or {}).items()))
+    return _get_values_serializer(serializer_class, computed_fields, fields or None, exclude or None)
+
+
+class ValuesSerializerMixin:
+    """list и retrieve через ValuesSerializer для ModelViewSet, без создания моделей.
+
+    Сериализатор берется из get_serializer_class, поля-свойства модели - из values_computed_fields.
+    ?fields=id,user.username и ?exclude=comments,user.company оставляют в ответе и в SELECT
+    только часть полей."""
+    values_serializer_actions = ('list', 'retrieve')
+    values_computed_fields = None
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+
+    def get_values_serializer(self):
+        try:
+            return get_values_serializer(self.get_serializer_class(), self.values_computed_fields,
+                                         self.request.query_params.get(self.fields_query_param),
+                                         self.request.query_params.get(self.exclude_query_param))
+        except FieldsSelectionError as exc:
+            param = self.fields_query_param if exc.param == 'fields' else self.exclude_query_param
+            raise ValidationError({param: [str(exc)]})
+
+    def get_values_extra_keys(self):
+        """Поля сортировки пагинации по курсору: нужны в строках, даже если не выводятся"""
+        keys = ['id', *getattr(self, 'cursor_ordering_fields', ())]
+        if hasattr(self, 'get_changes_ordering'):
+            keys += self.get_changes_ordering()
+        return [key.lstrip('-') for key in keys]
+
+    def list(self, request, *args, **kwargs):
+        if self.action not in self.values_serializer_actions:
+            return super(ValuesSerializerMixin, self).list(request, *args, **kwargs)
+        values_serializer = self.get_values_serializer()
+        queryset = values_serializer.get_queryset(self.filter_queryset(self.get_queryset()),
+                                                  self.get_values_extra_keys())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(values_serializer.serialize(page))
+        return Response(values_serializer.serialize(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.action not in self.values_serializer_actions:
+            return super(ValuesSerializerMixin, self).retrieve(request, *args, **kwargs)
+        values_serializer = self.get_values_serializer()
+        row = get_object_or_404(values_serializer.get_queryset(self.get_queryset()), pk=self.kwargs['pk'])
+        return Response(values_serializer.serialize([row])[0])
@@ -0,0 +1,189 @@
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework import exceptions
+
+from events.channels import ALL_COMPANIES_GROUP, get_channel_layer, get_company_group, get_event_message
+from events.models import Event
+from events.tickets import get_ticket_user
+from users.authentication import CachedTokenAuthentication
+from users.permissions import IsUserNotBlocked
+
+EVENTS_STREAM_PATH = '/api/v1/events/stream/'
+
+
+def get_user_groups(user):
+    if user.company is None:
+        return []
+    if user.company.is_transport_company:
+        return [ALL_COMPANIES_GROUP]
+    return [get_company_group(user.company_id)]
+
+
+def get_events_after(user, last_event_id, limit):
+    """События после last_event_id из БД: пропущенные при переподключении или переполнении очереди"""
+    queryset = Event.objects.filter(id__gt=last_event_id, order__isnull=False).order_by('id')
+    if not user.company.is_transport_company:
+        queryset = queryset.filter(order__company=user.company_id)
+    return [get_event_message(event) for event in queryset[:limit]]
+
+
+def get_last_event_id():
+    return Event.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+class EventStreamApplication:
+    """Поток событий заказов компании поверх ASGI, вместо периодического опроса списков коробок и заказов.
+
+    GET /api/v1/events/stream/ с заголовком Accept: text/event-stream - Server-Sent Events,
+    иначе long-poll: ответ JSON-массивом событий, как только они появятся, но не позже ?timeout= секунд.
+    Токен передается в заголовке Authorization, EventSource (не передает заголовки) подключается
+    с краткосрочным билетом ?ticket= из POST /api/v1/events/stream-ticket/.
+    Заголовок Last-Event-ID или параметр ?last_event_id= - продолжить с указанного события.
+
+    События публикуются в канал (EVENTS_CHANNEL_LAYER) процессом, который их создал; события других процессов
+    (WSGI-воркеры) читаются из БД каждые EVENTS_STREAM_POLL_INTERVAL секунд ожидания.
+    Остальные запросы передаются приложению Django."""
+    max_timeout = 60
+    replay_limit = 1000
+
+    def __init__(self, application, path=EVENTS_STREAM_PATH):
+        self.application = application
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] != self.path:
+            return await self.application(scope, receive, send)
+        if scope['method'] != 'GET':
+            return await self.send_json(send, 405, {'detail': f'Method "{scope["method"]}" not allowed.'})
+
+        headers = {name.decode('latin1').lower(): value.decode('latin1') for name, value in scope['headers']}
+        params = {name: values[-1] for name, values in parse_qs(scope['query_string'].decode('latin1')).items()}
+        try:
+            user = await self.authenticate(headers, params)
+            last_event_id = int(headers.get('last-event-id') or params.get('last_event_id') or 0)
+            timeout = min(float(params.get('timeout', self.max_timeout)), self.max_timeout)
+        except exceptions.APIException as exc:
+            return await self.send_json(send, exc.status_code, {'detail': str(exc.detail)})
+        except ValueError:
+            return await self.send_json(send, 400, {'detail': 'Invalid last_event_id or timeout.'})
+
+        groups = get_user_groups(user)
+        channel_layer = get_channel_layer()
+        # подписка до чтения из БД: события между чтением и подпиской не теряются
+        queue = channel_layer.subscribe(groups)
+        try:
+            # без last_event_id - только новые события: опрос БД начинается с последнего существующего события
+            replay = bool(last_event_id)
+            if not replay:
+                last_event_id = await sync_to_async(get_last_event_id)()
+            if 'text/event-stream' in headers.get('accept', ''):
+                await self.stream(user, queue, last_event_id, replay, receive, send)
+            else:
+                await self.long_poll(user, queue, last_event_id, replay, timeout, send)
+        finally:
+            channel_layer.unsubscribe(groups, queue)
+
+    async def authenticate(self, headers, params):
+        authentication = CachedTokenAuthentication()
+        auth = headers.get('authorization', '').split()
+        if len(auth) == 2 and auth[0] == authentication.keyword:
+            user, _ = await sync_to_async(authentication.authenticate_credentials)(auth[1])
+        elif params.get('ticket'):
+            user = await sync_to_async(get_ticket_user)(params['ticket'])
+        else:
+            raise exceptions.NotAuthenticated()
+        if user.blocked:
+            raise exceptions.PermissionDenied(IsUserNotBlocked.message)
+        return user
+
+    async def get_missed_messages(self, user, last_event_id):
+        if user.company is None:
+            return []
+        return await sync_to_async(get_events_after)(user, last_event_id, self.replay_limit)
+
+    async def long_poll(self, user, queue, last_event_id, replay, timeout, send):
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        poll_interval = getattr(settings, 'EVENTS_STREAM_POLL_INTERVAL', 2)
+        messages = await self.get_missed_messages(user, last_event_id) if replay else []
+        while not messages and loop.time() < deadline:
+            try:
+                messages = [await asyncio.wait_for(queue.get(), min(deadline - loop.time(), poll_interval))]
+            except asyncio.TimeoutError:
+                messages = await self.get_missed_messages(user, last_event_id)
+                continue
+            while not queue.empty():
+                messages.append(queue.get_nowait())
+            if None in messages:
+                messages = await self.get_missed_messages(user, last_event_id)
+        await self.send_json(send, 200, [message for message in messages
+                                         if message['id'] is None or message['id'] > last_event_id])
+
+    async def stream(self, user, queue, last_event_id, replay, receive, send):
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        loop = asyncio.get_event_loop()
+        keepalive = getattr(settings, 'EVENTS_STREAM_KEEPALIVE', 15)
+        poll_interval = getattr(settings, 'EVENTS_STREAM_POLL_INTERVAL', 2)
+        disconnect = asyncio.ensure_future(self.wait_disconnect(receive))
+        last_sent = loop.time()
+        try:
+            messages = await self.get_missed_messages(user, last_event_id) if replay else []
+            while True:
+                for message in messages:
+                    if message['id'] is not None:
+                        if message['id'] <= last_event_id:
+                            continue
+                        last_event_id = message['id']
+                    await send({'type': 'http.response.body', 'body': self.format_sse(message), 'more_body': True})
+                    last_sent = loop.time()
+
+                get_message = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait({get_message, disconnect}, timeout=min(poll_interval, keepalive),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnect in done:
+                    get_message.cancel()
+                    return
+                if get_message not in done:
+                    get_message.cancel()
+                    messages = await self.get_missed_messages(user, last_event_id)
+                    if not messages and loop.time() - last_sent >= keepalive:
+                        await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                        last_sent = loop.time()
+                    continue
+                message = get_message.result()
+                messages = await self.get_missed_messages(user, last_event_id) if message is None else [message]
+        finally:
+            disconnect.cancel()
+
+    @staticmethod
+    async def wait_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    @staticmethod
+    def format_sse(message):
+        lines = [f'id: {message["id"]}'] if message['id'] is not None else []
+        lines.append(f'event: {message["status"]}')
+        lines.append(f'data: {json.dumps(message, ensure_ascii=False)}')
+        return ('\n'.join(lines) + '\n\n').encode()
+
+    @staticmethod
+    async def send_json(send, status, data):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(b'content-type', b'application/json')],
+        })
+        await send({'type': 'http.response.body', 'body': json.dumps(data, ensure_ascii=False).encode()})
@@ -0,0 +1,109 @@
+import asyncio
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from events.models import Event
+from orders.models import Order
+
+# группа транспортной компании: события всех компаний
+ALL_COMPANIES_GROUP = 'companies'
+
+
+def get_company_group(company_id):
+    return f'company.{company_id}'
+
+
+class InMemoryChannelLayer:
+    """Каналы событий в памяти процесса: подписчик - asyncio.Queue в цикле событий ASGI-сервера.
+
+    Публикация потокобезопасна, синхронный код Django выполняется в отдельных потоках.
+    Доставка только в пределах процесса: события других процессов поток читает из БД
+    (EVENTS_STREAM_POLL_INTERVAL), общий брокер с тем же интерфейсом задается EVENTS_CHANNEL_LAYER.
+    При переполнении очереди медленного подписчика очередь очищается и в нее кладется None:
+    подписчик дочитывает события из БД."""
+
+    def __init__(self, capacity=100):
+        self.capacity = capacity
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, groups):
+        subscriber = (asyncio.get_event_loop(), asyncio.Queue(maxsize=self.capacity))
+        with self.lock:
+            for group in groups:
+                self.groups.setdefault(group, set()).add(subscriber)
+        return subscriber[1]
+
+    def unsubscribe(self, groups, queue):
+        with self.lock:
+            for group in groups:
+                subscribers = self.groups.get(group, set())
+                subscribers.difference_update([subscriber for subscriber in subscribers if subscriber[1] is queue])
+                if not subscribers:
+                    self.groups.pop(group, None)
+
+    def group_send(self, group, message):
+        with self.lock:
+            subscribers = list(self.groups.get(group, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue, message)
+            except RuntimeError:
+                # цикл событий подписчика уже закрыт
+                self.unsubscribe([group], queue)
+
+    @staticmethod
+    def _put(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+
+_channel_layer = None
+
+
+def get_channel_layer():
+    global _channel_layer
+    if _channel_layer is None:
+        _channel_layer = import_string(getattr(settings, 'EVENTS_CHANNEL_LAYER',
+                                               'events.channels.InMemoryChannelLayer'))()
+    return _channel_layer
+
+
+def get_event_message(event):
+    return {
+        'id': event.id,
+        'order': event.order_id,
+        'status': event.status,
+        'datetime': event.datetime.isoformat(),
+        'comments': event.comments,
+    }
+
+
+def publish_events(events):
+    """Отправляет события подписчикам компаний их заказов после коммита транзакции.
+
+    Компании заказов берутся из загруженных заказов, для остальных - одним запросом."""
+    events = [event for event in events if event.order_id]
+    if not events:
+        return
+    orders_companies = {event.order_id: event.order.company_id for event in events if Event.order.is_cached(event)}
+    missing = set(event.order_id for event in events) - set(orders_companies)
+    if missing:
+        orders_companies.update(Order.objects.filter(id__in=missing).values_list('id', 'company_id'))
+    messages = [(orders_companies.get(event.order_id), get_event_message(event)) for event in events]
+
+    def send():
+        channel_layer = get_channel_layer()
+        for company_id, message in messages:
+            channel_layer.group_send(ALL_COMPANIES_GROUP, message)
+            if company_id is not None:
+                channel_layer.group_send(get_company_group(company_id), message)
+
+    transaction.on_commit(send)
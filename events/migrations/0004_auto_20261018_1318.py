@@ -0,0 +1,17 @@
+# Generated by Django 3.1.6 on 2026-10-18 10:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0003_event_user'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['order', 'datetime'], name='event_order_datetime_idx'),
+        ),
+    ]
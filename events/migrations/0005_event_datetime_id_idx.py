@@ -0,0 +1,17 @@
+# Generated by Django 3.1.6 on 2026-10-18 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0004_auto_20261018_1318'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['datetime', 'id'], name='event_datetime_id_idx'),
+        ),
+    ]
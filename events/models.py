@@ -5,14 +5,7 @@ from orders.models import Order
 
 
 class Event(models.Model):
-    class StatusChoices(models.TextChoices):
-        NEW = 'NEW', 'Новый заказ'
-        READY_FOR_SHIPPING = 'READY_FOR_SHIPPING', 'Собран на складе отправителя'
-        SORTING = 'SORTING', 'На складе транспортной компании'
-        DELIVERING = 'DELIVERING', 'Доставляется (передан курьеру для доставки покупателю)'
-        DELAYED = 'DELAYED', 'Доставка не была выполнена в срок'
-        DONE = 'DONE', 'Доставлен'
-        CANCELED = 'CANCELED', 'Отменен'
+    StatusChoices = Order.StatusChoices
 
     status = models.CharField(max_length=64, choices=StatusChoices.choices)  # choice?
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='events', null=True, blank=True)
@@ -21,6 +14,12 @@ class Event(models.Model):
     # пользователь системы, создавший событие?
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='events')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'datetime'], name='event_order_datetime_idx'),
+            models.Index(fields=['datetime', 'id'], name='event_datetime_id_idx'),
+        ]
+
     def __str__(self):
         return f'Пользователь: {self.user.username}, статус: {self.status}, дата: {self.datetime.astimezone()}'
 
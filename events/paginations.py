@@ -0,0 +1,11 @@
+from orders.paginations import TupleKeysetPagination
+
+
+class EventPagination(TupleKeysetPagination):
+    """Лента событий по курсору: сортировка по (datetime, id), от старых к новым.
+
+    Новые события всегда попадают в конец ленты, клиент продолжает чтение по ссылке next."""
+    ordering = ('datetime', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
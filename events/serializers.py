@@ -0,0 +1,17 @@
+from rest_framework import serializers
+
+from events.models import Event
+from users.serializers import UserListRetrieveSerializer
+
+
+class EventListSerializer(serializers.ModelSerializer):
+    user = UserListRetrieveSerializer()
+
+    class Meta:
+        model = Event
+        fields = ['id', 'order', 'status', 'datetime', 'comments', 'user']
+
+
+class StreamTicketSerializer(serializers.Serializer):
+    ticket = serializers.CharField(help_text='Билет для /api/v1/events/stream/?ticket=, '
+                                             'действует EVENTS_STREAM_TICKET_MAX_AGE секунд')
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from events.channels import publish_events
+from events.models import Event
+
+
+@receiver(post_save, sender=Event)
+def publish_event_on_save(sender, instance, created, raw=False, **kwargs):
+    # события, созданные через bulk_create, публикуются явно вызовом publish_events
+    if created and not raw:
+        publish_events([instance])
@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+from events.models import Event
+from orders.models import Order
+
+
+class EventsTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company1 = Company.objects.create(name='Компания 1')
+        self.company2 = Company.objects.create(name='Компания 2')
+        self.transport_company = Company.objects.create(name='Транспортная компания', is_transport_company=True)
+        self.user1 = get_user_model().objects.create(username='user1', company=self.company1)
+        self.user2 = get_user_model().objects.create(username='user2', company=self.company2)
+        self.transport_user = get_user_model().objects.create(username='transport', company=self.transport_company)
+        self.order1 = Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1',
+                                           user=self.user1, company=self.company1)
+        self.order2 = Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                                           user=self.user2, company=self.company2)
+        self.datetime = timezone.now() - timedelta(days=1)
+        self.events = []
+        for status_ in Event.StatusChoices.values:
+            self.events.append(Event.objects.create(order=self.order1, user=self.user1, status=status_))
+            Event.objects.create(order=self.order2, user=self.user2, status=status_)
+        # одинаковое время у соседних событий: порядок определяется id
+        for i, event in enumerate(self.events):
+            Event.objects.filter(id=event.id).update(datetime=self.datetime + timedelta(minutes=i // 2))
+
+    def get_all(self, url, params):
+        results = []
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            results += response.json()['results']
+            url, params = response.json()['next'], None
+        return results
+
+    def test_order_events(self):
+        self.client.force_authenticate(self.user1)
+        url = reverse('order:order-events', kwargs={'pk': self.order1.id})
+        results = self.get_all(url, {'page_size': 3})
+        self.assertEqual([event['id'] for event in results], [event.id for event in self.events])
+        self.assertEqual(results[0]['status'], Event.StatusChoices.NEW)
+        self.assertEqual(results[0]['user']['username'], 'user1')
+
+    def test_order_events_since(self):
+        self.client.force_authenticate(self.user1)
+        url = reverse('order:order-events', kwargs={'pk': self.order1.id})
+        since = (self.datetime + timedelta(minutes=1)).isoformat()
+        results = self.get_all(url, {'since': since})
+        self.assertEqual([event['id'] for event in results], [event.id for event in self.events[4:]])
+
+        response = self.client.get(url, {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_order_events_after(self):
+        """Продолжение с события, у следующих событий то же время"""
+        self.client.force_authenticate(self.user1)
+        url = reverse('order:order-events', kwargs={'pk': self.order1.id})
+        results = self.get_all(url, {'after': self.events[2].id})
+        self.assertEqual([event['id'] for event in results], [event.id for event in self.events[3:]])
+
+        for after in ('0', 'abc'):
+            response = self.client.get(url, {'after': after})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_keyset_pagination(self):
+        """Все события с одним временем (bulk_create): страницы по (datetime, id), без OFFSET"""
+        Event.objects.update(datetime=self.datetime)
+        self.client.force_authenticate(self.user1)
+        url = reverse('event:event-list')
+        with CaptureQueriesContext(connection) as context:
+            results = self.get_all(url, {'page_size': 3})
+        self.assertEqual([event['id'] for event in results], [event.id for event in self.events])
+        self.assertFalse(any('OFFSET' in query['sql'] for query in context.captured_queries))
+
+        response = self.client.get(url, {'page_size': 3})
+        response = self.client.get(response.json()['next'])
+        response = self.client.get(response.json()['previous'])
+        self.assertEqual([event['id'] for event in response.json()['results']],
+                         [event.id for event in self.events[:3]])
+        self.assertIsNone(response.json()['previous'])
+
+        response = self.client.get(url, {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_order_events_other_company(self):
+        self.client.force_authenticate(self.user2)
+        response = self.client.get(reverse('order:order-events', kwargs={'pk': self.order1.id}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(self.transport_user)
+        response = self.client.get(reverse('order:order-events', kwargs={'pk': self.order1.id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), len(self.events))
+
+    def test_company_feed(self):
+        self.client.force_authenticate(self.user1)
+        results = self.get_all(reverse('event:event-list'), {'page_size': 2})
+        self.assertEqual([event['id'] for event in results], [event.id for event in self.events])
+
+        self.client.force_authenticate(self.transport_user)
+        results = self.get_all(reverse('event:event-list'), {'page_size': 100})
+        self.assertEqual(len(results), Event.objects.count())
+        self.assertEqual([event['id'] for event in results],
+                         list(Event.objects.order_by('datetime', 'id').values_list('id', flat=True)))
+
+    def test_company_feed_queries(self):
+        self.client.force_authenticate(self.user1)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('event:event-list'), {'page_size': 100})
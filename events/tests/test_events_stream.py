@@ -0,0 +1,180 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APIClient
+
+from companies.models import Company
+from events.asgi import EventStreamApplication, EVENTS_STREAM_PATH
+from events.channels import get_channel_layer, get_company_group, ALL_COMPANIES_GROUP
+from events.models import Event
+from events.tickets import create_stream_ticket
+from orders.models import Order
+
+
+async def django_application(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b'django'})
+
+
+class EventStreamTestCase(TransactionTestCase):
+    def setUp(self) -> None:
+        self.company1 = Company.objects.create(name='Компания 1')
+        self.company2 = Company.objects.create(name='Компания 2')
+        self.transport_company = Company.objects.create(name='Транспортная компания', is_transport_company=True)
+        self.user1 = get_user_model().objects.create(username='user1', company=self.company1)
+        self.user2 = get_user_model().objects.create(username='user2', company=self.company2)
+        self.transport_user = get_user_model().objects.create(username='transport', company=self.transport_company)
+        self.order1 = Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1',
+                                           user=self.user1, company=self.company1)
+        self.order2 = Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                                           user=self.user2, company=self.company2)
+        self.token1 = Token.objects.create(user=self.user1).key
+        self.transport_token = Token.objects.create(user=self.transport_user).key
+        self.application = EventStreamApplication(django_application)
+
+    def get_communicator(self, query_string='', headers=()):
+        return ApplicationCommunicator(self.application, {
+            'type': 'http',
+            'method': 'GET',
+            'path': EVENTS_STREAM_PATH,
+            'query_string': query_string.encode(),
+            'headers': [(name.encode(), value.encode()) for name, value in headers],
+        })
+
+    async def wait_subscribed(self, group):
+        # запрос обрабатывается асинхронно: события публикуются после подписки
+        for _ in range(100):
+            if get_channel_layer().groups.get(group):
+                return
+            await asyncio.sleep(0.01)
+        self.fail(f'No subscribers in group {group}')
+
+    async def get_response(self, communicator):
+        start = await communicator.receive_output(timeout=5)
+        body = await communicator.receive_output(timeout=5)
+        return start['status'], json.loads(body['body'])
+
+    async def create_event(self, order, status):
+        return await sync_to_async(Event.objects.create)(order=order, user=order.user, status=status)
+
+    async def test_long_poll(self):
+        communicator = self.get_communicator('timeout=5', headers=[('Authorization', f'Token {self.token1}')])
+        await communicator.send_input({'type': 'http.request'})
+        await self.wait_subscribed(get_company_group(self.company1.id))
+        await self.create_event(self.order2, Event.StatusChoices.SORTING)
+        event = await self.create_event(self.order1, Event.StatusChoices.SORTING)
+        status, data = await self.get_response(communicator)
+        self.assertEqual(status, 200)
+        self.assertEqual([(message['id'], message['order'], message['status']) for message in data],
+                         [(event.id, self.order1.id, Event.StatusChoices.SORTING)])
+
+    async def test_long_poll_timeout(self):
+        communicator = self.get_communicator('timeout=0.1', headers=[('Authorization', f'Token {self.token1}')])
+        await communicator.send_input({'type': 'http.request'})
+        self.assertEqual(await self.get_response(communicator), (200, []))
+
+    async def test_long_poll_last_event_id(self):
+        first = await self.create_event(self.order1, Event.StatusChoices.NEW)
+        second = await self.create_event(self.order1, Event.StatusChoices.SORTING)
+        await self.create_event(self.order2, Event.StatusChoices.SORTING)
+        communicator = self.get_communicator(f'last_event_id={first.id}',
+                                             headers=[('Authorization', f'Token {self.token1}')])
+        await communicator.send_input({'type': 'http.request'})
+        status, data = await self.get_response(communicator)
+        self.assertEqual([message['id'] for message in data], [second.id])
+
+    async def test_stream(self):
+        communicator = self.get_communicator(
+            headers=[('Authorization', f'Token {self.transport_token}'), ('Accept', 'text/event-stream')])
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(timeout=5)
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+
+        await self.wait_subscribed(ALL_COMPANIES_GROUP)
+        events = [await self.create_event(self.order1, Event.StatusChoices.SORTING),
+                  await self.create_event(self.order2, Event.StatusChoices.DELIVERING)]
+        for event in events:
+            body = (await communicator.receive_output(timeout=5))['body'].decode()
+            self.assertTrue(body.startswith(f'id: {event.id}\nevent: {event.status}\ndata: '))
+            self.assertEqual(json.loads(body.split('data: ')[1])['order'], event.order_id)
+
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(timeout=5)
+        self.assertFalse(get_channel_layer().groups.get(ALL_COMPANIES_GROUP))
+
+    async def test_authentication(self):
+        communicator = self.get_communicator()
+        await communicator.send_input({'type': 'http.request'})
+        self.assertEqual((await self.get_response(communicator))[0], 401)
+
+        await sync_to_async(get_user_model().objects.filter(id=self.user1.id).update)(blocked=True)
+        communicator = self.get_communicator(headers=[('Authorization', f'Token {self.token1}')])
+        await communicator.send_input({'type': 'http.request'})
+        self.assertEqual(await self.get_response(communicator),
+                         (403, {'detail': 'User blocked by administrator.'}))
+
+        # токен в параметре запроса не принимается: попадает в журналы доступа
+        communicator = self.get_communicator(f'token={self.transport_token}')
+        await communicator.send_input({'type': 'http.request'})
+        self.assertEqual((await self.get_response(communicator))[0], 401)
+
+    async def test_ticket(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.transport_token}')
+        response = await sync_to_async(client.post)(reverse('event:event-stream-ticket'))
+        self.assertEqual(response.status_code, 200)
+        ticket = response.json()['ticket']
+        event = await self.create_event(self.order1, Event.StatusChoices.NEW)
+        communicator = self.get_communicator(f'ticket={ticket}&last_event_id={event.id - 1}')
+        await communicator.send_input({'type': 'http.request'})
+        status, data = await self.get_response(communicator)
+        self.assertEqual((status, [message['id'] for message in data]), (200, [event.id]))
+
+        for ticket in (ticket + 'x', create_stream_ticket(self.user1)):
+            with override_settings(EVENTS_STREAM_TICKET_MAX_AGE=-1):
+                communicator = self.get_communicator(f'ticket={ticket}')
+                await communicator.send_input({'type': 'http.request'})
+                self.assertEqual(await self.get_response(communicator),
+                                 (401, {'detail': 'Invalid or expired ticket.'}))
+
+    @override_settings(EVENTS_STREAM_POLL_INTERVAL=0.05)
+    async def test_events_from_other_processes(self):
+        """События, созданные другим процессом (без публикации в канал этого процесса), читаются из БД"""
+        existing = await self.create_event(self.order1, Event.StatusChoices.NEW)
+        communicator = self.get_communicator('timeout=5', headers=[('Authorization', f'Token {self.token1}')])
+        await communicator.send_input({'type': 'http.request'})
+        await self.wait_subscribed(get_company_group(self.company1.id))
+        await sync_to_async(Event.objects.bulk_create)([
+            Event(order=self.order2, user=self.user2, status=Event.StatusChoices.SORTING),
+            Event(order=self.order1, user=self.user1, status=Event.StatusChoices.SORTING),
+        ])
+        status, data = await self.get_response(communicator)
+        ids = await sync_to_async(list)(Event.objects.filter(order=self.order1).exclude(id=existing.id)
+                                         .values_list('id', flat=True))
+        self.assertEqual((status, [message['id'] for message in data]), (200, ids))
+
+        communicator = self.get_communicator(
+            headers=[('Authorization', f'Token {self.token1}'), ('Accept', 'text/event-stream')])
+        await communicator.send_input({'type': 'http.request'})
+        await communicator.receive_output(timeout=5)
+        await self.wait_subscribed(get_company_group(self.company1.id))
+        await sync_to_async(Event.objects.bulk_create)([
+            Event(order=self.order1, user=self.user1, status=Event.StatusChoices.DELIVERING)])
+        body = (await communicator.receive_output(timeout=5))['body'].decode()
+        self.assertIn('event: DELIVERING', body)
+        await communicator.send_input({'type': 'http.disconnect'})
+        await communicator.wait(timeout=5)
+
+    async def test_other_paths(self):
+        communicator = ApplicationCommunicator(self.application, {
+            'type': 'http', 'method': 'GET', 'path': '/api/v1/events/', 'query_string': b'', 'headers': []})
+        await communicator.send_input({'type': 'http.request'})
+        await communicator.receive_output(timeout=5)
+        self.assertEqual((await communicator.receive_output(timeout=5))['body'], b'django')
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core import signing
+from rest_framework import exceptions
+
+from users.models import User
+
+TICKET_SALT = 'events.stream'
+
+
+def create_stream_ticket(user):
+    """Подписанный билет для подключения к потоку событий (?ticket=): EventSource не передает заголовки,
+    а токен в параметре запроса попадает в журналы доступа. Билет действует EVENTS_STREAM_TICKET_MAX_AGE секунд"""
+    return signing.dumps({'user': user.id}, salt=TICKET_SALT)
+
+
+def get_ticket_user(ticket):
+    """Пользователь билета, при каждом подключении проверяется, что он активен"""
+    try:
+        data = signing.loads(ticket, salt=TICKET_SALT, max_age=getattr(settings, 'EVENTS_STREAM_TICKET_MAX_AGE', 60))
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed('Invalid or expired ticket.')
+    user = User.objects.select_related('company').filter(id=data['user'], is_active=True).first()
+    if user is None:
+        raise exceptions.AuthenticationFailed('User inactive or deleted.')
+    return user
@@ -0,0 +1,8 @@
+from rest_framework.routers import DefaultRouter
+
+from events.views import EventViewSet
+
+event_router = DefaultRouter()
+event_router.register('', EventViewSet, basename='event')
+
+urlpatterns = event_router.urls
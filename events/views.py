@@ -1,3 +1,50 @@
-from django.shortcuts import render
+from django.db.models import Q
+from drf_yasg.utils import no_body, swagger_auto_schema
+from rest_framework import viewsets, mixins
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from carrier_accounting_system.utils import parse_datetime_query_param
+from events.models import Event
+from events.paginations import EventPagination
+from events.serializers import EventListSerializer, StreamTicketSerializer
+from events.tickets import create_stream_ticket
+from users.permissions import IsUserNotBlocked
+
+
+def filter_events_since(queryset, request, query_param='since', after_query_param='after'):
+    """События после указанного момента: ?since=2021-01-01T00:00:00Z, или после события: ?after=<id события>.
+
+    Для продолжения чтения нужен ?after=: у событий, вставленных одним запросом, одинаковое время,
+    и ?since= по времени последнего прочитанного события пропустит остальные"""
+    after = request.query_params.get(after_query_param)
+    if after:
+        event = Event.objects.filter(id=after).values('datetime', 'id').first() if after.isdigit() else None
+        if event is None:
+            raise ValidationError({after_query_param: ['Событие не найдено.']})
+        return queryset.filter(Q(datetime__gt=event['datetime']) | Q(datetime=event['datetime'], id__gt=event['id']))
+    since = parse_datetime_query_param(request, query_param)
+    if since is None:
+        return queryset
+    return queryset.filter(datetime__gt=since)
+
+
+class EventViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    """Лента событий заказов компании"""
+    permission_classes = [IsAuthenticated, IsUserNotBlocked]
+    pagination_class = EventPagination
+    serializer_class = EventListSerializer
+
+    def get_queryset(self):
+        queryset = filter_events_since(Event.objects.select_related('user__company'), self.request)
+        if self.request.user.company.is_transport_company:
+            return queryset
+        return queryset.filter(order__company=self.request.user.company)
+
+    @swagger_auto_schema(request_body=no_body, responses={200: StreamTicketSerializer()})
+    @action(detail=False, methods=['post'], url_path='stream-ticket')
+    def stream_ticket(self, request):
+        """Краткосрочный билет для подключения к потоку событий: /api/v1/events/stream/?ticket=..."""
+        return Response({'ticket': create_stream_ticket(request.user)})
@@ -1,10 +1,21 @@
 from django.contrib import admin
 
 from orders.models import Order
+from orders.search import SEARCH_FIELDS, search_orders
+
+# количество заказов, найденных поиском в админке
+ADMIN_SEARCH_LIMIT = 1000
 
 
 class OrderAdmin(admin.ModelAdmin):
     readonly_fields = ('id', 'update')
+    search_fields = SEARCH_FIELDS
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексу полнотекстового поиска (orders.search) вместо LIKE по всем полям"""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(id__in=search_orders(search_term, limit=ADMIN_SEARCH_LIMIT)), False
 
 
 admin.site.register(Order, OrderAdmin)
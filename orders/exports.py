@@ -0,0 +1,111 @@
+import csv
+from itertools import groupby
+from operator import itemgetter
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# поля заказа в выгрузке: поле values() -> колонка
+ORDER_EXPORT_FIELDS = {
+    'id': 'id',
+    'logistic_tracking': 'logistic_tracking',
+    'client_tracking': 'client_tracking',
+    'client_name': 'client_name',
+    'user__username': 'user',
+    'company__name': 'company',
+    'shipping_date': 'shipping_date',
+    'shipping_time': 'shipping_time',
+    'shipping_from': 'shipping_from',
+    'shipping_car_type': 'shipping_car_type',
+    'shipping_method': 'shipping_method',
+    'recipient_order_num': 'recipient_order_num',
+    'cargo_description': 'cargo_description',
+    'cargo_pallet': 'cargo_pallet',
+    'cargo_qty': 'cargo_qty',
+    'cargo_weight': 'cargo_weight',
+    'cargo_price': 'cargo_price',
+    'recipient_id': 'recipient_id',
+    'recipient_zip': 'recipient_zip',
+    'recipient_city': 'recipient_city',
+    'recipient_email': 'recipient_email',
+    'recipient_area': 'recipient_area',
+    'recipient_address': 'recipient_address',
+    'recipient_address_comment': 'recipient_address_comment',
+    'recipient_phone': 'recipient_phone',
+    'recipient_name': 'recipient_name',
+    'recipient_name2': 'recipient_name2',
+    'update': 'update',
+    'comments': 'comments',
+}
+# поля коробки и ее отправления, в CSV - по строке на коробку
+BOX_EXPORT_FIELDS = {
+    'boxes__id': 'id',
+    'boxes__client_code': 'client_code',
+    'boxes__code': 'code',
+    'boxes__width': 'width',
+    'boxes__height': 'height',
+    'boxes__length': 'length',
+    'boxes__weight': 'weight',
+    'boxes__status': 'status',
+    'boxes__shipment_id': 'shipment',
+    'boxes__shipment__waybill_num': 'waybill_num',
+    'boxes__shipment__waybill_date': 'waybill_date',
+}
+
+
+class Echo:
+    """Буфер для csv.writer: строка возвращается, а не записывается"""
+
+    def write(self, value):
+        return value
+
+
+class OrderExport:
+    """Потоковая выгрузка заказов в CSV и NDJSON.
+
+    Заказы (с коробками и отправлениями - через LEFT JOIN) читаются одним запросом через values()
+    и iterator(chunk_size): на PostgreSQL - серверным курсором. Модели и сериализаторы не создаются,
+    в памяти одновременно не больше chunk_size строк."""
+    formats = {
+        'csv': 'text/csv',
+        'ndjson': 'application/x-ndjson',
+    }
+
+    def __init__(self, queryset, include_boxes=False, chunk_size=2000):
+        self.queryset = queryset
+        self.include_boxes = include_boxes
+        self.chunk_size = chunk_size
+
+    def get_fields(self):
+        if self.include_boxes:
+            return {**ORDER_EXPORT_FIELDS, **BOX_EXPORT_FIELDS}
+        return ORDER_EXPORT_FIELDS
+
+    def get_rows(self):
+        ordering = ('id', 'boxes__id') if self.include_boxes else ('id',)
+        return self.queryset.values(*self.get_fields()).order_by(*ordering).iterator(chunk_size=self.chunk_size)
+
+    def iter_csv(self):
+        writer = csv.writer(Echo())
+        columns = list(ORDER_EXPORT_FIELDS.values())
+        if self.include_boxes:
+            columns += [f'box_{column}' for column in BOX_EXPORT_FIELDS.values()]
+        yield writer.writerow(columns)
+        fields = list(self.get_fields())
+        for row in self.get_rows():
+            yield writer.writerow([row[field] for field in fields])
+
+    def iter_ndjson(self):
+        """Строка на заказ, коробки заказа - вложенным массивом"""
+        encoder = DjangoJSONEncoder(ensure_ascii=False)
+        for _, rows in groupby(self.get_rows(), key=itemgetter('id')):
+            rows = list(rows)
+            order = {column: rows[0][field] for field, column in ORDER_EXPORT_FIELDS.items()}
+            if self.include_boxes:
+                order['boxes'] = [{column: row[field] for field, column in BOX_EXPORT_FIELDS.items()}
+                                  for row in rows if row['boxes__id'] is not None]
+            yield encoder.encode(order) + '\n'
+
+    def iter_content(self, file_format):
+        if file_format == 'csv':
+            return self.iter_csv()
+        return self.iter_ndjson()
@@ -0,0 +1,101 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from orders.serializers import OrderBulkCreateSerializer
+
+DEFAULT_ENCODING = 'utf-8-sig'
+
+
+def check_encoding(file, encoding, sample_size=64 * 1024):
+    """Проверка кодировки по началу бинарного файла, до начала импорта.
+
+    Вызывает LookupError для неизвестной кодировки и UnicodeDecodeError, позиция файла не меняется"""
+    position = file.tell()
+    sample = file.read(sample_size)
+    file.seek(position)
+    codecs.getincrementaldecoder(encoding)().decode(sample)
+
+
+def decode_lines(file, encoding):
+    """Построчное декодирование бинарного файла для OrderImport: ошибка кодировки относится к своей строке"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for line in file:
+        yield decoder.decode(line)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+class OrderImport:
+    """Потоковый импорт заказов из CSV или NDJSON.
+
+    Файл читается построчно, строки валидируются пакетами по chunk_size правилами полей
+    OrderCreateSerializer (OrderBulkCreateSerializer), заказы каждого пакета вставляются через bulk_create.
+    В памяти одновременно только один пакет: run() возвращает генератор результатов по пакетам.
+    Пустые ячейки CSV считаются непереданными полями. lines - строки файла (decode_lines или текстовый файл)."""
+    formats = ('csv', 'ndjson')
+
+    def __init__(self, lines, file_format, context, chunk_size=1000):
+        self.lines = lines
+        self.file_format = file_format
+        self.context = context
+        self.chunk_size = min(chunk_size, OrderBulkCreateSerializer.Meta.list_serializer_class.max_length)
+
+    def iter_csv(self):
+        reader = csv.DictReader(self.lines)
+        for row in reader:
+            yield reader.line_num, {field: value for field, value in row.items() if field and value != ''}, None
+
+    def iter_ndjson(self):
+        for line_num, line in enumerate(self.lines, 1):
+            if not line.strip():
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as exc:
+                yield line_num, None, f'Invalid JSON: {exc}'
+                continue
+            if isinstance(data, dict):
+                yield line_num, data, None
+            else:
+                yield line_num, None, 'Expected a JSON object.'
+
+    def iter_records(self):
+        """(номер строки, данные, ошибка разбора строки)
+
+        Ошибка декодирования (неверная кодировка после проверенного начала файла) возвращается ошибкой
+        следующей строки и завершает импорт"""
+        records = self.iter_csv() if self.file_format == 'csv' else self.iter_ndjson()
+        line_num = 0
+        try:
+            for line_num, data, error in records:
+                yield line_num, data, error
+        except UnicodeDecodeError as exc:
+            yield (line_num + 1, None,
+                   f'Invalid {exc.encoding} encoding: {exc.reason}. The rest of the file was skipped.')
+
+    def run(self):
+        """Результаты по пакетам: processed, created, failed (нарастающим итогом) и errors пакета"""
+        records = self.iter_records()
+        processed = created = failed = 0
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                return
+            errors = [{'line': line_num, 'errors': {'non_field_errors': [error]}}
+                      for line_num, data, error in chunk if error]
+            rows = [(line_num, data) for line_num, data, error in chunk if not error]
+            if rows:
+                serializer = OrderBulkCreateSerializer(data=[data for _, data in rows], many=True,
+                                                       context=self.context)
+                serializer.is_valid(raise_exception=True)
+                orders = serializer.save() if serializer.validated_data else []
+                created += len(orders)
+                errors += [{'line': rows[index][0], 'client_tracking': rows[index][1].get('client_tracking'),
+                            'errors': item_errors} for index, item_errors in sorted(serializer.item_errors.items())]
+            processed += len(chunk)
+            failed += len(errors)
+            yield {'processed': processed, 'created': created, 'failed': failed,
+                   'errors': sorted(errors, key=lambda error: error['line'])}
@@ -0,0 +1,245 @@
+import json
+import platform
+import random
+import subprocess
+import time
+from datetime import date, time as datetime_time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import URLResolver, reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from boxes.counters import rebuild_box_counters
+from boxes.models import Box
+from carrier_accounting_system.urls import urlpatterns_api_v1
+from companies.models import Company
+from events.models import Event
+from orders.models import Order
+from shipments.models import Shipment
+from users.models import User
+
+BENCHMARK_COMPANY_NAME = 'benchmark'
+
+# дополнительные параметры запросов для эндпоинтов списков, по имени маршрута
+LIST_VARIANTS = [{}, {'page_size': 100}, {'page': 'last'}]
+EXTRA_VARIANTS = {
+    'order-list': [{'pagination': 'cursor', 'page_size': 100}, {'client_tracking': '1'}, {'recipient_order_num': '1'},
+                   {'shipping_date_from': '2021-06-01', 'shipping_date_to': '2021-06-07'}],
+    'box-list': [{'pagination': 'cursor', 'page_size': 100}, {'status': 'SORTING'}, {'barcode': '1'}],
+    'shipment-list': [{'summary': 'true'}],
+}
+# параметры вместо LIST_VARIANTS для эндпоинтов с обязательными параметрами
+LIST_VARIANTS_OVERRIDES = {
+    'order-search': [{'q': 'address 4242'}, {'q': '+70000004242'}, {'q': 'recipient 77', 'limit': 100}],
+}
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, max(0, round(percent / 100 * len(values) + 0.5) - 1))]
+
+
+def get_api_endpoints(patterns=urlpatterns_api_v1, prefix=None):
+    """GET-эндпоинты viewset'ов из urlpatterns_api_v1: (имя маршрута, namespace, нужен ли pk)"""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from get_api_endpoints(pattern.url_patterns, pattern.namespace or prefix)
+            continue
+        actions = getattr(pattern.callback, 'actions', None)
+        groups = pattern.pattern.regex.groupindex
+        if not actions or 'get' not in actions or 'format' in groups:
+            continue
+        yield pattern.name, prefix, 'pk' in groups
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочное тестирование REST API на синтетических данных: задержка (p50/p99), '
+            'количество запросов к БД и пропускная способность для каждого GET-эндпоинта. '
+            'Работает с тестовой базой данных, результаты сохраняются в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000, help='Количество заказов')
+        parser.add_argument('--boxes-per-order', type=int, default=3)
+        parser.add_argument('--boxes-per-shipment', type=int, default=50)
+        parser.add_argument('--companies', type=int, default=10)
+        parser.add_argument('--users-per-company', type=int, default=5)
+        parser.add_argument('--requests', type=int, default=50, help='Количество запросов к каждому эндпоинту')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Не удалять тестовую базу данных, повторно использовать сгенерированные данные')
+        parser.add_argument('--output', default='benchmark_api.json', help='Файл с результатами')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            if not Company.objects.filter(name=BENCHMARK_COMPANY_NAME).exists():
+                start = time.perf_counter()
+                self.seed(options)
+                self.stdout.write(f'Seeded in {time.perf_counter() - start:.1f} s')
+            results = self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        with open(options['output'], 'w') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        self.stdout.write(f'Results written to {options["output"]}')
+
+    def seed(self, options):
+        batch_size = options['batch_size']
+        companies = [Company(name=f'{BENCHMARK_COMPANY_NAME} {i}') for i in range(options['companies'])]
+        companies.append(Company(name=BENCHMARK_COMPANY_NAME, is_transport_company=True))
+        Company.objects.bulk_create(companies)
+        companies = list(Company.objects.order_by('id'))
+        User.objects.bulk_create([
+            User(username=f'{BENCHMARK_COMPANY_NAME}_{company.id}_{i}', company=company)
+            for company in companies for i in range(options['users_per_company'])
+        ])
+        users = list(User.objects.order_by('id'))
+
+        rng = random.Random(0)
+        for start in range(0, options['orders'], batch_size):
+            orders = []
+            for i in range(start, min(start + batch_size, options['orders'])):
+                user = users[i % len(users)]
+                orders.append(Order(
+                    user=user,
+                    company_id=user.company_id,
+                    logistic_tracking=f'{BENCHMARK_COMPANY_NAME}{i}',
+                    client_tracking=f'{i}',
+                    client_name=f'client {i % 100}',
+                    shipping_date=date(2021, rng.randint(1, 12), rng.randint(1, 28)),
+                    shipping_time=datetime_time(rng.randint(0, 23)),
+                    shipping_from=f'shipping from {i}',
+                    recipient_order_num=f'{i}',
+                    cargo_qty=options['boxes_per_order'],
+                    cargo_weight=rng.uniform(1, 100),
+                    recipient_city=f'city {i % 1000}',
+                    recipient_address=f'address {i}',
+                    recipient_name=f'recipient {i}',
+                    recipient_phone=f'+7{i:010d}',
+                    comments='comment ' * 10,
+                ))
+            Order.objects.bulk_create(orders)
+
+        boxes_count = options['orders'] * options['boxes_per_order']
+        shipments_count = boxes_count // options['boxes_per_shipment']
+        for start in range(0, shipments_count, batch_size):
+            Shipment.objects.bulk_create([
+                Shipment(waybill_num=f'{i}', waybill_date=timezone.now(), author=users[i % len(users)])
+                for i in range(start, min(start + batch_size, shipments_count))
+            ])
+        shipments_ids = list(Shipment.objects.order_by('id').values_list('id', flat=True))
+
+        boxes = []
+        events = []
+        statuses = Box.StatusChoices.values
+        orders = Order.objects.order_by('id').values_list('id', 'user_id').iterator(chunk_size=batch_size)
+        for number, (order_id, user_id) in enumerate(orders):
+            events.append(Event(order_id=order_id, user_id=user_id, status=Event.StatusChoices.NEW))
+            for i in range(options['boxes_per_order']):
+                box_number = number * options['boxes_per_order'] + i
+                shipment_number = box_number // options['boxes_per_shipment']
+                boxes.append(Box(
+                    order_id=order_id,
+                    client_code=f'{box_number}',
+                    code=f'{BENCHMARK_COMPANY_NAME}{box_number}',
+                    width=rng.uniform(0.1, 1), height=rng.uniform(0.1, 1), length=rng.uniform(0.1, 1),
+                    weight=rng.uniform(0.1, 30),
+                    status=rng.choice(statuses),
+                    shipment_id=shipments_ids[shipment_number] if shipment_number < len(shipments_ids) else None,
+                ))
+            if len(boxes) >= batch_size:
+                Box.objects.bulk_create(boxes)
+                Event.objects.bulk_create(events)
+                boxes, events = [], []
+        Box.objects.bulk_create(boxes)
+        Event.objects.bulk_create(events)
+        rebuild_box_counters()
+
+    def measure(self, client, url, params, options):
+        for _ in range(options['warmup']):
+            client.get(url, params)
+        latencies = []
+        queries = []
+        size = 0
+        status_code = None
+        for _ in range(options['requests']):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(url, params)
+                # потоковые ответы (выгрузка) формируются при чтении
+                content = b''.join(response.streaming_content) if response.streaming else response.content
+                latencies.append(time.perf_counter() - start)
+            queries.append(len(context))
+            size = len(content)
+            status_code = response.status_code
+        return {
+            'url': url,
+            'params': params,
+            'status_code': status_code,
+            'response_bytes': size,
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+            'throughput_rps': round(len(latencies) / sum(latencies), 2),
+            'queries_per_request': round(sum(queries) / len(queries), 2),
+            'max_queries_per_request': max(queries),
+        }
+
+    def run_benchmark(self, options):
+        results = {
+            'commit': self.get_commit(),
+            'datetime': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'scale': {
+                'orders': Order.objects.count(),
+                'boxes': Box.objects.count(),
+                'shipments': Shipment.objects.count(),
+                'events': Event.objects.count(),
+            },
+            'endpoints': [],
+        }
+        for company_filter, user_role in (({'is_transport_company': False}, 'client'),
+                                          ({'is_transport_company': True}, 'transport_company')):
+            user = User.objects.filter(company__name__startswith=BENCHMARK_COMPANY_NAME,
+                                       company__in=Company.objects.filter(**company_filter)).order_by('id').first()
+            token, _ = Token.objects.get_or_create(user=user)
+            client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+            for name, namespace, detail in get_api_endpoints():
+                if detail:
+                    list_response = client.get(reverse(f'{namespace}:{name.split("-")[0]}-list')).json()
+                    if not list_response['results']:
+                        continue
+                    url = reverse(f'{namespace}:{name}', kwargs={'pk': list_response['results'][0]['id']})
+                    variants = [{}]
+                else:
+                    url = reverse(f'{namespace}:{name}')
+                    variants = LIST_VARIANTS_OVERRIDES.get(name, LIST_VARIANTS) + EXTRA_VARIANTS.get(name, [])
+                for params in variants:
+                    result = self.measure(client, url, params, options)
+                    result.update({'endpoint': f'{namespace}:{name}', 'user': user_role})
+                    results['endpoints'].append(result)
+                    self.stdout.write(
+                        f'{user_role:<17} {name:<16} {json.dumps(params):<45} '
+                        f'p50 {result["p50_ms"]:>9.2f} ms  p99 {result["p99_ms"]:>9.2f} ms  '
+                        f'{result["throughput_rps"]:>8.1f} rps  {result["queries_per_request"]:>6.1f} queries'
+                    )
+        return results
+
+    def get_commit(self):
+        try:
+            return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=getattr(settings, 'BASE_DIR', None),
+                                  capture_output=True, text=True).stdout.strip() or None
+        except OSError:
+            return None
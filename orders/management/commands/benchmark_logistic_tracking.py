@@ -0,0 +1,50 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from orders.models import Order
+from orders.utils import GENERATE_LOGISTIC_TRACKING_BASE, generate_logistic_tracking
+
+
+def generate_logistic_tracking_with_lookup(user_id):
+    """Прежний генератор: случайный двузначный суффикс и проверка существования номера запросом"""
+    while True:
+        logistic_tracking = str(GENERATE_LOGISTIC_TRACKING_BASE + user_id) + str(random.randint(10, 99))
+        if not Order.objects.filter(logistic_tracking=logistic_tracking).exists():
+            break
+    return logistic_tracking
+
+
+class Command(BaseCommand):
+    help = 'Сравнение генерации номеров заявок: проверка существования номера в цикле и выдача из блока'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=80,
+                            help='Количество заказов одного пользователя. '
+                                 'Прежний генератор не может выдать больше 90 номеров')
+
+    def handle(self, *args, **options):
+        user = get_user_model().objects.create(username=f'benchmark_logistic_tracking_{time.time_ns()}')
+        try:
+            for name, generator in (('lookup loop', generate_logistic_tracking_with_lookup),
+                                    ('block allocator', generate_logistic_tracking)):
+                orders = min(options['orders'], 89) if generator is generate_logistic_tracking_with_lookup \
+                    else options['orders']
+                elapsed = 0
+                queries = 0
+                for _ in range(orders):
+                    with CaptureQueriesContext(connection) as context:
+                        start = time.perf_counter()
+                        logistic_tracking = generator(user.id)
+                        elapsed += time.perf_counter() - start
+                    queries += len(context)
+                    Order.objects.create(user=user, logistic_tracking=logistic_tracking,
+                                         client_tracking=logistic_tracking, recipient_order_num=logistic_tracking)
+                self.stdout.write(f'{name}: {orders} numbers, {elapsed * 1000:.2f} ms, '
+                                  f'{elapsed / orders * 1000000:.1f} us per number, {queries} queries')
+        finally:
+            user.delete()
@@ -0,0 +1,67 @@
+import time
+
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from boxes.models import Box
+from boxes.serializers import BoxListRetrieveSerializer
+from carrier_accounting_system.values_serializers import ValuesSerializer
+from orders.management.commands.benchmark_api import Command as BenchmarkCommand
+from orders.models import Order
+from orders.serializers import OrderListRetrieveSerializer
+from orders.views import OrderViewSet
+from shipments.models import Shipment
+from shipments.serializers import ShipmentListRetrieveSerializer
+
+
+class Command(BenchmarkCommand):
+    help = ('Сравнение сериализаторов DRF и ValuesSerializer на страницах списков заказов, коробок и отправлений: '
+            'время запроса, сериализации и рендеринга JSON. Работает с тестовой базой данных, '
+            'результаты сохраняются в JSON')
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.set_defaults(orders=2000, requests=20, output='benchmark_serializers.json')
+
+    def get_cases(self):
+        return [
+            ('orders', OrderListRetrieveSerializer, OrderViewSet.values_computed_fields,
+             Order.objects.select_related('user__company', 'company').order_by('id')),
+            ('boxes', BoxListRetrieveSerializer, None, Box.objects.order_by('id')),
+            ('shipments', ShipmentListRetrieveSerializer, None,
+             Shipment.objects.select_related('author__company').prefetch_related('boxes').order_by('id')),
+        ]
+
+    def measure(self, render, options):
+        for _ in range(options['warmup']):
+            render()
+        latencies = []
+        for _ in range(options['requests']):
+            start = time.perf_counter()
+            content = render()
+            latencies.append(time.perf_counter() - start)
+        return content, sum(latencies) / len(latencies) * 1000
+
+    def run_benchmark(self, options):
+        results = {'datetime': timezone.now().isoformat(), 'page_size': options['page_size'], 'cases': []}
+        renderer = JSONRenderer()
+        page_size = options['page_size']
+        for name, serializer_class, computed_fields, queryset in self.get_cases():
+            values_serializer = ValuesSerializer(serializer_class, computed_fields)
+            serializer_content, serializer_ms = self.measure(
+                lambda: renderer.render(serializer_class(queryset[:page_size], many=True).data), options)
+            values_queryset = values_serializer.get_queryset(queryset)
+            values_content, values_ms = self.measure(
+                lambda: renderer.render(values_serializer.serialize(values_queryset[:page_size])), options)
+            result = {
+                'endpoint': name,
+                'serializer_ms': round(serializer_ms, 3),
+                'values_serializer_ms': round(values_ms, 3),
+                'speedup': round(serializer_ms / values_ms, 2),
+                'identical': serializer_content == values_content,
+            }
+            results['cases'].append(result)
+            self.stdout.write(f'{name:<10} serializer {serializer_ms:>9.2f} ms  values {values_ms:>9.2f} ms  '
+                              f'x{result["speedup"]:<5} identical: {result["identical"]}')
+        return results
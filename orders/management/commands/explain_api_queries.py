@@ -0,0 +1,97 @@
+import json
+import re
+
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from companies.models import Company
+from events.models import Event
+from orders.management.commands.benchmark_api import (BENCHMARK_COMPANY_NAME, EXTRA_VARIANTS, LIST_VARIANTS,
+                                                      LIST_VARIANTS_OVERRIDES, Command as BenchmarkCommand,
+                                                      get_api_endpoints)
+from orders.models import Order
+from users.models import User
+
+# строки плана, означающие полный просмотр таблицы: SQLite (SCAN без индекса, кроме подзапросов)
+# и PostgreSQL (Seq Scan). Для транспортной компании списки без фильтра просматривают таблицу в порядке
+# первичного ключа до LIMIT, это ожидаемо
+SEQ_SCAN_RE = re.compile(r'\bSCAN (TABLE )?(?!subquery)(?P<sqlite>\w+)(?!.*INDEX)|Seq Scan on (?P<postgresql>\w+)')
+
+
+def find_seq_scans(plan):
+    """Таблицы, которые просматриваются полностью по плану запроса"""
+    return [match.group('sqlite') or match.group('postgresql') for match in SEQ_SCAN_RE.finditer(plan)]
+
+
+def explain_sql(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}')
+        return '\n'.join(' '.join(str(value) for value in row) for row in cursor.fetchall())
+
+
+class Command(BenchmarkCommand):
+    help = ('Планы выполнения (EXPLAIN) SQL-запросов GET-эндпоинтов REST API и запросов проверки уникальности '
+            'на синтетических данных. Отмечает запросы с полным просмотром таблиц. '
+            'Работает с тестовой базой данных, результаты сохраняются в JSON')
+
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument('--fail-on-seq-scan', action='store_true',
+                            help='Завершиться с ошибкой, если найден полный просмотр таблицы')
+        parser.set_defaults(orders=2000, output='explain_api_queries.json')
+
+    def handle(self, *args, **options):
+        self.seq_scans = []
+        super(Command, self).handle(*args, **options)
+        if options['fail_on_seq_scan'] and self.seq_scans:
+            raise CommandError(f'Sequential scans found in {len(self.seq_scans)} queries')
+
+    def add_plan(self, results, source, sql, plan):
+        seq_scans = find_seq_scans(plan)
+        results['queries'].append({'source': source, 'sql': sql, 'plan': plan, 'seq_scans': seq_scans})
+        if seq_scans:
+            self.seq_scans.append(sql)
+        self.stdout.write(f'{"SEQ SCAN " + ", ".join(seq_scans) if seq_scans else "ok":<40} {source}')
+
+    def run_benchmark(self, options):
+        results = {'database': connection.vendor, 'queries': []}
+        for company_filter, user_role in (({'is_transport_company': False}, 'client'),
+                                          ({'is_transport_company': True}, 'transport_company')):
+            user = User.objects.filter(company__name__startswith=BENCHMARK_COMPANY_NAME,
+                                       company__in=Company.objects.filter(**company_filter)).order_by('id').first()
+            token, _ = Token.objects.get_or_create(user=user)
+            client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+            for name, namespace, detail in get_api_endpoints():
+                if detail:
+                    list_response = client.get(reverse(f'{namespace}:{name.split("-")[0]}-list')).json()
+                    if not list_response['results']:
+                        continue
+                    url = reverse(f'{namespace}:{name}', kwargs={'pk': list_response['results'][0]['id']})
+                    variants = [{}]
+                else:
+                    url = reverse(f'{namespace}:{name}')
+                    variants = LIST_VARIANTS_OVERRIDES.get(name, LIST_VARIANTS) + EXTRA_VARIANTS.get(name, [])
+                for params in variants:
+                    with CaptureQueriesContext(connection) as context:
+                        client.get(url, params)
+                    for query in context.captured_queries:
+                        if query['sql'].lstrip().upper().startswith('SELECT'):
+                            self.add_plan(results, f'{user_role} GET {url} {json.dumps(params)}',
+                                          query['sql'], explain_sql(query['sql']))
+
+        # запросы, которые выполняются не в GET-эндпоинтах: проверка уникальности номера заказа
+        # при массовом создании и история событий заказа
+        order = Order.objects.order_by('id').first()
+        querysets = {
+            'orders bulk client_tracking check': Order.objects.filter(
+                company_id=order.company_id, client_tracking__in=[order.client_tracking]).values('client_tracking'),
+            'order events': Event.objects.filter(order=order).order_by('datetime'),
+        }
+        for source, queryset in querysets.items():
+            self.add_plan(results, source, str(queryset.query), queryset.explain())
+        return results
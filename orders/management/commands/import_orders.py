@@ -0,0 +1,52 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.imports import DEFAULT_ENCODING, OrderImport, check_encoding, decode_lines
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ('Потоковый импорт заказов из файла CSV или NDJSON от имени пользователя. '
+            'Строки с ошибками записываются в файл ошибок (CSV: строка, client_tracking, ошибки)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с заказами')
+        parser.add_argument('--username', required=True, help='Пользователь, от имени которого создаются заказы')
+        parser.add_argument('--file-format', choices=OrderImport.formats,
+                            help='По умолчанию определяется по расширению файла')
+        parser.add_argument('--encoding', default=DEFAULT_ENCODING, help='Кодировка файла, по умолчанию UTF-8')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--errors', default='import_orders_errors.csv', help='Файл ошибок')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.select_related('company').get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["username"]}" does not exist')
+        file_format = options['file_format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if file_format not in OrderImport.formats:
+            raise CommandError(f'Unknown file format "{file_format}", use --file-format')
+
+        with open(options['path'], 'rb') as file, \
+                open(options['errors'], 'w', encoding='utf-8', newline='') as errors_file:
+            try:
+                check_encoding(file, options['encoding'])
+            except LookupError:
+                raise CommandError(f'Unknown encoding "{options["encoding"]}"')
+            except UnicodeDecodeError as exc:
+                raise CommandError(f'The file is not valid {options["encoding"]} text: {exc.reason}, use --encoding')
+            errors_writer = csv.writer(errors_file)
+            errors_writer.writerow(['line', 'client_tracking', 'errors'])
+            result = {'processed': 0, 'created': 0, 'failed': 0}
+            order_import = OrderImport(decode_lines(file, options['encoding']), file_format, context={'user': user},
+                                       chunk_size=options['chunk_size'])
+            for result in order_import.run():
+                for error in result.pop('errors'):
+                    errors_writer.writerow([error['line'], error.get('client_tracking', ''),
+                                            json.dumps(error['errors'], ensure_ascii=False)])
+                self.stdout.write(f'Processed {result["processed"]}, created {result["created"]}, '
+                                  f'failed {result["failed"]}')
+        self.stdout.write(f'Done: created {result["created"]} of {result["processed"]} orders, '
+                          f'errors written to {options["errors"]}')
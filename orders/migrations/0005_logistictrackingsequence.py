@@ -0,0 +1,20 @@
+# Generated by Django 3.1.6 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_auto_20210305_0038'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LogisticTrackingSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Последний выданный номер')),
+            ],
+        ),
+    ]
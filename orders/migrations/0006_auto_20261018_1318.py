@@ -0,0 +1,44 @@
+# Generated by Django 3.1.6 on 2026-10-18 10:18
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+DUPLICATE_SUFFIX = '~dup{}'
+
+
+def rename_duplicate_client_trackings(apps, schema_editor):
+    """До ограничения уникальности проверка существования номера не защищала от параллельных запросов:
+    у повторов (company, client_tracking), кроме самого раннего заказа, к номеру добавляется ~dup<id>,
+    исходный номер сохраняется в комментарии заказа"""
+    Order = apps.get_model('orders', 'Order')
+    max_length = Order._meta.get_field('client_tracking').max_length
+    duplicates = (Order.objects.values('company_id', 'client_tracking').order_by()
+                  .annotate(count=Count('id'), first_id=Min('id')).filter(count__gt=1))
+    for duplicate in duplicates:
+        orders = Order.objects.filter(company_id=duplicate['company_id'], client_tracking=duplicate['client_tracking'],
+                                      id__gt=duplicate['first_id'])
+        for order in orders:
+            suffix = DUPLICATE_SUFFIX.format(order.id)
+            order.client_tracking = order.client_tracking[:max_length - len(suffix)] + suffix
+            order.comments = '\n'.join(filter(None, [
+                order.comments, f'Повтор номера заявки {duplicate["client_tracking"]}, номер изменен миграцией']))
+            order.save(update_fields=['client_tracking', 'comments'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_logistictrackingsequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_client_trackings, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['company', 'id'], name='order_company_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(fields=('company', 'client_tracking'), name='order_company_client_tracking_uniq'),
+        ),
+    ]
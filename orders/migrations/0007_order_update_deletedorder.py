@@ -0,0 +1,41 @@
+# Generated by Django 3.1.6 on 2026-10-18 10:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+        ('orders', '0006_auto_20261018_1318'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletedOrder',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.IntegerField(verbose_name='Идентификатор заказа')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='update',
+            field=models.DateTimeField(auto_now=True, help_text='Обновляется при изменении заказа и его коробок', verbose_name='Дата последнего изменения заказа'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['company', 'update'], name='order_company_update_idx'),
+        ),
+        migrations.AddField(
+            model_name='deletedorder',
+            name='company',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='deleted_orders', to='companies.company', verbose_name='Компания'),
+        ),
+        migrations.AddIndex(
+            model_name='deletedorder',
+            index=models.Index(fields=['company', 'deleted_at'], name='deleted_order_company_idx'),
+        ),
+    ]
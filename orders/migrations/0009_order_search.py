@@ -0,0 +1,36 @@
+from django.db import migrations
+
+SEARCH_FIELDS = ('recipient_name', 'recipient_name2', 'recipient_phone', 'recipient_city', 'recipient_address')
+DOCUMENT = " || ' ' || ".join(f'"{field}"' for field in SEARCH_FIELDS)
+
+POSTGRESQL_FORWARD = [
+    # расширение pg_trgm: на управляемых СУБД может потребоваться создать его заранее под суперпользователем
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f"CREATE INDEX order_search_vector_idx ON orders_order USING gin (to_tsvector('simple'::regconfig, {DOCUMENT}))",
+    f'CREATE INDEX order_search_trgm_idx ON orders_order USING gin (({DOCUMENT}) gin_trgm_ops)',
+]
+POSTGRESQL_BACKWARD = [
+    'DROP INDEX IF EXISTS order_search_trgm_idx',
+    'DROP INDEX IF EXISTS order_search_vector_idx',
+]
+
+
+def run_sql(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+    """Индексы полнотекстового поиска заказов по получателю, см. orders.search"""
+
+    dependencies = [
+        ('orders', '0008_auto_20261018_1335'),
+    ]
+
+    # в SQLite таблица FTS5 и триггеры создаются после каждой миграции (orders.signals): Django пересоздает
+    # таблицу orders_order при изменении полей, и триггеры удаляются вместе со старой таблицей
+    operations = [
+        migrations.RunPython(run_sql({'postgresql': POSTGRESQL_FORWARD}), run_sql({'postgresql': POSTGRESQL_BACKWARD})),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 3.1.6 on 2026-10-18 11:00
+
+from django.db import migrations, models
+from django.db.models import Case, CharField, Count, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+STATUSES = ('NEW', 'READY_FOR_SHIPPING', 'SORTING', 'DELIVERING', 'DELAYED', 'DONE', 'CANCELED')
+# совпадает с orders.statuses.AGGREGATE_STATUS_PRIORITY
+AGGREGATE_STATUS_PRIORITY = ('DELAYED', 'NEW', 'READY_FOR_SHIPPING', 'SORTING', 'DELIVERING', 'DONE', 'CANCELED')
+
+
+def fill_orders_counters(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+    Box = apps.get_model('boxes', 'Box')
+    Order.objects.update(**{
+        f'boxes_{status.lower()}': Coalesce(Subquery(
+            Box.objects.filter(order=OuterRef('pk'), status=status).order_by()
+            .values('order').annotate(count=Count('id')).values('count')), 0)
+        for status in STATUSES
+    })
+    Order.objects.update(aggregate_status=Case(
+        *[When(**{f'boxes_{status.lower()}__gt': 0}, then=Value(status)) for status in AGGREGATE_STATUS_PRIORITY],
+        default=Value('NEW'), output_field=CharField(),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_search'),
+        ('boxes', '0007_auto_20261018_1335'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='aggregate_status',
+            field=models.CharField(choices=[('NEW', 'Новый заказ'), ('READY_FOR_SHIPPING', 'Собран на складе отправителя'), ('SORTING', 'На складе транспортной компании'), ('DELIVERING', 'Доставляется (передан курьеру для доставки покупателю)'), ('DELAYED', 'Доставка не была выполнена в срок'), ('DONE', 'Доставлен'), ('CANCELED', 'Отменен')], default='NEW', help_text='Вычисляется по статусам коробок при их изменении', max_length=32, verbose_name='Статус заказа'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='boxes_canceled',
+            field=models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе CANCELED'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='boxes_delayed',
+            field=models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе DELAYED'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='boxes_delivering',
+            field=models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе DELIVERING'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='boxes_done',
+            field=models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе DONE'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='boxes_new',
+            field=models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе NEW'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='boxes_ready_for_shipping',
+            field=models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе READY_FOR_SHIPPING'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='boxes_sorting',
+            field=models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе SORTING'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['company', 'aggregate_status'], name='order_company_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['aggregate_status'], name='order_aggregate_status_idx'),
+        ),
+        migrations.RunPython(fill_orders_counters, migrations.RunPython.noop),
+    ]
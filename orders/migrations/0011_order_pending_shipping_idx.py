@@ -0,0 +1,17 @@
+# Generated by Django 3.1.6 on 2026-10-18 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_aggregate_status'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('boxes_new__gt', 0), ('boxes_ready_for_shipping__gt', 0), ('boxes_sorting__gt', 0), ('boxes_delivering__gt', 0), _connector='OR'), fields=['shipping_date', 'id'], name='order_pending_shipping_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.1.6 on 2026-10-18 11:19
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_delayed_orders(apps, schema_editor):
+    """Заказы с уже задержанными коробками не задерживаются повторно после продолжения пути коробок"""
+    Order = apps.get_model('orders', 'Order')
+    Order.objects.filter(boxes_delayed__gt=0).update(delayed_at=F('update'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0011_order_pending_shipping_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_pending_shipping_idx',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='delayed_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Заполняется boxes.delays, сбрасывается при изменении даты или времени подачи транспорта', null=True, verbose_name='Дата автоматической задержки коробок'),
+        ),
+        migrations.RunPython(mark_delayed_orders, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('delayed_at__isnull', True), models.Q(('boxes_new__gt', 0), ('boxes_ready_for_shipping__gt', 0), ('boxes_sorting__gt', 0), ('boxes_delivering__gt', 0), _connector='OR')), fields=['shipping_date', 'id'], name='order_pending_shipping_idx'),
+        ),
+    ]
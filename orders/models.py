@@ -1,19 +1,29 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import Q
 
 from companies.models import Company
 
+# заказы с коробками, которые еще не доставлены, не отменены и не задержаны (boxes.delays)
+HAS_PENDING_BOXES = (Q(boxes_new__gt=0) | Q(boxes_ready_for_shipping__gt=0) | Q(boxes_sorting__gt=0)
+                     | Q(boxes_delivering__gt=0))
+# заказы, которые проверяет boxes.delays: коробки заказа задерживаются один раз, после этого
+# коробки, продолжившие путь из DELAYED, снова не задерживаются
+DELAY_CANDIDATES = Q(delayed_at__isnull=True) & HAS_PENDING_BOXES
+
 
 class Order(models.Model):
-    STATUS_CHOICES = {
-        ('NEW', 'Новый заказ'),
-        ('READY_FOR_SHIPPING', 'Собран на складе отправителя'),
-        ('SORTING', 'На складе транспортной компании'),
-        ('DELIVERING', 'Доставляется (передан курьеру для доставки покупателю)'),
-        ('DELAYED', 'Доставка не была выполнена в срок'),
-        ('DONE', 'Доставлен'),
-        ('CANCELED', 'Отменен'),
-    }
+    class StatusChoices(models.TextChoices):
+        NEW = 'NEW', 'Новый заказ'
+        READY_FOR_SHIPPING = 'READY_FOR_SHIPPING', 'Собран на складе отправителя'
+        SORTING = 'SORTING', 'На складе транспортной компании'
+        DELIVERING = 'DELIVERING', 'Доставляется (передан курьеру для доставки покупателю)'
+        DELAYED = 'DELAYED', 'Доставка не была выполнена в срок'
+        DONE = 'DONE', 'Доставлен'
+        CANCELED = 'CANCELED', 'Отменен'
+
+    # поля с количеством коробок заказа в каждом статусе, см. orders.statuses
+    BOX_COUNT_FIELDS = {status: f'boxes_{status.lower()}' for status in StatusChoices.values}
 
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders',
                              verbose_name='Пользователь системы', help_text='Пользователь, создавший заказ')
@@ -52,12 +62,53 @@ class Order(models.Model):
     recipient_name = models.CharField(blank=True, max_length=264, verbose_name='ФИО получателя')
     recipient_name2 = models.CharField(blank=True, max_length=264,
                                        verbose_name='ФИО получателя. Альтернативный получатель')
-    update = models.DateTimeField(auto_now_add=True, verbose_name='Дата последнего изменения заказа')
+    update = models.DateTimeField(auto_now=True, verbose_name='Дата последнего изменения заказа',
+                                  help_text='Обновляется при изменении заказа и его коробок')
     comments = models.TextField(blank=True, verbose_name='Комментарии к заказу')
+    delayed_at = models.DateTimeField(null=True, blank=True, editable=False,
+                                      verbose_name='Дата автоматической задержки коробок',
+                                      help_text='Заполняется boxes.delays, сбрасывается при изменении даты '
+                                                'или времени подачи транспорта')
+    aggregate_status = models.CharField(max_length=32, choices=StatusChoices.choices, default=StatusChoices.NEW,
+                                        verbose_name='Статус заказа',
+                                        help_text='Вычисляется по статусам коробок при их изменении')
+    boxes_new = models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе NEW')
+    boxes_ready_for_shipping = models.PositiveIntegerField(default=0,
+                                                           verbose_name='Коробок в статусе READY_FOR_SHIPPING')
+    boxes_sorting = models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе SORTING')
+    boxes_delivering = models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе DELIVERING')
+    boxes_delayed = models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе DELAYED')
+    boxes_done = models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе DONE')
+    boxes_canceled = models.PositiveIntegerField(default=0, verbose_name='Коробок в статусе CANCELED')
+
+    class Meta:
+        indexes = [
+            # список заказов компании с сортировкой и пагинацией по id
+            models.Index(fields=['company', 'id'], name='order_company_id_idx'),
+            # дельта-синхронизация: ?modified_since=
+            models.Index(fields=['company', 'update'], name='order_company_update_idx'),
+            # фильтры списка: ?client_tracking=, ?recipient_order_num=, ?shipping_date_from=&shipping_date_to=.
+            # Для транспортной компании фильтр по компании не применяется, поэтому индексы без company
+            models.Index(fields=['client_tracking'], name='order_client_tracking_idx'),
+            models.Index(fields=['recipient_order_num'], name='order_recipient_num_idx'),
+            models.Index(fields=['company', 'shipping_date'], name='order_company_shipping_idx'),
+            models.Index(fields=['shipping_date'], name='order_shipping_date_idx'),
+            # фильтр списка ?aggregate_status=
+            models.Index(fields=['company', 'aggregate_status'], name='order_company_status_idx'),
+            models.Index(fields=['aggregate_status'], name='order_aggregate_status_idx'),
+            # поиск просроченных заказов (boxes.delays): в частичном индексе только еще не задержанные заказы
+            # с незавершенными коробками, после задержки коробок (delayed_at) заказ из него удаляется
+            models.Index(fields=['shipping_date', 'id'], condition=DELAY_CANDIDATES,
+                         name='order_pending_shipping_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['company', 'client_tracking'], name='order_company_client_tracking_uniq'),
+        ]
 
     @property
     def status(self):
-        return list(set(box.status for box in self.boxes.all()))
+        """Статусы коробок заказа в порядке StatusChoices"""
+        return [status for status, field in self.BOX_COUNT_FIELDS.items() if getattr(self, field)]
 
     # status.fget.help_text = u'Все статусы коробок, включенных в заказ'
 
@@ -73,3 +124,29 @@ class Order(models.Model):
     # def save(self, *args, **kwargs):
     #     self.validate_unique()
     #     super(Order, self).save(*args, **kwargs)
+
+
+class LogisticTrackingSequence(models.Model):
+    """Счетчик для номеров заявок в системе транспортной компании.
+
+    Процессы резервируют из него блоки номеров, см. orders.utils.LogisticTrackingAllocator"""
+    value = models.BigIntegerField(default=0, verbose_name='Последний выданный номер')
+
+    def __str__(self):
+        return f'Последний выданный номер: {self.value}'
+
+
+class DeletedOrder(models.Model):
+    """Удаленный заказ (tombstone) для инкрементальной синхронизации"""
+    object_id = models.IntegerField(verbose_name='Идентификатор заказа')
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, null=True, related_name='deleted_orders',
+                                verbose_name='Компания')
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата удаления')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['company', 'deleted_at'], name='deleted_order_company_idx'),
+        ]
+
+    def __str__(self):
+        return f'Удаленный заказ: {self.object_id}'
@@ -1,7 +1,127 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from datetime import datetime
 
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor
 
-class OrderPagination(PageNumberPagination):
+
+class KeysetPagination(CursorPagination):
+    """Пагинация по курсору (keyset): без COUNT(*) и OFFSET, курсоры стабильны при вставке новых записей.
+
+    Сортировка задается параметром ordering (по умолчанию id), допустимые поля
+    перечислены в атрибуте cursor_ordering_fields представления. Сортировка по неуникальному полю
+    дополняется id в том же направлении."""
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    ordering = 'id'
+    ordering_query_param = 'ordering'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = request.query_params.get(self.ordering_query_param, self.ordering)
+        if ordering.lstrip('-') not in getattr(view, 'cursor_ordering_fields', ('id',)):
+            ordering = self.ordering
+        if ordering.lstrip('-') == 'id':
+            return (ordering,)
+        return (ordering, '-id' if ordering.startswith('-') else 'id')
+
+
+class TupleKeysetPagination(KeysetPagination):
+    """Keyset по всем полям сортировки: позиция курсора - значения полей крайней записи страницы,
+    следующая страница - (a > x) OR (a = x AND b > y) (для поля по убыванию - <), без OFFSET
+    при совпадающих значениях первого поля"""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        if self.cursor and self.cursor.position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(queryset.model, self.cursor.position, reverse))
+        results = list(queryset.order_by(*[self.reverse_field(field) if reverse else field for field in self.ordering])
+                       [:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+        has_cursor = bool(self.cursor and self.cursor.position is not None)
+        self.has_next, self.has_previous = (has_cursor, has_more) if reverse else (has_more, has_cursor)
+        return self.page
+
+    @staticmethod
+    def reverse_field(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    def get_fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def get_keyset_filter(self, model, position, reverse):
+        fields = self.get_fields()
+        try:
+            values = json.loads(position)
+            values = [model._meta.get_field(field).to_python(value) for field, value in zip(fields, values)]
+        except (ValueError, TypeError, LookupError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(values) != len(fields):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        for i, field in enumerate(fields):
+            lookup = 'lt' if reverse != self.ordering[i].startswith('-') else 'gt'
+            condition |= Q(**dict(zip(fields[:i], values[:i])), **{f'{field}__{lookup}': values[i]})
+        return condition
+
+    def get_position(self, instance):
+        values = [instance[field] if isinstance(instance, dict) else getattr(instance, field)
+                  for field in self.get_fields()]
+        return json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.get_position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.get_position(self.page[0])))
+
+
+class PageNumberOrCursorPagination(PageNumberPagination):
+    """Постраничная пагинация, с переключением в режим курсора параметром ?pagination=cursor.
+
+    Ссылки next/previous в режиме курсора сохраняют параметры запроса,
+    поэтому режим не нужно передавать повторно."""
+    pagination_mode_query_param = 'pagination'
+    cursor_pagination_class = TupleKeysetPagination
+
+    cursor_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.pagination_mode_query_param) == 'cursor':
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        return super(PageNumberOrCursorPagination, self).paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super(PageNumberOrCursorPagination, self).get_paginated_response(data)
+
+
+class OrderPagination(PageNumberOrCursorPagination):
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class ChangesPagination(TupleKeysetPagination):
+    """Дельта-лента изменений: курсор по времени изменения записи и id, от старых изменений к новым.
+
+    Поля сортировки возвращает метод get_changes_ordering представления"""
+
+    def get_ordering(self, request, queryset, view):
+        return view.get_changes_ordering()
@@ -0,0 +1,164 @@
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connection, connections, transaction
+from django.db.models import Q
+
+from orders.models import Order
+
+# поля заказа, по которым ищет служба поддержки
+SEARCH_FIELDS = ('recipient_name', 'recipient_name2', 'recipient_phone', 'recipient_city', 'recipient_address')
+SEARCH_MIN_LENGTH = 3
+# SQLite и другие СУБД: сколько последних найденных заказов ранжируется
+SEARCH_CANDIDATES = 1000
+
+# PostgreSQL: текст для поиска, выражение совпадает с индексами миграции 0009_order_search
+POSTGRESQL_DOCUMENT = " || ' ' || ".join(f'"orders_order"."{field}"' for field in SEARCH_FIELDS)
+POSTGRESQL_VECTOR = f"to_tsvector('simple'::regconfig, {POSTGRESQL_DOCUMENT})"
+# SQLite: таблица FTS5 с триграммным токенизатором (поиск подстрок, SQLite >= 3.34) без копии данных,
+# поддерживается триггерами
+SQLITE_FTS_TABLE = 'orders_order_fts'
+SQLITE_FTS_TRIGGERS = {
+    'insert': ('AFTER INSERT', ('new',)),
+    'delete': ('AFTER DELETE', ('old',)),
+    'update': (f'AFTER UPDATE OF {", ".join(SEARCH_FIELDS)}', ('old', 'new')),
+}
+
+TERM_RE = re.compile(r'\w+')
+
+
+def get_search_terms(query):
+    return [term.lower() for term in TERM_RE.findall(query)]
+
+
+def get_search_score(terms, values):
+    """Релевантность заказа: доля поля, которую занимает каждое найденное слово, слово целиком весит вдвое больше"""
+    score = 0
+    for value in values:
+        value = value.lower()
+        words = set(get_search_terms(value))
+        for term in terms:
+            if term in value:
+                score += len(term) / len(value) * (2 if term in words else 1)
+    return score
+
+
+def rank_candidates(terms, rows, limit):
+    """rows - (id, *значения SEARCH_FIELDS); заказы, где есть все слова, по убыванию релевантности, затем новые"""
+    results = []
+    for order_id, *values in rows:
+        text = ' '.join(values).lower()
+        if all(term in text for term in terms):
+            results.append((-get_search_score(terms, values), -order_id))
+    return [-order_id for _, order_id in sorted(results)[:limit]]
+
+
+def search_orders_postgresql(query, company_id, limit):
+    """Слова запроса как префиксы (tsvector, GIN) или запрос целиком как фрагмент текста (pg_trgm, GIN).
+    Ранг - сумма ts_rank и триграммного сходства"""
+    tsquery = ' & '.join(f'{term}:*' for term in get_search_terms(query))
+    fragment = '%' + re.sub(r'([\\%_])', r'\\\1', query) + '%'
+    sql = (f'SELECT "orders_order"."id" FROM "orders_order" '
+           f"WHERE ({POSTGRESQL_VECTOR} @@ to_tsquery('simple', %s) OR {POSTGRESQL_DOCUMENT} ILIKE %s)")
+    params = [tsquery, fragment]
+    if company_id is not None:
+        sql += ' AND "orders_order"."company_id" = %s'
+        params.append(company_id)
+    sql += (f" ORDER BY ts_rank({POSTGRESQL_VECTOR}, to_tsquery('simple', %s)) "
+            f'+ similarity({POSTGRESQL_DOCUMENT}, %s) DESC, "orders_order"."id" LIMIT %s')
+    params += [tsquery, query, limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_orders_sqlite(query, company_id, limit):
+    """Каждое слово запроса - подстрока одного из полей (FTS5, триграммы).
+
+    bm25 в FTS5 считает частоту слова по всей таблице, на миллионах заказов это секунды для частых слов,
+    поэтому ранжируются не больше SEARCH_CANDIDATES последних найденных заказов (get_search_score)"""
+    terms = get_search_terms(query)
+    indexed_terms = [term for term in terms if len(term) >= SEARCH_MIN_LENGTH]
+    if not indexed_terms:
+        return []
+    columns = ', '.join(f'"orders_order"."{field}"' for field in SEARCH_FIELDS)
+    sql = (f'SELECT "orders_order"."id", {columns} FROM "{SQLITE_FTS_TABLE}" '
+           f'INNER JOIN "orders_order" ON "orders_order"."id" = "{SQLITE_FTS_TABLE}"."rowid" '
+           f'WHERE "{SQLITE_FTS_TABLE}" MATCH %s')
+    params = [' '.join(f'"{term}"' for term in indexed_terms)]
+    # короткие слова не попадают в триграммный индекс, проверяются в найденных по остальным словам заказах
+    for term in terms:
+        if len(term) < SEARCH_MIN_LENGTH:
+            sql += ' AND (' + ' OR '.join(f'"orders_order"."{field}" LIKE %s' for field in SEARCH_FIELDS) + ')'
+            params += [f'%{term}%'] * len(SEARCH_FIELDS)
+    if company_id is not None:
+        sql += ' AND "orders_order"."company_id" = %s'
+        params.append(company_id)
+    sql += f' ORDER BY "{SQLITE_FTS_TABLE}"."rowid" DESC LIMIT %s'
+    params.append(SEARCH_CANDIDATES)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return rank_candidates(terms, cursor.fetchall(), limit)
+
+
+def get_sqlite_fts_statements(existing):
+    """SQL для создания таблицы FTS5 и недостающих триггеров; existing - имена существующих таблиц и триггеров"""
+    columns = ', '.join(SEARCH_FIELDS)
+    statements = []
+    if SQLITE_FTS_TABLE not in existing:
+        statements.append(f"CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5({columns}, content='orders_order', "
+                          f"content_rowid='id', tokenize='trigram')")
+    for name, (event, rows) in SQLITE_FTS_TRIGGERS.items():
+        if f'{SQLITE_FTS_TABLE}_{name}' in existing:
+            continue
+        body = []
+        for row in rows:
+            values = ', '.join(f'{row}.{field}' for field in SEARCH_FIELDS)
+            if row == 'old':
+                body.append(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}, rowid, {columns}) "
+                            f"VALUES ('delete', old.id, {values});")
+            else:
+                body.append(f'INSERT INTO {SQLITE_FTS_TABLE}(rowid, {columns}) VALUES (new.id, {values});')
+        statements.append(f'CREATE TRIGGER {SQLITE_FTS_TABLE}_{name} {event} ON orders_order '
+                          f'BEGIN {" ".join(body)} END')
+    return statements
+
+
+def setup_sqlite_search_index(using):
+    """Создает таблицу FTS5 и триггеры, если их нет, и перестраивает индекс, если триггеры были пересозданы"""
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE %s",
+                       [f'{SQLITE_FTS_TABLE}%'])
+        statements = get_sqlite_fts_statements({row[0] for row in cursor.fetchall()})
+        if not statements:
+            return
+        with transaction.atomic(using=using):
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO {SQLITE_FTS_TABLE}({SQLITE_FTS_TABLE}) VALUES ('rebuild')")
+
+
+def search_orders_fallback(query, company_id, limit):
+    """Другие СУБД: каждое слово - подстрока одного из полей, без индекса"""
+    terms = get_search_terms(query)
+    queryset = Order.objects.all()
+    for term in terms:
+        queryset = queryset.filter(reduce(or_, (Q(**{f'{field}__icontains': term}) for field in SEARCH_FIELDS)))
+    if company_id is not None:
+        queryset = queryset.filter(company_id=company_id)
+    rows = queryset.order_by('-id').values_list('id', *SEARCH_FIELDS)[:SEARCH_CANDIDATES]
+    return rank_candidates(terms, rows, limit)
+
+
+SEARCH_BACKENDS = {
+    'postgresql': search_orders_postgresql,
+    'sqlite': search_orders_sqlite,
+}
+
+
+def search_orders(query, company_id=None, limit=20):
+    """id заказов, найденных по получателю (ФИО, телефон, город, адрес), в порядке убывания релевантности.
+
+    company_id=None - поиск по заказам всех компаний (транспортная компания)"""
+    return SEARCH_BACKENDS.get(connection.vendor, search_orders_fallback)(query.strip(), company_id, limit)
@@ -1,14 +1,33 @@
-from django.utils import timezone
+from contextlib import contextmanager
+
+from django.db import transaction, IntegrityError
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from carrier_accounting_system.utils import BulkCreateListSerializer
 from companies.models import Company
 from companies.serializers import CompanySerializer
+from events.channels import publish_events
 from events.models import Event
 from orders.models import Order
-from orders.utils import generate_logistic_tracking
+from orders.search import SEARCH_MIN_LENGTH, get_search_terms
+from orders.utils import generate_logistic_tracking, generate_logistic_trackings
 from users.serializers import UserListRetrieveSerializer
 
+CLIENT_TRACKING_UNIQUE_MESSAGE = 'The company already has an order with this number. Unable to add order.'
+
+
+@contextmanager
+def client_tracking_unique():
+    """Транзакция сохранения заказа: нарушение уникальности (company, client_tracking) - ошибка валидации"""
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if 'client_tracking' not in str(exc):
+            raise
+        raise ValidationError({'client_tracking': [CLIENT_TRACKING_UNIQUE_MESSAGE]})
+
 
 class OrderListRetrieveSerializer(serializers.ModelSerializer):
     user = UserListRetrieveSerializer()
@@ -26,12 +45,12 @@ class OrderListRetrieveSerializer(serializers.ModelSerializer):
             'recipient_zip', 'recipient_city', 'recipient_email',
             'recipient_area', 'recipient_address', 'recipient_address_comment',
             'recipient_phone', 'recipient_name', 'recipient_name2',
-            'update', 'comments', 'status'
+            'update', 'comments', 'status', 'aggregate_status'
         ]
         extra_kwargs = {
             'status': {'help_text': 'Все статусы коробок, включенных в заказ. '
-                                    'Выводятся массивом с указанием статусов: '
-                                    '["NEW", "ORDERED", ...]'}
+                                    'Выводятся массивом в порядке этапов доставки (Order.StatusChoices): '
+                                    '["NEW", "SORTING", ...]'}
         }
 
 
@@ -51,15 +70,15 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             'recipient_zip', 'recipient_city', 'recipient_email',
             'recipient_area', 'recipient_address', 'recipient_address_comment',
             'recipient_phone', 'recipient_name', 'recipient_name2',
-            'update', 'comments', 'status'
+            'update', 'comments', 'status', 'aggregate_status'
         ]
         read_only_fields = [
-            'id', 'user', 'company', 'logistic_tracking', 'update', 'status'
+            'id', 'user', 'company', 'logistic_tracking', 'update', 'status', 'aggregate_status'
         ]
         extra_kwargs = {
             'status': {'help_text': 'Все статусы коробок, включенных в заказ. '
-                                    'Выводятся массивом с указанием статусов: '
-                                    '["NEW", "ORDERED", ...]'},
+                                    'Выводятся массивом в порядке этапов доставки (Order.StatusChoices): '
+                                    '["NEW", "SORTING", ...]'},
             'shipping_car_type': {'required': False},
         }
 
@@ -67,19 +86,66 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         validated_data['user'] = self.context['request'].user
         validated_data['logistic_tracking'] = generate_logistic_tracking(self.context['request'].user.id)
         validated_data['company'] = self.context['request'].user.company
-        order = super(OrderCreateSerializer, self).create(validated_data)
-        Event.objects.create(
-            status='NEW',
-            order=order,
-            user=self.context['request'].user,
-        )
+        with client_tracking_unique():
+            order = super(OrderCreateSerializer, self).create(validated_data)
+            Event.objects.create(
+                status='NEW',
+                order=order,
+                user=self.context['request'].user,
+            )
         return order
 
-    def validate_client_tracking(self, value):
-        if (Order.objects.filter(client_tracking=value,
-                                 user__company_id=self.context['request'].user.company_id).exists()):
-            raise ValidationError('The company already has an order with this number. Unable to add order.')
-        return value
+
+class OrderBulkCreateListSerializer(BulkCreateListSerializer):
+    """Пакетное создание заказов.
+
+    Уникальность client_tracking проверяется одним запросом для всего пакета,
+    заказы и события NEW вставляются через bulk_create в одной транзакции."""
+
+    def get_user(self):
+        """Пользователь запроса, при импорте вне запроса (orders.imports) - context['user']"""
+        if 'user' in self.context:
+            return self.context['user']
+        return self.context['request'].user
+
+    def validate(self, attrs):
+        existing = set(Order.objects.filter(
+            company_id=self.get_user().company_id,
+            client_tracking__in=[item['client_tracking'] for item in attrs],
+        ).values_list('client_tracking', flat=True))
+        seen = set()
+
+        def get_item_errors(item):
+            if item['client_tracking'] in existing:
+                return {'client_tracking': [CLIENT_TRACKING_UNIQUE_MESSAGE]}
+            if item['client_tracking'] in seen:
+                return {'client_tracking': [
+                    'The batch already has an order with this number. Unable to add order.']}
+            seen.add(item['client_tracking'])
+
+        return self.exclude_items(attrs, get_item_errors)
+
+    def create(self, validated_data):
+        user = self.get_user()
+        logistic_trackings = generate_logistic_trackings(user.id, len(validated_data))
+        orders = [
+            Order(user=user, company=user.company, logistic_tracking=logistic_tracking, **item)
+            for item, logistic_tracking in zip(validated_data, logistic_trackings)
+        ]
+        with client_tracking_unique():
+            orders = Order.objects.bulk_create(orders)
+            self.set_missing_pks(orders, 'logistic_tracking')
+            publish_events(Event.objects.bulk_create([
+                Event(status=Event.StatusChoices.NEW, order=order, user=user) for order in orders
+            ]))
+        return orders
+
+
+class OrderBulkCreateSerializer(OrderCreateSerializer):
+    """Элемент пакета заказов"""
+
+    class Meta(OrderCreateSerializer.Meta):
+        list_serializer_class = OrderBulkCreateListSerializer
 
 
 # TODO: сделать поля необязательными
@@ -99,26 +165,37 @@ class OrderUpdateSerializer(serializers.ModelSerializer):
             'recipient_zip', 'recipient_city', 'recipient_email',
             'recipient_area', 'recipient_address', 'recipient_address_comment',
             'recipient_phone', 'recipient_name', 'recipient_name2',
-            'update', 'comments', 'status'
+            'update', 'comments', 'status', 'aggregate_status'
         ]
         read_only_fields = [
-            'id', 'user', 'company', 'logistic_tracking', 'update', 'status'
+            'id', 'user', 'company', 'logistic_tracking', 'update', 'status', 'aggregate_status'
         ]
         extra_kwargs = {
             'status': {'help_text': 'Все статусы коробок, включенных в заказ. '
-                                    'Выводятся массивом с указанием статусов: '
-                                    '["NEW", "ORDERED", ...]'},
+                                    'Выводятся массивом в порядке этапов доставки (Order.StatusChoices): '
+                                    '["NEW", "SORTING", ...]'},
             'shipping_car_type': {'required': False},
             'client_tracking': {'required': False},
             'recipient_order_num': {'required': False},
         }
 
     def update(self, instance, validated_data):
-        instance.update = timezone.now()
-        return super(OrderUpdateSerializer, self).update(instance, validated_data)
+        # новый срок подачи транспорта: коробки снова могут быть задержаны автоматически (boxes.delays)
+        if any(field in validated_data and validated_data[field] != getattr(instance, field)
+               for field in ('shipping_date', 'shipping_time')):
+            validated_data['delayed_at'] = None
+        with client_tracking_unique():
+            return super(OrderUpdateSerializer, self).update(instance, validated_data)
+
+
+class OrderSearchSerializer(serializers.Serializer):
+    """Параметры поиска заказов по получателю"""
+    q = serializers.CharField(min_length=SEARCH_MIN_LENGTH, help_text='ФИО, телефон, город или фрагмент адреса')
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20,
+                                     help_text='Количество результатов, по умолчанию 20')
 
-    def validate_client_tracking(self, value):
-        if (Order.objects.filter(client_tracking=value,
-                                 user__company_id=self.context['request'].user.company_id).exists()):
-            raise ValidationError('The company already has an order with this number. Unable to add order.')
+    def validate_q(self, value):
+        # более короткие слова не ищутся по индексу (триграммы), только уточняют найденное
+        if not any(len(term) >= SEARCH_MIN_LENGTH for term in get_search_terms(value)):
+            raise ValidationError(f'Ensure at least one word has at least {SEARCH_MIN_LENGTH} characters.')
         return value
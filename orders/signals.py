@@ -0,0 +1,19 @@
+from django.db import connections
+from django.db.models.signals import pre_delete, post_migrate
+from django.dispatch import receiver
+
+from orders.models import Order, DeletedOrder
+from orders.search import setup_sqlite_search_index
+
+
+@receiver(pre_delete, sender=Order)
+def create_deleted_order(sender, instance, **kwargs):
+    DeletedOrder.objects.create(object_id=instance.id, company_id=instance.company_id)
+
+
+def setup_search_index(sender, using, **kwargs):
+    if sender.name == 'orders' and connections[using].vendor == 'sqlite':
+        setup_sqlite_search_index(using)
+
+
+post_migrate.connect(setup_search_index, dispatch_uid='orders.setup_search_index')
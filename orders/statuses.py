@@ -0,0 +1,72 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Case, CharField, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from boxes.models import Box
+from orders.models import Order
+
+Status = Order.StatusChoices
+
+# статус заказа - наименее продвинутый статус его коробок, кроме отмененных:
+# задержка любой коробки задерживает заказ, заказ отменен, только если отменены все коробки
+AGGREGATE_STATUS_PRIORITY = (
+    Status.DELAYED, Status.NEW, Status.READY_FOR_SHIPPING, Status.SORTING, Status.DELIVERING, Status.DONE,
+    Status.CANCELED,
+)
+
+# заказов в одном UPDATE apply_order_counters_changes, ограничение числа параметров запроса в SQLite
+UPDATE_BATCH_SIZE = 500
+
+
+def get_aggregate_status(counts):
+    """Статус заказа по количеству коробок в каждом статусе: status -> количество"""
+    for status in AGGREGATE_STATUS_PRIORITY:
+        if counts.get(status):
+            return status
+    return Status.NEW
+
+
+def aggregate_status_expression():
+    """get_aggregate_status в SQL, по полям количества коробок заказа"""
+    return Case(
+        *[When(**{f'{Order.BOX_COUNT_FIELDS[status]}__gt': 0}, then=Value(status))
+          for status in AGGREGATE_STATUS_PRIORITY],
+        default=Value(Status.NEW), output_field=CharField(),
+    )
+
+
+def apply_order_counters_changes(changes):
+    """Применяет изменения количества коробок заказов: (order_id, status) -> изменение количества.
+
+    Один UPDATE на UPDATE_BATCH_SIZE заказов: к каждому полю прибавляется CASE по группам заказов
+    с одинаковым изменением. Статус заказа пересчитывается в orders.utils.touch_orders"""
+    orders_changes = defaultdict(Counter)
+    for (order_id, status), delta in changes.items():
+        if order_id is not None and delta:
+            orders_changes[order_id][status] += delta
+    orders_ids = [order_id for order_id, order_changes in orders_changes.items() if any(order_changes.values())]
+    for start in range(0, len(orders_ids), UPDATE_BATCH_SIZE):
+        batch = orders_ids[start:start + UPDATE_BATCH_SIZE]
+        updates = {}
+        for status, field in Order.BOX_COUNT_FIELDS.items():
+            deltas = defaultdict(list)
+            for order_id in batch:
+                if orders_changes[order_id][status]:
+                    deltas[orders_changes[order_id][status]].append(order_id)
+            if deltas:
+                updates[field] = F(field) + Case(
+                    *[When(id__in=ids, then=Value(delta)) for delta, ids in deltas.items()], default=Value(0))
+        Order.objects.filter(id__in=batch).update(**updates)
+
+
+def rebuild_orders_counters():
+    """Пересчитывает количество коробок и статусы всех заказов по таблице коробок, двумя UPDATE"""
+    with transaction.atomic():
+        Order.objects.update(**{
+            field: Coalesce(Subquery(Box.objects.filter(order=OuterRef('pk'), status=status).order_by()
+                                     .values('order').annotate(count=Count('id')).values('count')), 0)
+            for status, field in Order.BOX_COUNT_FIELDS.items()
+        })
+        Order.objects.update(aggregate_status=aggregate_status_expression())
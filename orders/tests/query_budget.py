@@ -0,0 +1,37 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+
+from orders.management.commands.explain_api_queries import explain_sql, find_seq_scans
+
+
+class QueryBudgetMixin:
+    """Проверка количества запросов к БД, выполняемых эндпоинтом.
+
+    Используется в APITestCase: тест падает, если запрос к url выполнил
+    больше запросов к БД, чем указано в budget."""
+
+    def assertQueryBudget(self, url, budget, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        queries = [query['sql'] for query in context.captured_queries]
+        self.assertLessEqual(
+            len(queries), budget,
+            f'{url} executed {len(queries)} queries, budget is {budget}:\n' + '\n'.join(queries)
+        )
+        return response
+
+
+class QueryPlanMixin:
+    """Проверка планов запросов (EXPLAIN): все SELECT эндпоинта используют индексы, без полного просмотра таблиц"""
+
+    def assertIndexScans(self, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        for query in context.captured_queries:
+            if query['sql'].lstrip().upper().startswith('SELECT'):
+                plan = explain_sql(query['sql'])
+                self.assertEqual(find_seq_scans(plan), [], f'{url} {data}:\n{query["sql"]}\n{plan}')
+        return response
@@ -0,0 +1,100 @@
+from collections import Counter
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+from orders.statuses import get_aggregate_status
+from orders.tests.query_budget import QueryPlanMixin
+from shipments.models import Shipment
+
+Status = Order.StatusChoices
+
+
+class AggregateStatusTestCase(QueryPlanMixin, APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.transport_company = Company.objects.create(name='Транспортная компания', is_transport_company=True)
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        self.transport_user = get_user_model().objects.create(username='transport', company=self.transport_company)
+        self.orders = [Order.objects.create(client_tracking=f'{i}', recipient_order_num=f'{i}',
+                                            logistic_tracking=f'{i}', user=self.user, company=self.company)
+                       for i in range(3)]
+
+    def assertCountersConsistent(self):
+        """Количество коробок в заказах совпадает с таблицей коробок"""
+        for order in Order.objects.all():
+            counts = Counter(Box.objects.filter(order=order).values_list('status', flat=True))
+            self.assertEqual({status: getattr(order, field) for status, field in Order.BOX_COUNT_FIELDS.items()},
+                             {status: counts[status] for status in Order.BOX_COUNT_FIELDS}, order)
+            self.assertEqual(order.aggregate_status, get_aggregate_status(counts), order)
+
+    def test_get_aggregate_status(self):
+        self.assertEqual(get_aggregate_status({}), Status.NEW)
+        self.assertEqual(get_aggregate_status({Status.CANCELED: 2}), Status.CANCELED)
+        self.assertEqual(get_aggregate_status({Status.DONE: 2, Status.CANCELED: 1}), Status.DONE)
+        self.assertEqual(get_aggregate_status({Status.DONE: 2, Status.SORTING: 1}), Status.SORTING)
+        self.assertEqual(get_aggregate_status({Status.DONE: 2, Status.DELAYED: 1, Status.NEW: 1}), Status.DELAYED)
+
+    def test_write_paths(self):
+        self.client.force_authenticate(self.user)
+        box = Box.objects.create(order=self.orders[0], client_code='single', code='1')
+        response = self.client.post(reverse('box:box-bulk'), format='json', data=[
+            {'order_id': self.orders[i % 2].id, 'client_code': f'bulk{i}', 'code': str(i)} for i in range(6)
+        ])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertCountersConsistent()
+
+        response = self.client.post(reverse('shipment:shipment-list'), format='json', data={
+            'waybill_num': '1', 'waybill_date': '2021-03-01T00:00:00',
+            'boxes_ids': list(Box.objects.filter(order=self.orders[0]).values_list('id', flat=True)),
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertCountersConsistent()
+        self.assertEqual(Order.objects.get(id=self.orders[0].id).aggregate_status, Status.SORTING)
+
+        self.client.force_authenticate(self.transport_user)
+        boxes_ids = list(Box.objects.filter(order=self.orders[1]).values_list('id', flat=True))
+        response = self.client.post(reverse('box:box-transition'), format='json',
+                                    data={'status': Status.CANCELED, 'ids': boxes_ids})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCountersConsistent()
+        self.assertEqual(Order.objects.get(id=self.orders[1].id).aggregate_status, Status.CANCELED)
+
+        box.refresh_from_db()
+        box.order = self.orders[2]
+        box.save()
+        Box.objects.filter(order=self.orders[0]).first().delete()
+        self.assertCountersConsistent()
+        self.assertEqual(Order.objects.get(id=self.orders[2].id).status, [Status.SORTING])
+
+    def test_list_and_filter(self):
+        Box.objects.create(order=self.orders[0], client_code='1', code='1', status=Status.SORTING)
+        Box.objects.create(order=self.orders[0], client_code='2', code='2', status=Status.DELIVERING)
+        Box.objects.create(order=self.orders[1], client_code='3', code='3', status=Status.DONE)
+        for user in (self.user, self.transport_user):
+            self.client.force_authenticate(user)
+            response = self.assertIndexScans(reverse('order:order-list'), {'aggregate_status': Status.SORTING})
+            self.assertEqual([(order['id'], order['status'], order['aggregate_status'])
+                              for order in response.json()['results']],
+                             [(self.orders[0].id, [Status.SORTING, Status.DELIVERING], Status.SORTING)])
+        response = self.client.get(reverse('order:order-list'), {'aggregate_status': 'LOST'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_rebuild(self):
+        Box.objects.create(order=self.orders[0], client_code='1', code='1', status=Status.DONE)
+        Order.objects.update(boxes_done=0, boxes_new=5, aggregate_status=Status.NEW)
+        call_command('rebuild_box_counters', stdout=StringIO())
+        self.assertCountersConsistent()
+        self.assertEqual(Order.objects.get(id=self.orders[0].id).aggregate_status, Status.DONE)
+
+    def test_shipment_boxes(self):
+        shipment = Shipment.objects.create(waybill_num='1', waybill_date='2021-03-01T00:00:00Z')
+        Box.objects.create(order=self.orders[0], client_code='1', code='1', shipment=shipment)
+        self.assertCountersConsistent()
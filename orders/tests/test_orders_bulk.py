@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+from events.models import Event
+from orders.models import Order
+
+
+class OrderBulkCreateTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        Order.objects.create(
+            client_tracking='existing',
+            recipient_order_num='1',
+            logistic_tracking='1',
+            user=self.user,
+            company=self.company,
+        )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('order:order-bulk')
+
+    def test_unauthorised(self):
+        response = self.client.post(self.url, data=[], format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test(self):
+        data = [{'client_tracking': f'{i}', 'recipient_order_num': f'{i}'} for i in range(30)]
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()['errors'], [])
+
+        created = response.json()['created']
+        self.assertEqual([item['index'] for item in created], list(range(30)))
+        orders = Order.objects.filter(id__in=[item['id'] for item in created])
+        self.assertEqual(orders.count(), 30)
+        self.assertEqual(len(set(order.logistic_tracking for order in orders)), 30)
+        for order in orders:
+            self.assertEqual(order.user, self.user)
+            self.assertEqual(order.company, self.company)
+        self.assertEqual(Event.objects.filter(order__in=orders, status=Event.StatusChoices.NEW).count(), 30)
+
+    def test_item_errors(self):
+        data = [
+            {'client_tracking': 'a', 'recipient_order_num': '1'},
+            {'client_tracking': 'existing', 'recipient_order_num': '2'},
+            {'client_tracking': 'a', 'recipient_order_num': '3'},
+            {'recipient_order_num': '4'},
+            {'client_tracking': 'b', 'recipient_order_num': '5'},
+        ]
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([item['index'] for item in response.json()['created']], [0, 4])
+        self.assertEqual(
+            response.json()['errors'],
+            [
+                {'index': 1, 'errors': {'client_tracking': [
+                    'The company already has an order with this number. Unable to add order.']}},
+                {'index': 2, 'errors': {'client_tracking': [
+                    'The batch already has an order with this number. Unable to add order.']}},
+                {'index': 3, 'errors': {'client_tracking': ['This field is required.']}},
+            ]
+        )
+        self.assertEqual(Order.objects.count(), 3)
+
+    def test_all_invalid(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data=[{}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()['created'], [])
+        self.assertEqual(Event.objects.count(), 0)
+
+    def test_not_a_list(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data={'client_tracking': '1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
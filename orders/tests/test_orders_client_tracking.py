@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+from events.models import Event
+from orders.models import Order
+
+
+class OrderClientTrackingUniqueTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company1 = Company.objects.create(name='Компания 1')
+        self.company2 = Company.objects.create(name='Компания 2')
+        self.user1 = get_user_model().objects.create(username='user1', company=self.company1)
+        self.user2 = get_user_model().objects.create(username='user2', company=self.company2)
+        self.order = Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1',
+                                          user=self.user1, company=self.company1)
+        self.other_order = Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                                                user=self.user1, company=self.company1)
+
+    def test_create(self):
+        self.client.force_authenticate(self.user1)
+        response = self.client.post(reverse('order:order-list'), data={'client_tracking': '1',
+                                                                       'recipient_order_num': '3'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {
+            'client_tracking': ['The company already has an order with this number. Unable to add order.']})
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertFalse(Event.objects.exists())
+
+    def test_create_in_other_company(self):
+        self.client.force_authenticate(self.user2)
+        response = self.client.post(reverse('order:order-list'), data={'client_tracking': '1',
+                                                                       'recipient_order_num': '3'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_update(self):
+        self.client.force_authenticate(self.user1)
+        url = reverse('order:order-detail', kwargs={'pk': self.order.id})
+        response = self.client.patch(url, data={'client_tracking': '1', 'comments': 'comments'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.patch(url, data={'client_tracking': '2'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.client_tracking, '1')
+
+
+class DuplicateClientTrackingMigrationTestCase(TransactionTestCase):
+    """Миграция 0006: повторы номеров, созданные до ограничения уникальности, не прерывают миграцию"""
+    migrate_from = [('orders', '0005_logistictrackingsequence')]
+    migrate_to = [('orders', '0006_auto_20261018_1318')]
+
+    def tearDown(self):
+        # post_migrate восстанавливает триггеры поиска SQLite, удаленные при пересоздании таблицы
+        call_command('migrate', verbosity=0)
+
+    def test_duplicates_renamed(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_from)
+        apps = executor.loader.project_state(self.migrate_from).apps
+        company = apps.get_model('companies', 'Company').objects.create(name='Компания 1')
+        user = apps.get_model('users', 'User').objects.create(username='user1', company_id=company.id)
+        HistoricalOrder = apps.get_model('orders', 'Order')
+        orders = [HistoricalOrder.objects.create(client_tracking=client_tracking, recipient_order_num='1',
+                                                 logistic_tracking=str(i), user_id=user.id, company_id=company.id)
+                  for i, client_tracking in enumerate(['1', '1', '2', '1', 'x' * 64, 'x' * 64])]
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        apps = executor.loader.project_state(self.migrate_to).apps
+        HistoricalOrder = apps.get_model('orders', 'Order')
+        client_trackings = dict(HistoricalOrder.objects.values_list('id', 'client_tracking'))
+        self.assertEqual(client_trackings, {
+            orders[0].id: '1',
+            orders[1].id: f'1~dup{orders[1].id}',
+            orders[2].id: '2',
+            orders[3].id: f'1~dup{orders[3].id}',
+            orders[4].id: 'x' * 64,
+            orders[5].id: 'x' * (64 - len(f'~dup{orders[5].id}')) + f'~dup{orders[5].id}',
+        })
+        self.assertEqual(HistoricalOrder.objects.get(id=orders[1].id).comments,
+                         'Повтор номера заявки 1, номер изменен миграцией')
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+
+
+class OrderCursorPaginationTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        self.orders = [Order.objects.create(
+            client_tracking=f'{i}',
+            recipient_order_num=f'{i}',
+            logistic_tracking=f'{i}',
+            user=self.user,
+            company=self.company,
+        ) for i in range(25)]
+        self.boxes = [Box.objects.create(order=self.orders[0], client_code=f'{i}', code=f'{i}') for i in range(25)]
+
+    def walk(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            data = response.json()
+            self.assertNotIn('count', data)
+            ids += [item['id'] for item in data['results']]
+            if not data['next']:
+                return ids
+            response = self.client.get(data['next'])
+
+    def test_orders(self):
+        self.client.force_authenticate(self.user)
+        ids = self.walk(reverse('order:order-list'), {'pagination': 'cursor', 'page_size': 7})
+        self.assertEqual(ids, [order.id for order in self.orders])
+
+    def test_orders_descending(self):
+        self.client.force_authenticate(self.user)
+        ids = self.walk(reverse('order:order-list'), {'pagination': 'cursor', 'ordering': '-id'})
+        self.assertEqual(ids, [order.id for order in reversed(self.orders)])
+
+    def test_orders_by_update(self):
+        self.client.force_authenticate(self.user)
+        ids = self.walk(reverse('order:order-list'), {'pagination': 'cursor', 'ordering': 'update'})
+        self.assertEqual(sorted(ids), [order.id for order in self.orders])
+
+    def test_orders_by_same_update(self):
+        """Заказы с одинаковым временем изменения (touch_orders) выдаются по (update, id) без OFFSET"""
+        Order.objects.filter(id__in=[order.id for order in self.orders[5:20]]).update(update=timezone.now())
+        self.client.force_authenticate(self.user)
+        expected = list(Order.objects.order_by('update', 'id').values_list('id', flat=True))
+        ids = self.walk(reverse('order:order-list'), {'pagination': 'cursor', 'ordering': 'update', 'page_size': 4})
+        self.assertEqual(ids, expected)
+        ids = self.walk(reverse('order:order-list'), {'pagination': 'cursor', 'ordering': '-update', 'page_size': 4})
+        self.assertEqual(ids, expected[::-1])
+
+        response = self.client.get(reverse('order:order-list'), {'pagination': 'cursor', 'ordering': 'update',
+                                                                 'page_size': 7})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(response.json()['next'])
+        self.assertEqual([order['id'] for order in response.json()['results']], expected[7:14])
+        self.assertFalse([query['sql'] for query in context.captured_queries if 'OFFSET' in query['sql']])
+        response = self.client.get(response.json()['previous'])
+        self.assertEqual([order['id'] for order in response.json()['results']], expected[:7])
+
+    def test_cursor_is_stable_after_insert(self):
+        """Новые заказы не сдвигают страницы, уже выданные курсором"""
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('order:order-list'), {'pagination': 'cursor'})
+        Order.objects.create(client_tracking='new', recipient_order_num='new', logistic_tracking='new',
+                             user=self.user, company=self.company)
+        response = self.client.get(response.json()['next'])
+        self.assertEqual([order['id'] for order in response.json()['results']],
+                         [order.id for order in self.orders[10:20]])
+
+    def test_boxes(self):
+        self.client.force_authenticate(self.user)
+        ids = self.walk(reverse('box:box-list'), {'pagination': 'cursor'})
+        self.assertEqual(ids, [box.id for box in self.boxes])
+
+    def test_page_number_is_default(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('order:order-list'))
+        self.assertEqual(response.json()['count'], len(self.orders))
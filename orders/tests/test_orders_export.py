@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+from shipments.models import Shipment
+
+
+class OrderExportTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company1 = Company.objects.create(name='Компания 1')
+        self.company2 = Company.objects.create(name='Компания 2')
+        self.user1 = get_user_model().objects.create(username='user1', company=self.company1)
+        self.user2 = get_user_model().objects.create(username='user2', company=self.company2)
+        self.orders = [
+            Order.objects.create(client_tracking=str(i), recipient_order_num=str(i), logistic_tracking=str(i),
+                                 user=self.user1, company=self.company1, recipient_city='Москва, "центр"')
+            for i in range(3)
+        ]
+        Order.objects.create(client_tracking='9', recipient_order_num='9', logistic_tracking='9',
+                             user=self.user2, company=self.company2)
+        self.shipment = Shipment.objects.create(waybill_num='W1', waybill_date=timezone.now(), author=self.user1)
+        self.boxes = [
+            Box.objects.create(order=self.orders[0], client_code='1', code='1', weight=1.5, shipment=self.shipment),
+            Box.objects.create(order=self.orders[0], client_code='2', code='2'),
+            Box.objects.create(order=self.orders[2], client_code='3', code='3'),
+        ]
+        self.url = reverse('order:order-export')
+
+    def get_content(self, params):
+        self.client.force_authenticate(self.user1)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIsInstance(response, StreamingHttpResponse)
+            return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        rows = list(csv.DictReader(io.StringIO(self.get_content({}))))
+        self.assertEqual([row['id'] for row in rows], [str(order.id) for order in self.orders])
+        self.assertEqual(rows[0]['user'], 'user1')
+        self.assertEqual(rows[0]['company'], 'Компания 1')
+        self.assertEqual(rows[0]['recipient_city'], 'Москва, "центр"')
+        self.assertNotIn('box_id', rows[0])
+
+    def test_csv_with_boxes(self):
+        rows = list(csv.DictReader(io.StringIO(self.get_content({'include': 'boxes'}))))
+        self.assertEqual([(row['id'], row['box_id']) for row in rows], [
+            (str(self.orders[0].id), str(self.boxes[0].id)),
+            (str(self.orders[0].id), str(self.boxes[1].id)),
+            (str(self.orders[1].id), ''),
+            (str(self.orders[2].id), str(self.boxes[2].id)),
+        ])
+        self.assertEqual(rows[0]['box_waybill_num'], 'W1')
+        self.assertEqual(rows[0]['box_weight'], '1.5')
+
+    def test_ndjson_with_boxes(self):
+        orders = [json.loads(line) for line in self.get_content({'file_format': 'ndjson', 'include': 'boxes'})
+                  .splitlines()]
+        self.assertEqual([order['id'] for order in orders], [order.id for order in self.orders])
+        self.assertEqual([box['id'] for box in orders[0]['boxes']], [self.boxes[0].id, self.boxes[1].id])
+        self.assertEqual(orders[0]['boxes'][0]['waybill_num'], 'W1')
+        self.assertEqual(orders[1]['boxes'], [])
+
+    def test_invalid_format(self):
+        self.client.force_authenticate(self.user1)
+        response = self.client.get(self.url, {'file_format': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
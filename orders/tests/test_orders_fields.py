@@ -0,0 +1,102 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+from shipments.models import Shipment
+
+
+class SparseFieldsetsTestCase(APITestCase):
+    """?fields= и ?exclude= в списках и карточках заказов, коробок и отправлений"""
+
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.user = get_user_model().objects.create(username='user1', name='Пользователь', company=self.company)
+        self.orders = [Order.objects.create(
+            client_tracking=f'{i}',
+            recipient_order_num=f'{i}',
+            logistic_tracking=f'{i}',
+            user=self.user,
+            company=self.company,
+            comments='комментарий',
+        ) for i in range(15)]
+        self.shipment = Shipment.objects.create(waybill_num='1', waybill_date='2021-03-01T00:00:00Z', author=self.user)
+        self.boxes = [Box.objects.create(order=self.orders[0], client_code=f'{i}', code=f'{i}', shipment=self.shipment)
+                      for i in range(3)]
+        self.client.force_authenticate(self.user)
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        return response.json(), ' '.join(query['sql'] for query in context.captured_queries)
+
+    def test_orders_fields(self):
+        data, sql = self.get(reverse('order:order-list'), {'fields': 'id,client_tracking,status'})
+        self.assertEqual(data['results'][0], {'id': self.orders[0].id, 'client_tracking': '0', 'status': ['NEW']})
+        self.assertNotIn('"comments"', sql)
+        self.assertNotIn('"users_user"', sql)
+        self.assertNotIn('"companies_company"', sql)
+
+    def test_orders_nested_fields(self):
+        data, sql = self.get(reverse('order:order-detail', kwargs={'pk': self.orders[1].id}),
+                             {'fields': 'client_tracking,user.username,user.company.name'})
+        self.assertEqual(data, {'client_tracking': '1',
+                                'user': {'username': 'user1', 'company': {'name': 'Компания 1'}}})
+        self.assertNotIn('"boxes_box"', sql)
+        self.assertNotIn('"orders_order"."company_id"', sql.split('WHERE')[0])
+
+    def test_orders_exclude(self):
+        data, sql = self.get(reverse('order:order-list'), {'exclude': 'comments,status,user.company,company'})
+        order = data['results'][0]
+        self.assertNotIn('comments', order)
+        self.assertNotIn('status', order)
+        self.assertNotIn('company', order)
+        self.assertEqual(order['user'], {'username': 'user1', 'name': 'Пользователь', 'email': ''})
+        self.assertNotIn('"comments"', sql)
+        self.assertNotIn('"boxes_box"', sql)
+
+    def test_boxes_and_shipments(self):
+        data, _ = self.get(reverse('box:box-list'), {'fields': 'id,code'})
+        self.assertEqual(data['results'], [{'id': box.id, 'code': box.code} for box in self.boxes])
+        data, sql = self.get(reverse('shipment:shipment-list'), {'fields': 'waybill_num,boxes.code'})
+        self.assertEqual(data['results'], [{'waybill_num': '1', 'boxes': [{'code': '0'}, {'code': '1'}, {'code': '2'}]}])
+        self.assertNotIn('"boxes_box"."width"', sql)
+        data, sql = self.get(reverse('shipment:shipment-list'), {'exclude': 'boxes,author'})
+        self.assertEqual(set(data['results'][0]), {'id', 'waybill_num', 'waybill_date', 'comment', 'date_of_creation'})
+        self.assertNotIn('"boxes_box"', sql)
+
+    def test_cursor_pagination(self):
+        ids = []
+        response = self.client.get(reverse('order:order-list'),
+                                   {'pagination': 'cursor', 'page_size': 4, 'fields': 'client_tracking'})
+        while True:
+            data = response.json()
+            self.assertEqual({tuple(order) for order in data['results']}, {('client_tracking',)})
+            ids += [order['client_tracking'] for order in data['results']]
+            if not data['next']:
+                break
+            response = self.client.get(data['next'])
+        self.assertEqual(ids, [order.client_tracking for order in self.orders])
+
+    @override_settings(MODIFIED_SINCE_LAG=0)
+    def test_modified_since(self):
+        response = self.client.get(reverse('box:box-list'),
+                                   {'modified_since': '2000-01-01T00:00:00Z', 'fields': 'code'})
+        self.assertEqual(response.json()['results'], [{'code': box.code} for box in self.boxes])
+
+    def test_unknown_fields(self):
+        for params, message in (({'fields': 'id,unknown'}, 'Unknown fields: unknown'),
+                                ({'fields': 'user.unknown'}, 'Unknown fields: user.unknown'),
+                                ({'fields': 'client_tracking.value'}, 'Field "client_tracking" has no nested fields')):
+            response = self.client.get(reverse('order:order-list'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), {'fields': [message]})
+        response = self.client.get(reverse('box:box-list'), {'exclude': 'unknown'})
+        self.assertEqual(response.json(), {'exclude': ['Unknown fields: unknown']})
@@ -0,0 +1,65 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+from orders.models import Order
+from orders.tests.query_budget import QueryPlanMixin
+
+
+class OrderFiltersTestCase(QueryPlanMixin, APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.other_company = Company.objects.create(name='Компания 2')
+        self.transport_company = Company.objects.create(name='Транспортная компания', is_transport_company=True)
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        self.other_user = get_user_model().objects.create(username='user2', company=self.other_company)
+        self.transport_user = get_user_model().objects.create(username='transport', company=self.transport_company)
+        self.orders = [Order.objects.create(
+            client_tracking=f'{i % 10}',
+            recipient_order_num=f'R{i % 5}',
+            logistic_tracking=f'{i}',
+            shipping_date=date(2021, 3, 1 + i % 10),
+            user=user,
+            company=user.company,
+        ) for i, user in enumerate([self.user] * 10 + [self.other_user] * 10)]
+
+    def get_ids(self, params):
+        response = self.assertIndexScans(reverse('order:order-list'), params)
+        return [order['id'] for order in response.json()['results']]
+
+    def test_filters(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.get_ids({'client_tracking': '3'}), [self.orders[3].id])
+        self.assertEqual(self.get_ids({'logistic_tracking': '13'}), [])
+        self.assertEqual(self.get_ids({'logistic_tracking': '4'}), [self.orders[4].id])
+        self.assertEqual(self.get_ids({'recipient_order_num': 'R1'}), [self.orders[1].id, self.orders[6].id])
+        self.assertEqual(self.get_ids({'shipping_date_from': '2021-03-04', 'shipping_date_to': '2021-03-05'}),
+                         [self.orders[3].id, self.orders[4].id])
+        self.assertEqual(self.get_ids({'shipping_date_from': '2021-03-09', 'client_tracking': '9'}),
+                         [self.orders[9].id])
+
+    def test_filters_transport_company(self):
+        self.client.force_authenticate(self.transport_user)
+        self.assertEqual(self.get_ids({'client_tracking': '3'}), [self.orders[3].id, self.orders[13].id])
+        self.assertEqual(self.get_ids({'recipient_order_num': 'R0', 'page_size': 100}),
+                         [order.id for order in self.orders[::5]])
+        self.assertEqual(self.get_ids({'shipping_date_to': '2021-03-01'}), [self.orders[0].id, self.orders[10].id])
+
+    def test_filters_with_cursor_pagination(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('order:order-list'),
+                                   {'pagination': 'cursor', 'page_size': 2, 'shipping_date_from': '2021-03-06'})
+        ids = [order['id'] for order in response.json()['results']]
+        response = self.client.get(response.json()['next'])
+        ids += [order['id'] for order in response.json()['results']]
+        self.assertEqual(ids, [order.id for order in self.orders[5:9]])
+
+    def test_invalid_values(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('order:order-list'), {'shipping_date_from': '01.03.2021'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.json()), ['shipping_date_from'])
@@ -0,0 +1,114 @@
+import csv
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+from events.models import Event
+from orders.models import Order
+
+CSV_CONTENT = '''client_tracking,recipient_order_num,cargo_qty,recipient_city,unknown
+1,1,2,Москва,x
+2,2,,,
+existing,3,,,
+,4,,,
+5,5,много,,
+1,6,,,
+'''
+
+
+class OrderImportTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        Order.objects.create(client_tracking='existing', recipient_order_num='1', logistic_tracking='1',
+                             user=self.user, company=self.company)
+        self.url = reverse('order:order-import')
+
+    def post_file(self, name, content, params=''):
+        self.client.force_authenticate(self.user)
+        content = content if isinstance(content, bytes) else content.encode()
+        response = self.client.post(self.url + params, {'file': SimpleUploadedFile(name, content)},
+                                    format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_csv(self):
+        lines = self.post_file('manifest.csv', CSV_CONTENT)
+        errors = [line for line in lines if line['type'] == 'error']
+        self.assertEqual([(error['line'], list(error['errors'])) for error in errors], [
+            (4, ['client_tracking']), (5, ['client_tracking']), (6, ['cargo_qty']), (7, ['client_tracking'])])
+        self.assertEqual(lines[-1], {'type': 'progress', 'processed': 6, 'created': 2, 'failed': 4})
+        order = Order.objects.get(client_tracking='1')
+        self.assertEqual((order.cargo_qty, order.recipient_city, order.user, order.company),
+                         (2, 'Москва', self.user, self.company))
+        self.assertEqual(Event.objects.filter(status=Event.StatusChoices.NEW).count(), 2)
+
+    def test_ndjson(self):
+        content = '\n'.join([
+            json.dumps({'client_tracking': '10', 'recipient_order_num': '1'}),
+            '{broken',
+            '',
+            json.dumps([1, 2]),
+            json.dumps({'client_tracking': '11', 'recipient_order_num': '2', 'cargo_weight': 1.5}),
+        ])
+        lines = self.post_file('manifest.txt', content, '?file_format=ndjson')
+        self.assertEqual([line['line'] for line in lines if line['type'] == 'error'], [2, 4])
+        self.assertEqual(lines[-1], {'type': 'progress', 'processed': 4, 'created': 2, 'failed': 2})
+
+    def test_encoding(self):
+        self.client.force_authenticate(self.user)
+        content = CSV_CONTENT.encode('cp1251')
+        response = self.client.post(self.url, {'file': SimpleUploadedFile('manifest.csv', content)},
+                                    format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('?encoding=', response.json()['file'][0])
+        response = self.client.post(self.url + '?encoding=unknown',
+                                    {'file': SimpleUploadedFile('manifest.csv', content)}, format='multipart')
+        self.assertEqual(response.json(), {'encoding': ['Unknown encoding "unknown".']})
+
+        lines = self.post_file('manifest.csv', content, '?encoding=cp1251')
+        self.assertEqual(lines[-1], {'type': 'progress', 'processed': 6, 'created': 2, 'failed': 4})
+        self.assertEqual(Order.objects.get(client_tracking='1').recipient_city, 'Москва')
+
+    def test_invalid_encoding_after_start(self):
+        """Неверная кодировка за проверенным началом файла - строка ошибки в ответе, а не обрыв ответа"""
+        content = b'client_tracking,recipient_order_num,recipient_city\n' + b''.join(
+            f'a{i},{i},city\n'.encode() for i in range(10000)) + 'b,1,Москва\nc,2,city\n'.encode('cp1251')
+        lines = self.post_file('manifest.csv', content)
+        self.assertEqual(lines[-2], {'type': 'error', 'line': 10002, 'errors': {'non_field_errors': [
+            "Invalid utf-8 encoding: invalid continuation byte. The rest of the file was skipped."]}})
+        self.assertEqual(lines[-1], {'type': 'progress', 'processed': 10001, 'created': 10000, 'failed': 1})
+
+    def test_invalid_request(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, {}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(self.url, {'file': SimpleUploadedFile('manifest.xlsx', b'')}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'manifest.csv')
+            errors_path = os.path.join(directory, 'errors.csv')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(CSV_CONTENT)
+            call_command('import_orders', path, username='user1', chunk_size=2, errors=errors_path,
+                         stdout=open(os.devnull, 'w'))
+            with open(errors_path, encoding='utf-8') as file:
+                errors = list(csv.DictReader(file))
+            with open(path, 'w', encoding='cp1251') as file:
+                file.write(CSV_CONTENT)
+            with self.assertRaisesMessage(CommandError, 'use --encoding'):
+                call_command('import_orders', path, username='user1', errors=errors_path)
+        # дубликат номера из предыдущего пакета отклоняется
+        self.assertEqual([(error['line'], error['client_tracking']) for error in errors],
+                         [('4', 'existing'), ('5', ''), ('6', '5'), ('7', '1')])
+        self.assertEqual(Order.objects.count(), 3)
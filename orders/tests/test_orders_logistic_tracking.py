@@ -0,0 +1,47 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from orders.models import Order
+from orders.utils import LogisticTrackingAllocator, generate_logistic_tracking, generate_logistic_trackings
+
+
+class LogisticTrackingTestCase(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create(username='user1')
+
+    def test_unique_for_many_orders_of_one_user(self):
+        """Прежний генератор исчерпывал номера пользователя после 90 заказов"""
+        logistic_trackings = [generate_logistic_tracking(self.user.id) for _ in range(200)]
+        logistic_trackings += generate_logistic_trackings(self.user.id, 200)
+        self.assertEqual(len(set(logistic_trackings)), 400)
+        for logistic_tracking in logistic_trackings:
+            self.assertTrue(logistic_tracking.startswith(str(1000000000 + self.user.id)))
+
+    def test_does_not_intersect_with_old_format(self):
+        Order.objects.create(user=self.user, client_tracking='1', recipient_order_num='1',
+                             logistic_tracking=str(1000000000 + self.user.id) + '10')
+        self.assertNotEqual(len(generate_logistic_tracking(self.user.id)), 12)
+
+
+class LogisticTrackingAllocatorTestCase(TransactionTestCase):
+    def test_no_queries_inside_block(self):
+        allocator = LogisticTrackingAllocator(block_size=100)
+        first = allocator.allocate()
+        with CaptureQueriesContext(connection) as context:
+            numbers = [allocator.allocate()[0] for _ in range(99)]
+        self.assertEqual(len(context), 0)
+        self.assertEqual(numbers, list(range(first[0] + 1, first[0] + 100)))
+
+    def test_allocators_do_not_intersect(self):
+        """Аллокаторы разных процессов получают разные блоки"""
+        allocators = [LogisticTrackingAllocator(block_size=10) for _ in range(3)]
+        numbers = [number for _ in range(5) for allocator in allocators for number in allocator.allocate(7)]
+        self.assertEqual(len(set(numbers)), len(numbers))
+
+    def test_range_larger_than_block(self):
+        allocator = LogisticTrackingAllocator(block_size=10)
+        numbers = allocator.allocate(25)
+        self.assertEqual(len(numbers), 25)
+        self.assertEqual(allocator.allocate()[0], numbers[-1] + 1)
@@ -0,0 +1,136 @@
+from importlib import import_module
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from companies.models import Company
+from orders.management.commands.explain_api_queries import explain_sql
+from orders.models import Order
+from orders.search import (POSTGRESQL_DOCUMENT, POSTGRESQL_VECTOR, SQLITE_FTS_TABLE, search_orders,
+                           search_orders_postgresql, setup_sqlite_search_index)
+
+
+class OrderSearchTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.other_company = Company.objects.create(name='Компания 2')
+        self.transport_company = Company.objects.create(name='Транспортная компания', is_transport_company=True)
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        self.other_user = get_user_model().objects.create(username='user2', company=self.other_company)
+        self.transport_user = get_user_model().objects.create(username='transport', company=self.transport_company)
+        recipients = [
+            ('Иванов Иван Иванович', '+7 916 123-45-67', 'Москва', 'Москва, ул. Ленина, д. 1'),
+            ('Петрова Анна', '+7 903 765-43-21', 'Москва', 'ул. Садовая, д. 5'),
+            ('Сидоров Петр', '+7 812 000-00-00', 'Санкт-Петербург', 'Невский пр., д. 10'),
+        ]
+        self.orders = [Order.objects.create(
+            client_tracking=f'{i}',
+            recipient_order_num=f'{i}',
+            logistic_tracking=f'{i}',
+            user=self.user,
+            company=self.company,
+            recipient_name=name,
+            recipient_phone=phone,
+            recipient_city=city,
+            recipient_address=address,
+        ) for i, (name, phone, city, address) in enumerate(recipients)]
+        self.other_order = Order.objects.create(client_tracking='other', recipient_order_num='other',
+                                                logistic_tracking='other', user=self.other_user,
+                                                company=self.other_company, recipient_name='Иванова Мария')
+
+    def search(self, q, user=None, **params):
+        self.client.force_authenticate(user or self.user)
+        response = self.client.get(reverse('order:order-search'), {'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.content)
+        return response.json()['results']
+
+    def get_ids(self, q, user=None):
+        return [order['id'] for order in self.search(q, user)]
+
+    def test_search_fields(self):
+        self.assertEqual(self.get_ids('иванов'), [self.orders[0].id])
+        self.assertEqual(self.get_ids('765-43'), [self.orders[1].id])
+        self.assertEqual(self.get_ids('петербург'), [self.orders[2].id])
+        self.assertEqual(self.get_ids('Садов'), [self.orders[1].id])
+        self.assertEqual(self.get_ids('анна садовая'), [self.orders[1].id])
+        self.assertEqual(self.get_ids('анна ленина'), [])
+        # слова короче трех символов
+        self.assertEqual(self.get_ids('москва 5'), [self.orders[0].id, self.orders[1].id])
+        self.assertEqual(self.get_ids('москва д 5'), [self.orders[0].id, self.orders[1].id])
+        self.assertEqual(self.get_ids('москва 21'), [self.orders[1].id])
+
+    def test_ranking(self):
+        # в первом заказе "Москва" встречается и в городе, и в адресе
+        self.assertEqual(self.get_ids('москва'), [self.orders[0].id, self.orders[1].id])
+
+    def test_company(self):
+        self.assertEqual(self.get_ids('иванов'), [self.orders[0].id])
+        self.assertEqual(sorted(self.get_ids('иванов', self.transport_user)), [self.orders[0].id, self.other_order.id])
+
+    def test_index_is_maintained(self):
+        self.orders[0].recipient_name = 'Смирнов Алексей'
+        self.orders[0].save()
+        self.orders[1].delete()
+        Order.objects.bulk_create([Order(client_tracking='bulk', recipient_order_num='bulk', logistic_tracking='bulk',
+                                         user=self.user, company=self.company, recipient_name='Иванов Олег')])
+        self.assertEqual(self.get_ids('смирнов'), [self.orders[0].id])
+        self.assertEqual(self.get_ids('иванов'), [Order.objects.get(client_tracking='bulk').id])
+        self.assertEqual(self.get_ids('садовая'), [])
+
+    def test_fields_and_limit(self):
+        self.assertEqual(self.search('москва', fields='recipient_name', limit=1),
+                         [{'recipient_name': 'Иванов Иван Иванович'}])
+
+    def test_invalid_params(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('order:order-search'), {'q': 'ив', 'limit': 1000})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.json()), {'q', 'limit'})
+        # все слова короче трех символов: на любой СУБД ошибка, а не пустой результат
+        for q in ('ab c', '1 2 3 4', '!!!!'):
+            response = self.client.get(reverse('order:order-search'), {'q': q})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), {'q': ['Ensure at least one word has at least 3 characters.']})
+
+    def test_postgresql_query(self):
+        """SQL для PostgreSQL: выражения совпадают с индексами миграции 0009_order_search"""
+        with mock.patch('orders.search.connection') as connection_mock:
+            cursor = connection_mock.cursor.return_value.__enter__.return_value
+            cursor.fetchall.return_value = [(5,), (3,)]
+            self.assertEqual(search_orders_postgresql('Иванов 50%', 7, 20), [5, 3])
+        sql, params = cursor.execute.call_args[0]
+        self.assertEqual(params, ['иванов:* & 50:*', '%Иванов 50\\%%', 7, 'иванов:* & 50:*', 'Иванов 50%', 20])
+        migration = import_module('orders.migrations.0009_order_search')
+        self.assertEqual(POSTGRESQL_VECTOR.replace('"orders_order".', ''),
+                         f"to_tsvector('simple'::regconfig, {migration.DOCUMENT})")
+        self.assertEqual(POSTGRESQL_DOCUMENT.replace('"orders_order".', ''), migration.DOCUMENT)
+        self.assertEqual(sql, (
+            f'SELECT "orders_order"."id" FROM "orders_order" '
+            f"WHERE ({POSTGRESQL_VECTOR} @@ to_tsquery('simple', %s) OR {POSTGRESQL_DOCUMENT} ILIKE %s) "
+            f'AND "orders_order"."company_id" = %s '
+            f"ORDER BY ts_rank({POSTGRESQL_VECTOR}, to_tsquery('simple', %s)) "
+            f'+ similarity({POSTGRESQL_DOCUMENT}, %s) DESC, "orders_order"."id" LIMIT %s'))
+
+        with mock.patch('orders.search.connection') as connection_mock:
+            search_orders_postgresql('москва', None, 5)
+        sql, params = connection_mock.cursor.return_value.__enter__.return_value.execute.call_args[0]
+        self.assertNotIn('company_id', sql)
+        self.assertEqual(params, ['москва:*', '%москва%', 'москва:*', 'москва', 5])
+
+    def test_sqlite_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('SQLite FTS5')
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {SQLITE_FTS_TABLE}_insert')
+            Order.objects.create(client_tracking='new', recipient_order_num='new', logistic_tracking='new',
+                                 user=self.user, company=self.company, recipient_name='Кузнецов')
+            self.assertEqual(search_orders('кузнецов'), [])
+            # после миграций недостающие триггеры создаются, индекс перестраивается
+            setup_sqlite_search_index(connection.alias)
+            self.assertEqual(search_orders('кузнецов'), [Order.objects.get(client_tracking='new').id])
+        plan = explain_sql(f'SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH \'"москва"\'')
+        self.assertIn('VIRTUAL TABLE INDEX', plan)
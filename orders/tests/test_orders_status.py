@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+
+
+class OrderStatusQueriesTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        self.orders = [Order.objects.create(
+            client_tracking=f'{i}',
+            recipient_order_num=f'{i}',
+            logistic_tracking=f'{i}',
+            user=self.user,
+            company=self.company,
+        ) for i in range(20)]
+        for order in self.orders:
+            Box.objects.create(order=order, client_code=f'{order.id}-1', code='1')
+            Box.objects.create(order=order, client_code=f'{order.id}-2', code='2',
+                               status=Box.StatusChoices.SORTING)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('order:order-list')
+
+    def get_boxes_queries_count(self, page_size):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url, {'page_size': page_size})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()['results']), page_size)
+        return len([query for query in context.captured_queries if Box._meta.db_table in query['sql']])
+
+    def test_list_does_not_query_boxes(self):
+        """Статус заказа хранится в заказе и обновляется при изменении коробок"""
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.get_boxes_queries_count(2), 0)
+        self.assertEqual(self.get_boxes_queries_count(20), 0)
+
+    def test_status(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, {'page_size': 20})
+        for order in response.json()['results']:
+            self.assertEqual(order['status'], ['NEW', 'SORTING'])
+
+        response = self.client.get(reverse('order:order-detail', kwargs={'pk': self.orders[0].id}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['status'], ['NEW', 'SORTING'])
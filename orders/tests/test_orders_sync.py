@@ -0,0 +1,93 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order, DeletedOrder
+
+
+@override_settings(MODIFIED_SINCE_LAG=0)
+class OrderSyncTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company1 = Company.objects.create(name='Компания 1')
+        self.company2 = Company.objects.create(name='Компания 2')
+        self.user1 = get_user_model().objects.create(username='user1', company=self.company1)
+        self.user2 = get_user_model().objects.create(username='user2', company=self.company2)
+        self.orders = [
+            Order.objects.create(client_tracking=str(i), recipient_order_num=str(i), logistic_tracking=str(i),
+                                 user=self.user1, company=self.company1)
+            for i in range(5)
+        ]
+        self.other_order = Order.objects.create(client_tracking='9', recipient_order_num='9', logistic_tracking='9',
+                                                user=self.user2, company=self.company2)
+        # все заказы изменены до момента синхронизации
+        self.since = timezone.now()
+        Order.objects.update(update=self.since - timedelta(hours=1))
+
+    def get_changes(self, name, params):
+        ids = []
+        url = reverse(f'order:{name}')
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [item['id'] for item in response.json()['results']]
+            url, params = response.json()['next'], None
+        return ids
+
+    def test_modified_since(self):
+        self.client.force_authenticate(self.user1)
+        params = {'modified_since': self.since.isoformat(), 'page_size': 1}
+        self.assertEqual(self.get_changes('order-list', params), [])
+
+        self.client.patch(reverse('order:order-detail', kwargs={'pk': self.orders[3].id}), data={'comments': '1'})
+        Box.objects.create(order=self.orders[1], client_code='1', code='1')
+        self.other_order.save()
+        self.assertEqual(self.get_changes('order-list', params), [self.orders[3].id, self.orders[1].id])
+
+    def test_deleted(self):
+        self.client.force_authenticate(self.user1)
+        params = {'modified_since': self.since.isoformat()}
+        self.client.delete(reverse('order:order-detail', kwargs={'pk': self.orders[0].id}))
+        self.other_order.delete()
+        self.assertEqual(self.get_changes('order-deleted', params), [self.orders[0].id])
+        self.assertEqual(self.get_changes('order-list', params), [])
+
+        DeletedOrder.objects.update(deleted_at=self.since - timedelta(minutes=1))
+        self.assertEqual(self.get_changes('order-deleted', params), [])
+
+    @override_settings(MODIFIED_SINCE_LAG=60)
+    def test_lag(self):
+        """Недавно измененные записи (транзакция могла не завершиться) отдаются в следующей синхронизации"""
+        self.client.force_authenticate(self.user1)
+        Order.objects.filter(id=self.orders[2].id).update(update=timezone.now() - timedelta(seconds=30))
+        Order.objects.filter(id=self.orders[4].id).update(update=timezone.now() - timedelta(minutes=5))
+        since = (self.since - timedelta(minutes=10)).isoformat()
+        response = self.client.get(reverse('order:order-list'), {'modified_since': since})
+        self.assertEqual([order['id'] for order in response.json()['results']], [self.orders[4].id])
+        modified_until = parse_datetime(response.json()['modified_until'])
+        self.assertLess(modified_until, timezone.now() - timedelta(seconds=59))
+
+        with mock.patch('carrier_accounting_system.utils.timezone.now',
+                        return_value=timezone.now() + timedelta(minutes=1)):
+            response = self.client.get(reverse('order:order-list'), {'modified_since': modified_until.isoformat()})
+        self.assertEqual([order['id'] for order in response.json()['results']], [self.orders[2].id])
+
+    def test_same_modified_time(self):
+        """Записи, измененные одним UPDATE: страницы по (update, id) без пропусков"""
+        self.client.force_authenticate(self.user1)
+        Order.objects.update(update=self.since - timedelta(seconds=1))
+        params = {'modified_since': (self.since - timedelta(seconds=2)).isoformat(), 'page_size': 2}
+        self.assertEqual(self.get_changes('order-list', params), [order.id for order in self.orders])
+
+    def test_invalid_modified_since(self):
+        self.client.force_authenticate(self.user1)
+        response = self.client.get(reverse('order:order-list'), {'modified_since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
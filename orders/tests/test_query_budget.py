@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+from orders.paginations import OrderPagination
+from orders.tests.query_budget import QueryBudgetMixin
+from shipments.models import Shipment
+
+
+class ListQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    """Количество запросов для страницы списка не зависит от ее размера"""
+
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.transport_company = Company.objects.create(name='Транспортная компания', is_transport_company=True)
+        self.users = [get_user_model().objects.create(username=f'user{i}', company=self.company) for i in range(5)]
+        self.user_of_transport_company = get_user_model().objects.create(username='user_of_transport_company',
+                                                                         company=self.transport_company)
+        self.orders = [Order.objects.create(
+            client_tracking=f'{i}',
+            recipient_order_num=f'{i}',
+            logistic_tracking=f'{i}',
+            user=self.users[i % len(self.users)],
+            company=self.company,
+        ) for i in range(OrderPagination.max_page_size)]
+        self.shipments = [Shipment.objects.create(
+            waybill_num=f'{i}',
+            waybill_date='2021-03-01T00:00:00Z',
+            author=self.users[i % len(self.users)],
+        ) for i in range(OrderPagination.max_page_size)]
+        Box.objects.bulk_create([Box(
+            order=order,
+            client_code=f'{order.id}',
+            code=f'{order.id}',
+            shipment=shipment,
+        ) for order, shipment in zip(self.orders, self.shipments)])
+
+    def test_orders(self):
+        # компания пользователя, count, заказы с пользователями и компаниями, статусы коробок
+        self.client.force_authenticate(self.users[0])
+        self.assertQueryBudget(reverse('order:order-list'), 4, {'page_size': OrderPagination.max_page_size})
+        self.client.force_authenticate(self.user_of_transport_company)
+        self.assertQueryBudget(reverse('order:order-list'), 4, {'page_size': OrderPagination.max_page_size})
+
+    def test_order_retrieve(self):
+        self.client.force_authenticate(self.users[0])
+        self.assertQueryBudget(reverse('order:order-detail', kwargs={'pk': self.orders[0].id}), 3)
+
+    def test_boxes(self):
+        # компания пользователя, count, коробки
+        self.client.force_authenticate(self.users[0])
+        self.assertQueryBudget(reverse('box:box-list'), 3)
+
+    def test_shipments(self):
+        # count, отправления с авторами и компаниями, коробки
+        self.client.force_authenticate(self.users[0])
+        self.assertQueryBudget(reverse('shipment:shipment-list'), 3)
@@ -0,0 +1,78 @@
+from datetime import date, time
+
+from django.contrib.auth import get_user_model
+from rest_framework.renderers import JSONRenderer
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from boxes.serializers import BoxListRetrieveSerializer, BoxChangesSerializer
+from carrier_accounting_system.values_serializers import ValuesSerializer
+from companies.models import Company
+from orders.models import Order
+from orders.serializers import OrderListRetrieveSerializer
+from orders.views import OrderViewSet
+from shipments.models import Shipment
+from shipments.serializers import ShipmentListRetrieveSerializer
+
+
+class ValuesSerializerParityTestCase(APITestCase):
+    """JSON быстрой сериализации побайтно совпадает с JSON сериализаторов DRF"""
+
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания "1"')
+        self.user = get_user_model().objects.create(username='user1', name='Пользователь', company=self.company,
+                                                    email='user@example.com')
+        self.user_without_company = get_user_model().objects.create(username='user2')
+        self.orders = [
+            Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1', user=self.user,
+                                 company=self.company, shipping_date=date(2021, 3, 1), shipping_time=time(10, 30),
+                                 cargo_weight=12.345, cargo_qty=3, recipient_city='Москва', comments='многострочный\n'),
+            Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                                 user=self.user_without_company),
+            Order.objects.create(client_tracking='3', recipient_order_num='3', logistic_tracking='3', user=self.user,
+                                 company=self.company),
+        ]
+        self.shipments = [
+            Shipment.objects.create(waybill_num='1', waybill_date='2021-03-01T12:30:15.123456Z', author=self.user),
+            Shipment.objects.create(waybill_num='2', waybill_date='2021-03-01T00:00:00Z'),
+        ]
+        statuses = list(Box.StatusChoices.values)
+        for i in range(10):
+            Box.objects.create(order=self.orders[i % 2], client_code=str(i), code=f'код {i}', width=0.1 * i,
+                               weight=i / 3 if i % 3 else None, status=statuses[i % len(statuses)],
+                               shipment=self.shipments[0] if i < 6 else None)
+        Box.objects.create(client_code='without order', code='1')
+
+    def assertParity(self, serializer_class, queryset, computed_fields=None):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        values_serializer = ValuesSerializer(serializer_class, computed_fields)
+        actual = JSONRenderer().render(values_serializer.serialize(values_serializer.get_queryset(queryset)))
+        self.assertEqual(actual, expected)
+
+    def test_orders(self):
+        queryset = Order.objects.select_related('user__company', 'company').order_by('id')
+        self.assertParity(OrderListRetrieveSerializer, queryset, OrderViewSet.values_computed_fields)
+        # статус заказа читается из колонок той же строки, без отдельного запроса
+        values_serializer = ValuesSerializer(OrderListRetrieveSerializer, OrderViewSet.values_computed_fields)
+        with self.assertNumQueries(1):
+            rows = values_serializer.serialize(values_serializer.get_queryset(queryset))
+        self.assertEqual([row['status'] for row in rows][2], [])
+
+    def test_boxes(self):
+        self.assertParity(BoxListRetrieveSerializer, Box.objects.order_by('id'))
+        self.assertParity(BoxChangesSerializer, Box.objects.order_by('-update', 'id'))
+
+    def test_shipments(self):
+        self.assertParity(ShipmentListRetrieveSerializer,
+                          Shipment.objects.select_related('author__company').prefetch_related('boxes').order_by('id'))
+
+    def test_views(self):
+        self.client.force_authenticate(self.user)
+        self.orders[0].refresh_from_db()
+        response = self.client.get(reverse('order:order-detail', kwargs={'pk': self.orders[0].id}))
+        self.assertEqual(response.content, JSONRenderer().render(OrderListRetrieveSerializer(self.orders[0]).data))
+        response = self.client.get(reverse('order:order-detail', kwargs={'pk': self.orders[1].id}))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse('shipment:shipment-list'), {'summary': 'true'})
+        self.assertEqual([shipment['boxes_count'] for shipment in response.json()['results']], [6, 0])
@@ -1,13 +1,74 @@
-import random
+import threading
 
-from orders.models import Order
+from django.conf import settings
+from django.db import transaction, connection
+from django.db.models import F
+from django.utils import timezone
+
+from orders.models import LogisticTrackingSequence, Order
+from orders.statuses import aggregate_status_expression
 
 GENERATE_LOGISTIC_TRACKING_BASE = 1000000000
+# номера старого формата имели двузначный суффикс, новые не короче LOGISTIC_TRACKING_SUFFIX_LENGTH
+LOGISTIC_TRACKING_SUFFIX_LENGTH = 6
+
+
+def reserve_logistic_tracking_block(size):
+    """Резервирует size номеров в счетчике, возвращает первый из них"""
+    with transaction.atomic():
+        if not LogisticTrackingSequence.objects.filter(pk=1).update(value=F('value') + size):
+            LogisticTrackingSequence.objects.get_or_create(pk=1)
+            LogisticTrackingSequence.objects.filter(pk=1).update(value=F('value') + size)
+        return LogisticTrackingSequence.objects.values_list('value', flat=True).get(pk=1) - size + 1
+
+
+class LogisticTrackingAllocator:
+    """Выдача номеров из зарезервированного процессом блока, без запросов к БД на каждый номер.
+
+    Номера уникальны между процессами (воркерами gunicorn), так как каждый блок
+    резервируется в общем счетчике. Внутри транзакции блок не кэшируется: при ее откате
+    резервирование тоже откатится и номера могут быть выданы другому процессу."""
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size or getattr(settings, 'LOGISTIC_TRACKING_BLOCK_SIZE', 100)
+        self.lock = threading.Lock()
+        self.next = self.end = 0
+
+    def allocate(self, count=1):
+        if connection.in_atomic_block:
+            start = reserve_logistic_tracking_block(count)
+            return range(start, start + count)
+        with self.lock:
+            if self.end - self.next < count:
+                size = max(count, self.block_size)
+                self.next = reserve_logistic_tracking_block(size)
+                self.end = self.next + size
+            numbers = range(self.next, self.next + count)
+            self.next += count
+            return numbers
+
+
+logistic_tracking_allocator = LogisticTrackingAllocator()
+
+
+def format_logistic_tracking(user_id, number):
+    return str(GENERATE_LOGISTIC_TRACKING_BASE + user_id) + str(number).zfill(LOGISTIC_TRACKING_SUFFIX_LENGTH)
 
 
 def generate_logistic_tracking(user_id):
-    while True:
-        logistic_tracking = str(GENERATE_LOGISTIC_TRACKING_BASE + user_id) + str(random.randint(10, 99))
-        if not Order.objects.filter(logistic_tracking=logistic_tracking).exists():
-            break
-    return logistic_tracking
+    return format_logistic_tracking(user_id, logistic_tracking_allocator.allocate()[0])
+
+
+def generate_logistic_trackings(user_id, count):
+    """Номера для пакета заказов, резервируются одним диапазоном"""
+    return [format_logistic_tracking(user_id, number) for number in logistic_tracking_allocator.allocate(count)]
+
+
+def touch_orders(orders_ids):
+    """Обновляет дату изменения и статус заказов после изменения их коробок: статус заказа вычисляется
+    по количеству коробок в каждом статусе (orders.statuses), изменение коробок - это изменение заказа
+    для инкрементальной синхронизации"""
+    orders_ids = set(orders_ids) - {None}
+    if orders_ids:
+        Order.objects.filter(id__in=orders_ids).update(update=timezone.now(),
+                                                       aggregate_status=aggregate_status_expression())
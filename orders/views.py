@@ -1,31 +1,167 @@
-from rest_framework import viewsets
+import json
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import viewsets, status, serializers
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-from orders.models import Order
-from orders.paginations import OrderPagination
-from orders.serializers import OrderListRetrieveSerializer, OrderCreateSerializer, OrderUpdateSerializer
+from carrier_accounting_system.filters import QueryParamsFilterBackend
+from carrier_accounting_system.utils import ModifiedSinceMixin, TombstoneSerializer
+from carrier_accounting_system.values_serializers import RowField, ValuesSerializerMixin
+from events.models import Event
+from events.paginations import EventPagination
+from events.serializers import EventListSerializer
+from events.views import filter_events_since
+from orders.exports import OrderExport
+from orders.imports import DEFAULT_ENCODING, OrderImport, check_encoding, decode_lines
+from orders.models import Order, DeletedOrder
+from orders.paginations import OrderPagination, ChangesPagination
+from orders.search import search_orders
+from orders.serializers import OrderListRetrieveSerializer, OrderCreateSerializer, OrderUpdateSerializer, \
+    OrderBulkCreateSerializer, OrderSearchSerializer
 from users.permissions import IsUserNotBlocked
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+def get_order_status(row):
+    """Order.status для values-сериализации: по полям количества коробок той же строки"""
+    return [status for status, field in Order.BOX_COUNT_FIELDS.items() if row[field]]
+
+
+class OrderViewSet(ModifiedSinceMixin, ValuesSerializerMixin, viewsets.ModelViewSet):
     pagination_class = OrderPagination
+    values_computed_fields = {'status': RowField(tuple(Order.BOX_COUNT_FIELDS.values()), get_order_status)}
+    changes_pagination_class = ChangesPagination
+    tombstone_model = DeletedOrder
+    cursor_ordering_fields = ('id', 'update')
+    filter_backends = [QueryParamsFilterBackend]
+    query_filters = {
+        'client_tracking': ('client_tracking', serializers.CharField(help_text='Номер заявки в системе отправителя')),
+        'logistic_tracking': ('logistic_tracking', serializers.CharField(
+            help_text='Номер заявки в системе транспортной компании')),
+        'recipient_order_num': ('recipient_order_num', serializers.CharField(help_text='Номер заказа клиента')),
+        'shipping_date_from': ('shipping_date__gte', serializers.DateField(
+            help_text='Ожидаемая дата подачи транспорта не раньше, YYYY-MM-DD')),
+        'shipping_date_to': ('shipping_date__lte', serializers.DateField(
+            help_text='Ожидаемая дата подачи транспорта не позже, YYYY-MM-DD')),
+        'aggregate_status': ('aggregate_status', serializers.ChoiceField(Order.StatusChoices.choices,
+                                                                         help_text='Статус заказа')),
+    }
     permission_classes = [IsAuthenticated, IsUserNotBlocked]
 
     def get_queryset(self):
+        if self.action == 'events':
+            return Order.objects.only('id', 'company_id').filter(**self.get_company_filter())
+        # статус заказа хранится в самом заказе (orders.statuses), коробки не загружаются
+        queryset = Order.objects.select_related('user__company', 'company').order_by('id')
+        return queryset.filter(**self.get_company_filter())
+
+    def get_company_filter(self):
         if self.request.user.company.is_transport_company:
-            return Order.objects.all()
-        return Order.objects.filter(company=self.request.user.company)
+            return {}
+        return {'company': self.request.user.company}
 
     def get_object(self):
-        if self.request.user.company.is_transport_company:
-            return get_object_or_404(Order, id=self.kwargs['pk'])
-        return get_object_or_404(Order, company=self.request.user.company, id=self.kwargs['pk'])
+        return get_object_or_404(self.get_queryset(), id=self.kwargs['pk'])
 
     def get_serializer_class(self):
         if self.action in ('create',):
             return OrderCreateSerializer
-        elif self.action in ('list', 'retrieve'):
+        elif self.action in ('list', 'retrieve', 'search'):
             return OrderListRetrieveSerializer
         elif self.action in ('update', 'partial_update'):
             return OrderUpdateSerializer
+        elif self.action in ('bulk',):
+            return OrderBulkCreateSerializer
+        elif self.action in ('events',):
+            return EventListSerializer
+        elif self.action in ('deleted',):
+            return TombstoneSerializer
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Пакетное создание заказов. Принимает массив заказов, ошибки возвращаются для каждого элемента"""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        orders = serializer.save() if serializer.validated_data else []
+        return Response(serializer.get_bulk_result(orders, ('id', 'logistic_tracking')),
+                        status=status.HTTP_201_CREATED if orders else status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['get'])
+    def events(self, request, pk=None):
+        """История событий заказа с пагинацией по курсору (datetime, id).
+
+        ?since= - только события после указанного момента, ?after= - после события с указанным id"""
+        order = self.get_object()
+        queryset = filter_events_since(Event.objects.filter(order=order).select_related('user__company'), request)
+        paginator = EventPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @swagger_auto_schema(query_serializer=OrderSearchSerializer)
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Полнотекстовый поиск заказов по получателю: ФИО, телефон, город, адрес.
+
+        Результаты в порядке релевантности, без пагинации. Поддерживаются ?fields= и ?exclude="""
+        params = OrderSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        company = self.get_company_filter().get('company')
+        ids = search_orders(params.validated_data['q'], company.id if company else None,
+                            params.validated_data['limit'])
+        positions = {order_id: position for position, order_id in enumerate(ids)}
+        values_serializer = self.get_values_serializer()
+        rows = sorted(values_serializer.get_queryset(Order.objects.filter(id__in=ids)),
+                      key=lambda row: positions[row['pk']])
+        return Response({'results': values_serializer.serialize(rows)})
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Потоковая выгрузка заказов компании: ?file_format=csv|ndjson, ?include=boxes - с коробками и отправлениями"""
+        file_format = request.query_params.get('file_format', 'csv')
+        if file_format not in OrderExport.formats:
+            raise ValidationError({'file_format': [f'Supported formats: {", ".join(OrderExport.formats)}.']})
+        export = OrderExport(Order.objects.filter(**self.get_company_filter()),
+                             include_boxes=request.query_params.get('include') == 'boxes')
+        response = StreamingHttpResponse(export.iter_content(file_format),
+                                         content_type=OrderExport.formats[file_format])
+        filename = f'orders_{timezone.now():%Y%m%d_%H%M%S}.{file_format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='import', url_name='import')
+    def import_orders(self, request):
+        """Потоковый импорт заказов из файла CSV или NDJSON (поле file, ?file_format= - по умолчанию по расширению,
+        ?encoding= - по умолчанию UTF-8).
+
+        Ответ - NDJSON: строка с ошибками для каждой отклоненной строки файла (type=error)
+        и строка с прогрессом после каждого пакета (type=progress). Кодировка проверяется по началу файла до ответа"""
+        upload = request.FILES.get('file')
+        if upload is None:
+            raise ValidationError({'file': ['No file was submitted.']})
+        file_format = request.query_params.get('file_format') or upload.name.rsplit('.', 1)[-1].lower()
+        if file_format not in OrderImport.formats:
+            raise ValidationError({'file_format': [f'Supported formats: {", ".join(OrderImport.formats)}.']})
+        encoding = request.query_params.get('encoding') or DEFAULT_ENCODING
+        try:
+            check_encoding(upload.file, encoding)
+        except LookupError:
+            raise ValidationError({'encoding': [f'Unknown encoding "{encoding}".']})
+        except UnicodeDecodeError as exc:
+            raise ValidationError({'file': [f'The file is not valid {encoding} text: {exc.reason}. '
+                                            f'Pass the file encoding in ?encoding=, e.g. cp1251.']})
+        order_import = OrderImport(decode_lines(upload.file, encoding), file_format,
+                                   context=self.get_serializer_context())
+
+        def iter_content():
+            for result in order_import.run():
+                for error in result.pop('errors'):
+                    yield json.dumps({'type': 'error', **error}, ensure_ascii=False) + '\n'
+                yield json.dumps({'type': 'progress', **result}) + '\n'
+
+        return StreamingHttpResponse(iter_content(), content_type='application/x-ndjson')
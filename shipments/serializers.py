@@ -1,13 +1,75 @@
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
+from boxes.counters import count_boxes_status_change
 from boxes.models import Box
 from boxes.serializers import BoxListRetrieveSerializer
+from boxes.transitions import SHIPMENT_ASSIGNABLE_STATUSES
+from events.channels import publish_events
 from events.models import Event
+from orders.utils import touch_orders
 from shipments.models import Shipment
 from users.serializers import UserListRetrieveSerializer
 
 
+def assign_boxes_to_shipment(shipment, boxes, user):
+    """Добавление коробок в отправление одним UPDATE, события для заказов коробок вставляются одним запросом.
+
+    Вызывается внутри транзакции вместе с сохранением отправления. Коробки блокируются и проверяются повторно:
+    статус мог измениться параллельным запросом после проверки в validate_boxes_ids"""
+    if not boxes:
+        return
+    ids = [box.id for box in boxes]
+    queryset = Box.objects.filter(id__in=ids, status__in=SHIPMENT_ASSIGNABLE_STATUSES)
+    locked = set(queryset.select_for_update().values_list('id', flat=True))
+    if len(locked) != len(ids):
+        changed = ', '.join(str(box_id) for box_id in ids if box_id not in locked)
+        raise ValidationError({'boxes_ids': [f'Box id = {changed}. Box status must be NEW or READY_FOR_SHIPPING']})
+    count_boxes_status_change(queryset, Box.StatusChoices.SORTING)
+    queryset.update(shipment=shipment, status=Box.StatusChoices.SORTING, update=timezone.now())
+    touch_orders(box.order_id for box in boxes)
+    events = Event.objects.bulk_create([
+        Event(
+            status=Event.StatusChoices.READY_FOR_SHIPPING,
+            order_id=order_id,
+            comments=f'Номер транспортной накладной: {shipment.waybill_num}',
+            user=user,
+        ) for order_id in dict.fromkeys(box.order_id for box in boxes)
+    ])
+    publish_events(events)
+
+
+class ShipmentBoxesValidationMixin:
+    """Проверка коробок отправления: коробки вместе с заказами загружаются одним запросом,
+    в ошибке перечисляются все коробки, не прошедшие проверку"""
+
+    def validate_boxes_ids(self, value):
+        user = self.context['request'].user
+        boxes = Box.objects.select_related('order').in_bulk(value)
+        errors = []
+
+        def add_error(ids, message):
+            if ids:
+                errors.append(f'Box id = {", ".join(str(box_id) for box_id in ids)}. {message}')
+
+        add_error([box_id for box_id in value if box_id not in boxes], 'Box does not exist.')
+        add_error([box.id for box in boxes.values() if not box.client_code],
+                  'You cannot add a box without the given "client_code".')
+        add_error([box.id for box in boxes.values() if not box.order],
+                  'You cannot add a box without the given "order".')
+        if not (user.company and user.company.is_transport_company):
+            add_error([box.id for box in boxes.values() if box.order and box.order.company_id != user.company_id],
+                      'Only those boxes can be added that belong to the company '
+                      'to which the current user is attached')
+        add_error([box.id for box in boxes.values() if box.status not in SHIPMENT_ASSIGNABLE_STATUSES],
+                  'Box status must be NEW or READY_FOR_SHIPPING')
+        if errors:
+            raise ValidationError(errors)
+        return [boxes[box_id] for box_id in dict.fromkeys(value)]
+
+
 class ShipmentListRetrieveSerializer(serializers.ModelSerializer):
     author = UserListRetrieveSerializer()
     boxes = BoxListRetrieveSerializer(many=True)
@@ -21,10 +83,26 @@ class ShipmentListRetrieveSerializer(serializers.ModelSerializer):
         ]
 
 
-class ShipmentCreateSerializer(serializers.ModelSerializer):
+class ShipmentSummarySerializer(serializers.ModelSerializer):
+    """Отправление без списка коробок: количество, общий вес и объем коробок считаются в запросе"""
+    author = UserListRetrieveSerializer()
+    boxes_count = serializers.IntegerField(read_only=True, help_text='Количество коробок')
+    boxes_weight = serializers.FloatField(read_only=True, help_text='Общий вес коробок, кг')
+    boxes_volume = serializers.FloatField(read_only=True, help_text='Общий объем коробок, куб. м')
+
+    class Meta:
+        model = Shipment
+        fields = [
+            'id', 'waybill_num', 'waybill_date',
+            'comment', 'date_of_creation', 'author',
+            'boxes_count', 'boxes_weight', 'boxes_volume'
+        ]
+
+
+class ShipmentCreateSerializer(ShipmentBoxesValidationMixin, serializers.ModelSerializer):
     boxes = BoxListRetrieveSerializer(many=True, read_only=True)
-    boxes_ids = serializers.PrimaryKeyRelatedField(queryset=Box.objects.all(), source='boxes', write_only=True,
-                                                   required=True, many=True)
+    boxes_ids = serializers.ListField(child=serializers.IntegerField(), source='boxes', write_only=True,
+                                      required=True)
 
     class Meta:
         model = Shipment
@@ -42,43 +120,17 @@ class ShipmentCreateSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data['author'] = self.context['request'].user
-        shipment = super(ShipmentCreateSerializer, self).create(validated_data)
-        if 'boxes' in validated_data:
-            for box in validated_data['boxes']:
-                box.shipment = shipment
-                box.status = Box.StatusChoices.SORTING
-                box.save()
-        Event.objects.create(
-            status=Event.StatusChoices.READY_FOR_SHIPPING,
-            comments=f'Номер транспортной накладной: {self.validated_data["waybill_num"]}',
-            user=self.context['request'].user,
-        )
+        boxes = validated_data.pop('boxes')
+        with transaction.atomic():
+            shipment = super(ShipmentCreateSerializer, self).create(validated_data)
+            assign_boxes_to_shipment(shipment, boxes, self.context['request'].user)
         return shipment
 
-    def validate_boxes_ids(self, value):
-        for box in value:
-            if not box.client_code:
-                raise ValidationError(f'Box id = {box.id}. You cannot add a box without the given "client_code".')
-        for box in value:
-            if not box.order:
-                raise ValidationError(f'Box id = {box.id}. You cannot add a box without the given "order".')
-        for box in value:
-            if (box.order.company.id != self.context['request'].user.company.id
-                    and not self.context['request'].user.company.is_transport_company):
-                raise ValidationError(f'Box with id = {box.id}. '
-                                      f'Only those boxes can be added that belong to the company '
-                                      f'to which the current user is attached')
-        for box in value:
-            if box.status not in (Box.StatusChoices.NEW, Box.StatusChoices.READY_FOR_SHIPPING):
-                raise ValidationError(
-                    f'Сan not add a box with id = {box.id}. Box status must be NEW or READY_FOR_SHIPPING')
-        return value
-
-
-class ShipmentUpdateSerializer(serializers.ModelSerializer):
+
+class ShipmentUpdateSerializer(ShipmentBoxesValidationMixin, serializers.ModelSerializer):
     boxes = BoxListRetrieveSerializer(many=True, read_only=True)
-    boxes_ids = serializers.PrimaryKeyRelatedField(queryset=Box.objects.all(), source='boxes', write_only=True,
-                                                   required=False, many=True)
+    boxes_ids = serializers.ListField(child=serializers.IntegerField(), source='boxes', write_only=True,
+                                      required=False)
 
     class Meta:
         model = Shipment
@@ -97,34 +149,8 @@ class ShipmentUpdateSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         validated_data['author'] = self.context['request'].user
-        shipment = super(ShipmentUpdateSerializer, self).create(validated_data)
-        if 'boxes' in validated_data:
-            for box in validated_data['boxes']:
-                box.shipment = shipment
-                box.status = Box.StatusChoices.SORTING
-                box.save()
-        Event.objects.create(
-            status=Event.StatusChoices.READY_FOR_SHIPPING,
-            comments=f'Номер транспортной накладной: {self.validated_data["waybill_num"]}',
-            user=self.context['request'].user,
-        )
+        boxes = validated_data.pop('boxes', [])
+        with transaction.atomic():
+            shipment = super(ShipmentUpdateSerializer, self).update(instance, validated_data)
+            assign_boxes_to_shipment(shipment, boxes, self.context['request'].user)
         return shipment
-
-    def validate_boxes_ids(self, value):
-        for box in value:
-            if not box.client_code:
-                raise ValidationError(f'Box id = {box.id}. You cannot add a box without the given "client_code".')
-        for box in value:
-            if not box.order:
-                raise ValidationError(f'Box id = {box.id}. You cannot add a box without the given "order".')
-        for box in value:
-            if (box.order.company.id != self.context['request'].user.company.id
-                    and not self.context['request'].user.company.is_transport_company):
-                raise ValidationError(f'Box with id = {box.id}. '
-                                      f'Only those boxes can be added that belong to the company '
-                                      f'to which the current user is attached')
-        for box in value:
-            if box.status not in (Box.StatusChoices.NEW, Box.StatusChoices.READY_FOR_SHIPPING):
-                raise ValidationError(
-                    f'Сan not add a box with id = {box.id}. Box status must be NEW or READY_FOR_SHIPPING')
-        return value
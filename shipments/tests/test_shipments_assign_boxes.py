@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection, DatabaseError
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box, BoxStatusCounter
+from companies.models import Company
+from events.models import Event
+from orders.models import Order
+from shipments.models import Shipment
+from shipments.serializers import assign_boxes_to_shipment
+
+
+class ShipmentAssignBoxesTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        self.orders = [Order.objects.create(client_tracking=f'{i}', recipient_order_num=f'{i}',
+                                            logistic_tracking=f'{i}', user=self.user, company=self.company)
+                       for i in range(2)]
+        self.boxes = [Box.objects.create(order=self.orders[i % 2], client_code=f'{i}', code=f'{i}')
+                      for i in range(100)]
+        self.data = {
+            'waybill_num': 'waybill',
+            'waybill_date': '2021-03-01T00:00:00',
+            'boxes_ids': [box.id for box in self.boxes],
+        }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('shipment:shipment-list')
+
+    def test_create(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data=self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        shipment = Shipment.objects.get()
+        self.assertEqual(len(response.json()['boxes']), len(self.boxes))
+        self.assertEqual(shipment.boxes.filter(status=Box.StatusChoices.SORTING).count(), len(self.boxes))
+        self.assertEqual(
+            sorted(Event.objects.filter(status=Event.StatusChoices.READY_FOR_SHIPPING)
+                   .values_list('order_id', flat=True)),
+            [order.id for order in self.orders]
+        )
+        self.assertEqual(Event.objects.first().comments, 'Номер транспортной накладной: waybill')
+
+    def test_queries_count_does_not_depend_on_boxes_count(self):
+        BoxStatusCounter.objects.create(company=self.company, status=Box.StatusChoices.SORTING)
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as context_one:
+            response = self.client.post(self.url, data={**self.data, 'boxes_ids': self.data['boxes_ids'][:1]},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        with CaptureQueriesContext(connection) as context_all:
+            response = self.client.post(self.url, data={**self.data, 'boxes_ids': self.data['boxes_ids'][1:]},
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(context_one), len(context_all))
+
+    def test_failure_does_not_leave_half_assigned_shipment(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch.object(Event.objects, 'bulk_create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.post(self.url, data=self.data, format='json')
+        self.assertFalse(Shipment.objects.exists())
+        self.assertFalse(Box.objects.filter(shipment__isnull=False).exists())
+        self.assertFalse(Box.objects.exclude(status=Box.StatusChoices.NEW).exists())
+
+    def test_update(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, data={**self.data, 'boxes_ids': self.data['boxes_ids'][:10]},
+                                    format='json')
+        shipment = Shipment.objects.get(id=response.json()['id'])
+        response = self.client.patch(reverse('shipment:shipment-detail', kwargs={'pk': shipment.id}),
+                                     data={'comment': 'comment', 'boxes_ids': self.data['boxes_ids'][10:]},
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Shipment.objects.get().comment, 'comment')
+        self.assertEqual(len(response.json()['boxes']), len(self.boxes))
+        self.assertEqual(shipment.boxes.filter(status=Box.StatusChoices.SORTING).count(), len(self.boxes))
+
+    def test_status_changed_after_validation(self):
+        # коробка задержана параллельным запросом между проверкой и добавлением в отправление
+        boxes = list(Box.objects.filter(id__in=self.data['boxes_ids'][:3]))
+        Box.objects.filter(id=boxes[1].id).update(status=Box.StatusChoices.DELAYED)
+        shipment = Shipment.objects.create(waybill_num='1', waybill_date='2021-03-01T00:00:00Z', author=self.user)
+        with self.assertRaises(ValidationError) as error:
+            assign_boxes_to_shipment(shipment, boxes, self.user)
+        self.assertEqual(error.exception.detail, {'boxes_ids': [
+            f'Box id = {boxes[1].id}. Box status must be NEW or READY_FOR_SHIPPING']})
+        self.assertEqual(Box.objects.get(id=boxes[1].id).status, Box.StatusChoices.DELAYED)
+        self.assertFalse(shipment.boxes.exists())
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+from shipments.models import Shipment
+
+
+class ShipmentBoxesValidationTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company1 = Company.objects.create(name='Компания 1')
+        self.company2 = Company.objects.create(name='Компания 2')
+        self.user1 = get_user_model().objects.create(username='user1', company=self.company1)
+        self.user2 = get_user_model().objects.create(username='user2', company=self.company2)
+        self.order1 = Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1',
+                                           user=self.user1, company=self.company1)
+        self.order2 = Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                                           user=self.user2, company=self.company2)
+        self.boxes = [Box.objects.create(order=self.order1, client_code=f'{i}', code=f'{i}') for i in range(200)]
+        self.data = {
+            'waybill_num': '1',
+            'waybill_date': '2021-03-01T00:00:00',
+            'boxes_ids': [box.id for box in self.boxes],
+        }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse('shipment:shipment-list')
+
+    def get_queries_count(self, boxes_ids):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, data={**self.data, 'boxes_ids': boxes_ids}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        return len(context)
+
+    def test_queries_count_does_not_depend_on_boxes_count(self):
+        """Коробки с недопустимым статусом: измеряется только валидация"""
+        Box.objects.update(status=Box.StatusChoices.DONE)
+        self.client.force_authenticate(self.user1)
+        self.assertEqual(self.get_queries_count(self.data['boxes_ids'][:1]),
+                         self.get_queries_count(self.data['boxes_ids']))
+
+    def test_all_errors_in_one_payload(self):
+        box_of_company2 = Box.objects.create(order=self.order2, client_code='company2', code='company2')
+        box_without_order = Box.objects.create(client_code='without_order', code='without_order')
+        Box.objects.filter(id=self.boxes[0].id).update(status=Box.StatusChoices.DONE)
+        Box.objects.filter(id=self.boxes[1].id).update(status=Box.StatusChoices.DELIVERING)
+        self.data['boxes_ids'] += [box_of_company2.id, box_without_order.id, 0]
+
+        self.client.force_authenticate(self.user1)
+        response = self.client.post(self.url, data=self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json(),
+            {'boxes_ids': [
+                'Box id = 0. Box does not exist.',
+                f'Box id = {box_without_order.id}. You cannot add a box without the given "order".',
+                f'Box id = {box_of_company2.id}. Only those boxes can be added that belong to the company '
+                f'to which the current user is attached',
+                f'Box id = {self.boxes[0].id}, {self.boxes[1].id}. Box status must be NEW or READY_FOR_SHIPPING',
+            ]}
+        )
+        self.assertFalse(Shipment.objects.exists())
+
+    def test_transport_company_adds_boxes_of_any_company(self):
+        transport_company = Company.objects.create(name='Транспортная компания', is_transport_company=True)
+        user = get_user_model().objects.create(username='user3', company=transport_company)
+        box_of_company2 = Box.objects.create(order=self.order2, client_code='company2', code='company2')
+        self.data['boxes_ids'].append(box_of_company2.id)
+
+        self.client.force_authenticate(user)
+        response = self.client.post(self.url, data=self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.json())
+        shipment = Shipment.objects.get()
+        self.assertEqual(shipment.boxes.count(), len(self.data['boxes_ids']))
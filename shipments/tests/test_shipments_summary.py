@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
+
+from boxes.models import Box
+from companies.models import Company
+from orders.models import Order
+from shipments.models import Shipment
+
+
+class ShipmentSummaryTestCase(APITestCase):
+    def setUp(self) -> None:
+        self.company = Company.objects.create(name='Компания 1')
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        self.order = Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1',
+                                          user=self.user, company=self.company)
+        self.shipment = Shipment.objects.create(waybill_num='1', waybill_date='2021-03-01T00:00:00Z',
+                                                author=self.user)
+        self.empty_shipment = Shipment.objects.create(waybill_num='2', waybill_date='2021-03-01T00:00:00Z',
+                                                      author=self.user)
+        self.boxes = [Box.objects.create(order=self.order, client_code=f'{i}', code=f'{i}', shipment=self.shipment,
+                                         width=1, height=2, length=i, weight=i) for i in range(1, 31)]
+        Box.objects.create(order=self.order, client_code='without_size', code='without_size', shipment=self.shipment)
+
+    def test_list(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('shipment:shipment-list'), {'summary': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context), 2)  # count, отправления с коробками в агрегатах
+        results = {shipment['id']: shipment for shipment in response.json()['results']}
+        self.assertNotIn('boxes', results[self.shipment.id])
+        self.assertEqual(results[self.shipment.id]['boxes_count'], 31)
+        self.assertEqual(results[self.shipment.id]['boxes_weight'], sum(range(1, 31)))
+        self.assertEqual(results[self.shipment.id]['boxes_volume'], 2 * sum(range(1, 31)))
+        self.assertEqual(results[self.empty_shipment.id]['boxes_count'], 0)
+        self.assertEqual(results[self.empty_shipment.id]['boxes_weight'], 0)
+        self.assertEqual(results[self.empty_shipment.id]['boxes_volume'], 0)
+
+    def test_list_with_boxes_by_default(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('shipment:shipment-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {shipment['id']: shipment for shipment in response.json()['results']}
+        self.assertEqual(len(results[self.shipment.id]['boxes']), 31)
+
+    def test_boxes(self):
+        self.client.force_authenticate(self.user)
+        url = reverse('shipment:shipment-boxes', kwargs={'pk': self.shipment.id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['count'], 31)
+        self.assertEqual([box['id'] for box in response.json()['results']], [box.id for box in self.boxes[:10]])
+        response = self.client.get(response.json()['next'])
+        self.assertEqual([box['id'] for box in response.json()['results']], [box.id for box in self.boxes[10:20]])
+
+    def test_boxes_not_found(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(reverse('shipment:shipment-boxes', kwargs={'pk': 0}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -1,17 +1,59 @@
+from django.db.models import Count, Sum, F, FloatField, ExpressionWrapper, Value
+from django.db.models.functions import Coalesce
 from rest_framework import viewsets, mixins
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 
+from boxes.models import Box
+from boxes.serializers import BoxListRetrieveSerializer
+from carrier_accounting_system.values_serializers import ValuesSerializerMixin
+from orders.paginations import PageNumberOrCursorPagination
 from shipments.models import Shipment
-from shipments.serializers import ShipmentListRetrieveSerializer, ShipmentCreateSerializer
+from shipments.serializers import ShipmentListRetrieveSerializer, ShipmentCreateSerializer, \
+    ShipmentUpdateSerializer, ShipmentSummarySerializer
 from users.permissions import IsUserNotBlocked
 
 
-class ShipmentVewSet(viewsets.ModelViewSet):
-    queryset = Shipment.objects.all()
+class ShipmentVewSet(ValuesSerializerMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated, IsUserNotBlocked]
+    pagination_class = PageNumberOrCursorPagination
+    cursor_ordering_fields = ('id', 'date_of_creation')
+    summary_query_param = 'summary'
+
+    def is_summary(self):
+        """Список отправлений без коробок: ?summary=true"""
+        return self.action == 'list' and self.request.query_params.get(self.summary_query_param) in ('1', 'true')
+
+    def get_queryset(self):
+        queryset = Shipment.objects.select_related('author__company').order_by('id')
+        if self.is_summary():
+            return queryset.annotate(
+                boxes_count=Count('boxes'),
+                boxes_weight=Coalesce(Sum('boxes__weight'), Value(0.0)),
+                boxes_volume=Coalesce(Sum(ExpressionWrapper(
+                    F('boxes__width') * F('boxes__height') * F('boxes__length'), output_field=FloatField()
+                )), Value(0.0)),
+            )
+        if self.action == 'boxes':
+            return queryset
+        return queryset.prefetch_related('boxes')
 
     def get_serializer_class(self):
         if self.action in ('create',):
             return ShipmentCreateSerializer
         elif self.action in ('list', 'retrieve'):
+            if self.is_summary():
+                return ShipmentSummarySerializer
             return ShipmentListRetrieveSerializer
+        elif self.action in ('update', 'partial_update'):
+            return ShipmentUpdateSerializer
+        elif self.action in ('boxes',):
+            return BoxListRetrieveSerializer
+
+    @action(detail=True, methods=['get'])
+    def boxes(self, request, pk=None):
+        """Коробки отправления с пагинацией"""
+        shipment = self.get_object()
+        page = self.paginate_queryset(Box.objects.filter(shipment=shipment).order_by('id'))
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
@@ -0,0 +1,85 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+AUTH_TOKEN_CACHE_KEY = 'auth_token:{}'
+AUTH_TOKEN_USER_VERSION_KEY = 'auth_token_version:user:{}'
+AUTH_TOKEN_COMPANY_VERSION_KEY = 'auth_token_version:company:{}'
+# кэши, не общие для процессов: сброс кэша из одного процесса не виден в остальных
+PROCESS_LOCAL_CACHE_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',
+                                'django.core.cache.backends.dummy.DummyCache')
+
+
+def get_auth_token_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def get_version_keys(user_id, company_id):
+    keys = [AUTH_TOKEN_USER_VERSION_KEY.format(user_id)]
+    if company_id is not None:
+        keys.append(AUTH_TOKEN_COMPANY_VERSION_KEY.format(company_id))
+    return keys
+
+
+def get_versions(cache, keys):
+    """Текущие версии пользователя и компании, отсутствующие версии создаются новыми"""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+    if len(versions) < len(keys):
+        versions = cache.get_many(keys)
+    return tuple(versions.get(key) for key in keys)
+
+
+def invalidate_auth_tokens(keys):
+    """Сброс версии пользователя или компании делает недействительными все закэшированные токены с ними"""
+    def invalidate():
+        get_auth_token_cache().set_many({key: uuid.uuid4().hex for key in keys}, None)
+    # и после коммита: параллельный запрос мог закэшировать данные до коммита изменений
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшированием токена вместе с пользователем и его компанией.
+
+    Закэшированный токен используется без запросов к базе, пока совпадают версии его пользователя и компании
+    в кэше: версии меняются при изменении пользователя, компании или удалении токена (users.signals), в том числе
+    после коммита транзакции. Кэш AUTH_TOKEN_CACHE_ALIAS должен быть общим для всех процессов
+    (проверка manage.py check --deploy), время жизни записей - AUTH_TOKEN_CACHE_TIMEOUT."""
+
+    def authenticate_credentials(self, key):
+        cache = get_auth_token_cache()
+        cache_key = AUTH_TOKEN_CACHE_KEY.format(key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            token, version_keys, versions = cached
+            if get_versions(cache, version_keys) != versions:
+                cached = None
+        if cached is None:
+            model = self.get_model()
+            ids = model.objects.filter(key=key).values_list('user_id', 'user__company_id').first()
+            if ids is None:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            user_id, company_id = ids
+            # версии читаются до загрузки: изменение во время загрузки сбросит версию и запись не будет использована
+            version_keys = get_version_keys(user_id, company_id)
+            versions = get_versions(cache, version_keys)
+            try:
+                token = model.objects.select_related('user__company').get(key=key)
+            except model.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if token.user.company_id == company_id:
+                cache.set(cache_key, (token, version_keys, versions),
+                          getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 60))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from users.authentication import PROCESS_LOCAL_CACHE_BACKENDS
+
+
+@register(deploy=True)
+def check_auth_token_cache(app_configs, **kwargs):
+    """Сброс закэшированных токенов должен быть виден всем процессам"""
+    alias = getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHE_BACKENDS:
+        return [Error(f'AUTH_TOKEN_CACHE_ALIAS = {alias!r} uses the process-local cache {backend}.',
+                      hint='Use a cache shared by all processes, e.g. Redis or Memcached.', id='users.E001')]
+    return []
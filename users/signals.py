@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from companies.models import Company
+from users.authentication import AUTH_TOKEN_COMPANY_VERSION_KEY, AUTH_TOKEN_USER_VERSION_KEY, invalidate_auth_tokens
+from users.models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_auth_tokens(sender, instance, **kwargs):
+    """Блокировка пользователя администратором, смена компании"""
+    invalidate_auth_tokens([AUTH_TOKEN_USER_VERSION_KEY.format(instance.id)])
+
+
+@receiver([post_save, post_delete], sender=Company)
+def invalidate_company_auth_tokens(sender, instance, **kwargs):
+    invalidate_auth_tokens([AUTH_TOKEN_COMPANY_VERSION_KEY.format(instance.id)])
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_auth_token(sender, instance, **kwargs):
+    invalidate_auth_tokens([AUTH_TOKEN_USER_VERSION_KEY.format(instance.user_id)])
@@ -1,3 +1,105 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.reverse import reverse
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from companies.models import Company
+from orders.models import Order
+from users.authentication import AUTH_TOKEN_COMPANY_VERSION_KEY, AUTH_TOKEN_USER_VERSION_KEY, invalidate_auth_tokens
+from users.checks import check_auth_token_cache
+
+
+class CachedTokenAuthenticationTestCase(APITestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.company = Company.objects.create(name='Компания 1')
+        self.other_company = Company.objects.create(name='Компания 2')
+        self.user = get_user_model().objects.create(username='user1', company=self.company)
+        Order.objects.create(client_tracking='1', recipient_order_num='1', logistic_tracking='1',
+                             user=self.user, company=self.company)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.url = reverse('order:order-list')
+
+    def get(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        return response, [query['sql'] for query in context.captured_queries]
+
+    def test_cached(self):
+        """Повторный запрос не обращается к базе за токеном, пользователем и компанией"""
+        response, queries = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(any(Token._meta.db_table in query for query in queries))
+        response, queries = self.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        auth_tables = (Token._meta.db_table, get_user_model()._meta.db_table, Company._meta.db_table)
+        self.assertEqual([query for query in queries if any(f'FROM "{table}"' in query for table in auth_tables)], [])
+
+    def test_version_changed(self):
+        """Смена версии пользователя или компании (другим процессом) сбрасывает закэшированный токен"""
+        self.get()
+        get_user_model().objects.filter(id=self.user.id).update(blocked=True)
+        self.assertEqual(self.get()[0].status_code, status.HTTP_200_OK)
+        invalidate_auth_tokens([AUTH_TOKEN_USER_VERSION_KEY.format(self.user.id)])
+        self.assertEqual(self.get()[0].status_code, status.HTTP_403_FORBIDDEN)
+        Company.objects.filter(id=self.company.id).update(is_transport_company=True)
+        get_user_model().objects.filter(id=self.user.id).update(blocked=False)
+        invalidate_auth_tokens([AUTH_TOKEN_USER_VERSION_KEY.format(self.user.id)])
+        self.get()
+        Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                             user=self.user, company=self.other_company)
+        Company.objects.filter(id=self.company.id).update(is_transport_company=False)
+        self.assertEqual(self.get()[0].json()['count'], 2)
+        invalidate_auth_tokens([AUTH_TOKEN_COMPANY_VERSION_KEY.format(self.company.id)])
+        self.assertEqual(self.get()[0].json()['count'], 1)
+
+    def test_versions_evicted(self):
+        """Вытесненные из кэша версии не совпадают с версиями закэшированного токена"""
+        self.get()
+        get_user_model().objects.filter(id=self.user.id).update(blocked=True)
+        cache.delete(AUTH_TOKEN_USER_VERSION_KEY.format(self.user.id))
+        self.assertEqual(self.get()[0].status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deploy_check(self):
+        self.assertEqual([error.id for error in check_auth_token_cache(None)], ['users.E001'])
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache', 'LOCATION': '127.0.0.1:11211'}}):
+            self.assertEqual(check_auth_token_cache(None), [])
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        response, _ = self.get()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_user_blocked(self):
+        self.get()
+        self.user.blocked = True
+        self.user.save()
+        response, _ = self.get()
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_company_changed(self):
+        self.assertEqual(self.get()[0].json()['count'], 1)
+        self.user.company = self.other_company
+        self.user.save()
+        self.assertEqual(self.get()[0].json()['count'], 0)
+
+    def test_company_updated(self):
+        self.assertEqual(self.get()[0].json()['count'], 1)
+        self.company.is_transport_company = True
+        self.company.save()
+        Order.objects.create(client_tracking='2', recipient_order_num='2', logistic_tracking='2',
+                             user=self.user, company=self.other_company)
+        self.assertEqual(self.get()[0].json()['count'], 2)
+
+    def test_token_deleted(self):
+        self.get()
+        self.token.delete()
+        response, _ = self.get()
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)